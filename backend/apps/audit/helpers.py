@@ -44,7 +44,7 @@ def registrar_bitacora(request, usuario=None, accion="", descripcion="", modulo=
     if hasattr(request, '_audit_logged'):
         request._audit_logged = True
     
-    # Registrar usando el método del modelo
+    # Registrar usando el método del modelo (encola en el escritor asíncrono)
     return HistorialActividad.log_activity(
         request=request,
         tipo_accion=tipo_accion,
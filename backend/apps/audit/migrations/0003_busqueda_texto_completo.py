@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def instalar_busqueda(apps, schema_editor):
+    from apps.audit import search
+    search.install(schema_editor.connection)
+
+
+def quitar_busqueda(apps, schema_editor):
+    from apps.audit import search
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(instalar_busqueda, quitar_busqueda),
+    ]
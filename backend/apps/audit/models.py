@@ -124,14 +124,18 @@ class HistorialActividad(TimeStampedModel):
         usuario_str = self.usuario.username if self.usuario else "Sistema"
         return f"{usuario_str} - {self.accion} - {self.fecha_hora.strftime('%Y-%m-%d %H:%M:%S')}"
     
-    def save(self, *args, **kwargs):
-        # Sincronizar fecha y hora con fecha_hora para compatibilidad
+    def sync_legacy_fields(self):
+        """Sincroniza fecha, hora e ip (campos legacy) con fecha_hora e ip_address."""
         if self.fecha_hora and not self.fecha:
             self.fecha = self.fecha_hora.date()
         if self.fecha_hora and not self.hora:
             self.hora = self.fecha_hora.time()
         if self.ip_address and not self.ip:
             self.ip = str(self.ip_address)
+
+    def save(self, *args, **kwargs):
+        # Sincronizar fecha y hora con fecha_hora para compatibilidad
+        self.sync_legacy_fields()
         super().save(*args, **kwargs)
     
     @classmethod
@@ -140,6 +144,12 @@ class HistorialActividad(TimeStampedModel):
         """
         Método helper para registrar actividades fácilmente.
         Extrae usuario, IP y user_agent directamente del objeto request.
+        request puede ser None (comandos, procesos internos).
+        
+        El registro se entrega al escritor asíncrono (apps.audit.writer):
+        la inserción ocurre fuera del request, en lotes, y no se revierte
+        con la transacción del request. Si settings AUDIT_WRITER['ASYNC']
+        es False se inserta en el momento.
         
         Uso:
             HistorialActividad.log_activity(
@@ -151,7 +161,7 @@ class HistorialActividad(TimeStampedModel):
         """
         # El middleware ya nos da la IP correcta en request.client_ip
         ip_address = getattr(request, 'client_ip', None)
-        user_agent = request.META.get('HTTP_USER_AGENT')
+        user_agent = request.META.get('HTTP_USER_AGENT') if request is not None else None
         
         # Si no se pasa un usuario explícitamente, intenta obtenerlo del request
         if usuario is None and hasattr(request, 'user') and request.user.is_authenticated:
@@ -159,7 +169,9 @@ class HistorialActividad(TimeStampedModel):
         else:
             usuario_obj = usuario
 
-        return cls.objects.create(
+        from apps.audit.writer import get_audit_writer
+
+        return get_audit_writer().submit(cls(
             usuario=usuario_obj,
             tipo_accion=tipo_accion,
             accion=accion,
@@ -168,4 +180,4 @@ class HistorialActividad(TimeStampedModel):
             ip_address=ip_address,
             user_agent=user_agent,
             datos_adicionales=datos_adicionales or {},
-        )
+        ))
@@ -0,0 +1,364 @@
+"""
+Particionado mensual y retención de la Bitácora (historial_actividad)
+
+PostgreSQL:
+    La tabla se convierte (una sola vez, con `audit_retention --setup`) en una
+    tabla particionada por RANGE (fecha_hora), con una partición por mes
+    (historial_actividad_pYYYY_MM) y una partición DEFAULT. Las consultas con
+    rango de fechas solo leen las particiones de esos meses (partition pruning)
+    y retirar un mes es un DETACH + DROP, sin DELETE masivo.
+
+Otros motores (SQLite):
+    No hay particiones. Retirar un mes exporta sus filas desde la tabla
+    caliente y las borra en la misma transacción; con keep_detached antes se
+    copian a la tabla historial_actividad_archivo.
+
+En ambos casos el mes retirado se exporta a un JSONL comprimido
+(historial_actividad_YYYY_MM.jsonl.gz) antes de eliminarse. El archivo se
+publica recién al confirmarse la transacción.
+
+Los límites de mes se calculan en UTC.
+"""
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+
+TABLE = 'historial_actividad'
+ARCHIVE_TABLE = 'historial_actividad_archivo'
+DEFAULT_PARTITION = f'{TABLE}_default'
+EXPORT_CHUNK_SIZE = 2000
+
+
+# ==========================================
+# MESES
+# ==========================================
+
+def month_start(year, month):
+    """Primer instante (UTC) del mes."""
+    return datetime(year, month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(year, month, delta):
+    """Suma `delta` meses a (year, month)."""
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
+
+
+def month_bounds(year, month):
+    """Retorna (inicio, fin) del mes: [inicio, fin)."""
+    return month_start(year, month), month_start(*add_months(year, month, 1))
+
+
+def iter_months(start, end):
+    """Itera (year, month) desde `start` hasta `end` inclusive (tuplas year, month)."""
+    current = start
+    while current <= end:
+        yield current
+        current = add_months(*current, 1)
+
+
+def partition_name(year, month):
+    return f'{TABLE}_p{year:04d}_{month:02d}'
+
+
+def _db_value(value):
+    """Adapta un datetime al formato que espera el motor en SQL crudo."""
+    return connection.ops.adapt_datetimefield_value(value)
+
+
+# ==========================================
+# POSTGRESQL: PARTICIONES
+# ==========================================
+
+def is_postgresql():
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned():
+    """True si historial_actividad ya es una tabla particionada (solo PostgreSQL)."""
+    if not is_postgresql():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def existing_partitions():
+    """Retorna {(year, month): nombre} de las particiones mensuales existentes."""
+    if not is_postgresql():
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    prefix = f'{TABLE}_p'
+    partitions = {}
+    for name in names:
+        if not name.startswith(prefix):
+            continue
+        try:
+            year, month = name[len(prefix):].split('_')
+            partitions[(int(year), int(month))] = name
+        except ValueError:
+            continue
+    return partitions
+
+
+def create_month_partition(year, month):
+    """Crea la partición del mes si no existe."""
+    start, end = month_bounds(year, month)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS "{partition_name(year, month)}" '
+            f'PARTITION OF "{TABLE}" FOR VALUES FROM (%s) TO (%s)',
+            [start, end],
+        )
+
+
+def ensure_future_partitions(months_ahead=3, now=None):
+    """
+    Crea las particiones del mes actual y de los `months_ahead` siguientes.
+    Retorna la lista de meses creados.
+    """
+    now = now or datetime.now(dt_timezone.utc)
+    existing = existing_partitions()
+    created = []
+    for year, month in iter_months((now.year, now.month), add_months(now.year, now.month, months_ahead)):
+        if (year, month) not in existing:
+            create_month_partition(year, month)
+            created.append((year, month))
+    return created
+
+
+@transaction.atomic
+def convert_to_partitioned(months_ahead=3):
+    """
+    Convierte historial_actividad en tabla particionada por mes.
+
+    - La PK pasa a ser (id, fecha_hora): PostgreSQL exige que la clave de
+      partición forme parte de toda restricción única. Django sigue usando `id`.
+    - El id pasa de IDENTITY a una secuencia propia (IDENTITY no se admite en
+      tablas particionadas antes de PostgreSQL 17).
+    - Se recrean los índices y la FK a usuario con los mismos nombres.
+    """
+    if not is_postgresql():
+        raise RuntimeError("El particionado nativo solo está disponible en PostgreSQL.")
+    if is_partitioned():
+        return False
+
+    legacy = f'{TABLE}_legacy'
+    sequence = f'{TABLE}_part_id_seq'
+
+    with connection.cursor() as cursor:
+        # Definiciones de índices y FKs de la tabla original
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s "
+            "AND indexname NOT IN (SELECT conname FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('p', 'u'))",
+            [TABLE, TABLE],
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT MIN(fecha_hora), MAX(id) FROM "{TABLE}"')
+        min_fecha, max_id = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{legacy}"')
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{legacy}" INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE (fecha_hora)'
+        )
+        cursor.execute(f'CREATE SEQUENCE "{sequence}" OWNED BY "{TABLE}".id')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ALTER COLUMN id SET DEFAULT nextval(%s)', [sequence])
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, fecha_hora)')
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+
+        now = datetime.now(dt_timezone.utc)
+        first = (min_fecha.year, min_fecha.month) if min_fecha else (now.year, now.month)
+        for year, month in iter_months(first, add_months(now.year, now.month, months_ahead)):
+            create_month_partition(year, month)
+
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{legacy}"')
+        if max_id:
+            cursor.execute('SELECT setval(%s, %s)', [sequence, max_id])
+        cursor.execute(f'DROP TABLE "{legacy}"')
+
+        # Las definiciones se leyeron antes del RENAME: ya apuntan a la tabla nueva
+        for index_def in index_defs:
+            cursor.execute(index_def)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+
+    return True
+
+
+# ==========================================
+# RETENCIÓN
+# ==========================================
+
+def months_with_data_before(cutoff):
+    """
+    Meses (year, month) con registros anteriores a `cutoff` (inicio de mes, UTC).
+    """
+    if is_partitioned():
+        months = sorted(m for m in existing_partitions() if month_start(*m) < cutoff)
+        # Filas que hayan caído en la partición DEFAULT
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT DISTINCT EXTRACT(YEAR FROM fecha_hora AT TIME ZONE \'UTC\'), '
+                f'EXTRACT(MONTH FROM fecha_hora AT TIME ZONE \'UTC\') '
+                f'FROM "{DEFAULT_PARTITION}" WHERE fecha_hora < %s',
+                [cutoff],
+            )
+            months.extend((int(y), int(m)) for y, m in cursor.fetchall())
+        return sorted(set(months))
+
+    from apps.audit.models import HistorialActividad
+
+    return [
+        (d.year, d.month)
+        for d in HistorialActividad.objects.filter(fecha_hora__lt=cutoff)
+        .datetimes('fecha_hora', 'month', tzinfo=dt_timezone.utc)
+    ]
+
+
+def _detach_month(year, month):
+    """
+    Separa las filas del mes y retorna (tabla, filtro, params) desde donde
+    exportarlas. Sin particiones no mueve nada: se exportan desde la tabla
+    caliente y _retire() las borra después, así un mes ya archivado (aunque
+    se conserve con keep_detached) no se vuelve a exportar.
+    """
+    start, end = month_bounds(year, month)
+    params = [_db_value(start), _db_value(end)]
+    where = 'fecha_hora >= %s AND fecha_hora < %s'
+
+    if is_partitioned():
+        name = existing_partitions().get((year, month))
+        with connection.cursor() as cursor:
+            if name:
+                cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+                return name, None, []
+            # Mes sin partición: sus filas están en DEFAULT
+            staging = partition_name(year, month) + '_detached'
+            cursor.execute(
+                f'CREATE TABLE "{staging}" AS SELECT * FROM "{DEFAULT_PARTITION}" WHERE {where}', params
+            )
+            cursor.execute(f'DELETE FROM "{DEFAULT_PARTITION}" WHERE {where}', params)
+            return staging, None, []
+
+    return TABLE, where, params
+
+
+def _export_rows(table, where, params, path):
+    """Escribe las filas en un JSONL gzip nuevo (lo reemplaza). Retorna cuántas escribió."""
+    sql = f'SELECT * FROM "{table}"'
+    if where:
+        sql += f' WHERE {where}'
+    sql += ' ORDER BY fecha_hora, id'
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8') as fh, connection.chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [col[0] for col in cursor.description]
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                record = dict(zip(columns, row))
+                if isinstance(record.get('datos_adicionales'), str):
+                    try:
+                        record['datos_adicionales'] = json.loads(record['datos_adicionales'])
+                    except ValueError:
+                        pass
+                fh.write(json.dumps(record, default=str, ensure_ascii=False))
+                fh.write('\n')
+                count += 1
+    return count
+
+
+def _publish(tmp_path, path):
+    """
+    Mueve el export temporal a su ruta final con os.replace (atómico). Si el
+    mes ya tenía archivo (filas que llegaron después de archivarlo) se agrega
+    como un miembro gzip más, armando la copia completa aparte para no dejar
+    el archivo existente a medio escribir. Si falla, el temporal queda en el
+    directorio: sus filas ya se borraron de la base de datos.
+    """
+    if not os.path.exists(path):
+        os.replace(tmp_path, path)
+        return
+    merged = path + '.merge'
+    with open(merged, 'wb') as out:
+        for src in (path, tmp_path):
+            with open(src, 'rb') as fh:
+                shutil.copyfileobj(fh, out)
+    os.replace(merged, path)
+    os.remove(tmp_path)
+
+
+def _retire(table, where, params, keep_detached=False):
+    """Elimina lo exportado: la partición separada o las filas del mes en la tabla caliente."""
+    with connection.cursor() as cursor:
+        if where is None:
+            if not keep_detached:
+                cursor.execute(f'DROP TABLE "{table}"')
+            return
+        if keep_detached:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{ARCHIVE_TABLE}" AS SELECT * FROM "{table}" WHERE 1 = 0'
+            )
+            cursor.execute(f'INSERT INTO "{ARCHIVE_TABLE}" SELECT * FROM "{table}" WHERE {where}', params)
+        cursor.execute(f'DELETE FROM "{table}" WHERE {where}', params)
+
+
+def archive_month(year, month, archive_dir, keep_detached=False):
+    """
+    Retira un mes de la tabla caliente: lo separa (DETACH o mover a la tabla
+    de archivo), lo exporta a JSONL gzip y lo elimina.
+
+    El export se escribe en un archivo temporal que se publica al confirmar
+    la transacción (on_commit): si algo falla antes, las filas siguen en la
+    tabla, el temporal se descarta y volver a correrlo no duplica registros.
+
+    Returns:
+        tuple: (ruta del archivo, filas exportadas)
+    """
+    path = os.path.join(archive_dir, f'{TABLE}_{year:04d}_{month:02d}.jsonl.gz')
+    os.makedirs(archive_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=archive_dir, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        with transaction.atomic():
+            table, where, params = _detach_month(year, month)
+            count = _export_rows(table, where, params, tmp_path)
+            _retire(table, where, params, keep_detached)
+            if count:
+                transaction.on_commit(lambda: _publish(tmp_path, path))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    if not count:
+        os.remove(tmp_path)
+    return path, count
@@ -0,0 +1,204 @@
+"""
+Búsqueda de texto completo en la Bitácora (parámetro `q`)
+
+PostgreSQL:
+    Índice GIN de expresión sobre un tsvector ('spanish') de accion,
+    descripcion, user_agent y los valores (texto y números) de
+    datos_adicionales. PostgreSQL lo mantiene solo; la consulta repite la
+    misma expresión para que el planner use el índice. Orden: ts_rank.
+
+SQLite:
+    Tabla FTS5 historial_actividad_fts (rowid = id) sincronizada con
+    triggers, así que también cubre los INSERT por lotes del escritor
+    asíncrono (bulk_create no dispara señales). Orden: bm25.
+
+Otros motores o sin índice instalado: se mantiene la búsqueda con icontains.
+
+Cada palabra de `q` se busca como prefijo y todas deben aparecer (AND).
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+TABLE = 'historial_actividad'
+FTS_TABLE = 'historial_actividad_fts'
+PG_INDEX = 'historial_actividad_fts_idx'
+PG_CONFIG = 'spanish'
+MAX_TERMS = 8
+
+# Debe coincidir exactamente con la expresión del índice GIN
+PG_DOCUMENT = (
+    f"(to_tsvector('{PG_CONFIG}', coalesce({TABLE}.accion, '') || ' ' || "
+    f"coalesce({TABLE}.descripcion, '') || ' ' || coalesce({TABLE}.user_agent, '')) || "
+    f"jsonb_to_tsvector('{PG_CONFIG}', coalesce({TABLE}.datos_adicionales, '{{}}'::jsonb), "
+    f"'[\"string\", \"numeric\"]'))"
+)
+
+# Valores de datos_adicionales aplanados (SQLite JSON1)
+_SQLITE_JSON_VALUES = (
+    "(SELECT group_concat(value, ' ') FROM json_tree({row}.datos_adicionales) "
+    "WHERE type IN ('text', 'integer', 'real'))"
+)
+
+_SQLITE_NEW_VALUES = (
+    f"new.id, new.accion, new.descripcion, new.user_agent, {_SQLITE_JSON_VALUES.format(row='new')}"
+)
+_SQLITE_INSERT_TRIGGER = (
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, accion, descripcion, user_agent, datos) VALUES ({_SQLITE_NEW_VALUES}); END"
+)
+
+_fts_available = {}
+
+
+def search_terms(q):
+    """Palabras de búsqueda normalizadas (solo caracteres de palabra)."""
+    return re.findall(r'\w+', (q or '').lower())[:MAX_TERMS]
+
+
+# ==========================================
+# INSTALACIÓN (migraciones)
+# ==========================================
+
+def install(conn):
+    """Crea el índice de búsqueda según el motor de `conn`."""
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {PG_INDEX} ON {TABLE} USING GIN ({PG_DOCUMENT})')
+        elif conn.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"accion, descripcion, user_agent, datos, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(_SQLITE_INSERT_TRIGGER)
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN "
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {TABLE} BEGIN "
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; "
+                f"INSERT INTO {FTS_TABLE}(rowid, accion, descripcion, user_agent, datos) VALUES ({_SQLITE_NEW_VALUES}); END"
+            )
+    rebuild(conn)
+
+
+def uninstall(conn):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(f'DROP INDEX IF EXISTS {PG_INDEX}')
+        elif conn.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    _fts_available.clear()
+
+
+def rebuild(conn=None):
+    """SQLite: vuelve a llenar la tabla FTS5 desde historial_actividad."""
+    conn = conn or connection
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, accion, descripcion, user_agent, datos) "
+            f"SELECT id, accion, descripcion, user_agent, {_SQLITE_JSON_VALUES.format(row=TABLE)} FROM {TABLE}"
+        )
+
+
+@contextmanager
+def deferred_indexing(conn=None):
+    """
+    SQLite, cargas masivas: sin el trigger de INSERT durante el bloque; al
+    salir indexa de una sola vez las filas nuevas (id mayor al máximo previo)
+    y vuelve a crear el trigger. En otros motores no hace nada.
+    """
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        activo = conn.vendor == 'sqlite' and _trigger_exists(cursor)
+        if activo:
+            cursor.execute(f'SELECT coalesce(max(id), 0) FROM {TABLE}')
+            ultimo_id = cursor.fetchone()[0]
+            cursor.execute(f'DROP TRIGGER {FTS_TABLE}_ai')
+    try:
+        yield
+    finally:
+        if activo:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE}(rowid, accion, descripcion, user_agent, datos) "
+                    f"SELECT id, accion, descripcion, user_agent, {_SQLITE_JSON_VALUES.format(row=TABLE)} "
+                    f"FROM {TABLE} WHERE id > %s",
+                    [ultimo_id],
+                )
+                cursor.execute(_SQLITE_INSERT_TRIGGER)
+
+
+def _trigger_exists(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = %s", [f'{FTS_TABLE}_ai'])
+    return cursor.fetchone() is not None
+
+
+def sqlite_fts_available():
+    key = connection.settings_dict.get('NAME')
+    if key not in _fts_available:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            _fts_available[key] = cursor.fetchone() is not None
+    return _fts_available[key]
+
+
+# ==========================================
+# CONSULTA
+# ==========================================
+
+def apply_search(queryset, q):
+    """
+    Filtra la bitácora por `q`.
+
+    Returns:
+        tuple: (queryset, orden por relevancia o None si no hay ranking)
+    """
+    terms = search_terms(q)
+    if not terms:
+        # Solo signos: no hay palabras que indexar
+        return _contains(queryset, q), None
+
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        query_sql = f"to_tsquery('{PG_CONFIG}', %s)"
+        queryset = queryset.filter(
+            RawSQL(f'{PG_DOCUMENT} @@ {query_sql}', [tsquery], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f'ts_rank({PG_DOCUMENT}, {query_sql})', [tsquery], output_field=FloatField())
+        )
+        return queryset, '-search_rank'
+
+    if connection.vendor == 'sqlite' and sqlite_fts_available():
+        match = ' '.join(f'"{term}"*' for term in terms)
+        queryset = queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        ).annotate(
+            # bm25: menor = más relevante
+            search_rank=RawSQL(
+                f'(SELECT bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = {TABLE}.id)',
+                [match], output_field=FloatField(),
+            )
+        )
+        return queryset, 'search_rank'
+
+    return _contains(queryset, q), None
+
+
+def _contains(queryset, q):
+    return queryset.filter(
+        Q(accion__icontains=q)
+        | Q(descripcion__icontains=q)
+        | Q(user_agent__icontains=q)
+        | Q(datos_adicionales__icontains=q)
+    )
@@ -1,3 +1,351 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import partitioning, search, writer
+from apps.users.models import User
+from .models import HistorialActividad
+
+
+class ArchiveMonthTests(TestCase):
+    """Retirar un mes de la bitácora no duplica registros al reintentarlo."""
+
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir, ignore_errors=True)
+        fecha = datetime(2020, 1, 15, 12, tzinfo=dt_timezone.utc)
+        for i in range(3):
+            HistorialActividad.objects.create(accion=f'accion {i}', fecha_hora=fecha)
+
+    def _lineas(self, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as fh:
+            return fh.read().splitlines()
+
+    def _archivar(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return partitioning.archive_month(2020, 1, self.archive_dir, **kwargs)
+
+    def test_reintento_tras_fallo_no_duplica(self):
+        path = os.path.join(self.archive_dir, 'historial_actividad_2020_01.jsonl.gz')
+        with mock.patch.object(partitioning, '_retire', side_effect=DatabaseError('falla')):
+            with self.assertRaises(DatabaseError):
+                self._archivar()
+        self.assertEqual(os.listdir(self.archive_dir), [])
+        self.assertEqual(HistorialActividad.objects.count(), 3)
+
+        path, count = self._archivar()
+        self.assertEqual(count, 3)
+        self.assertEqual(len(self._lineas(path)), 3)
+        self.assertEqual(HistorialActividad.objects.count(), 0)
+
+    def test_publica_al_confirmar(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            path, _ = partitioning.archive_month(2020, 1, self.archive_dir)
+        # Sin commit no hay archivo: si la transacción fallara, las filas seguirían en la tabla
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(os.listdir(self.archive_dir), [os.path.basename(path)])
+
+    def test_filas_tardias_se_agregan_al_archivo(self):
+        path, _ = self._archivar()
+        HistorialActividad.objects.create(
+            accion='tardía', fecha_hora=datetime(2020, 1, 20, tzinfo=dt_timezone.utc)
+        )
+        self._archivar()
+        self.assertEqual(len(self._lineas(path)), 4)
+
+    def test_keep_detached_no_reexporta(self):
+        path, count = self._archivar(keep_detached=True)
+        self.assertEqual(count, 3)
+        path, count = self._archivar(keep_detached=True)
+        self.assertEqual(count, 0)
+        self.assertEqual(len(self._lineas(path)), 3)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM "{partitioning.ARCHIVE_TABLE}"')
+            self.assertEqual(cursor.fetchone()[0], 3)
+
+
+class AuditWriterTests(SimpleTestCase):
+    """Cola y lotes del escritor de bitácora (la inserción se reemplaza por una lista)."""
+
+    def _writer(self, iniciar=True, **kwargs):
+        opciones = {'batch_size': 3, 'flush_interval': 10, 'max_queue_size': 100, **kwargs}
+        audit_writer = writer.AuditWriter(**opciones)
+        audit_writer.lotes = []
+        audit_writer._write = lambda batch: audit_writer.lotes.append([e.accion for e in batch])
+        if not iniciar:
+            # Sin hilo consumidor la cola solo crece
+            audit_writer._ensure_started = lambda: None
+        else:
+            self.addCleanup(audit_writer.shutdown)
+        return audit_writer
+
+    def _enviar(self, audit_writer, *acciones):
+        for accion in acciones:
+            audit_writer.submit(HistorialActividad(accion=accion))
+
+    def _esperar(self, condicion, timeout=2):
+        limite = time.monotonic() + timeout
+        while not condicion() and time.monotonic() < limite:
+            time.sleep(0.01)
+        return condicion()
+
+    def test_lote_completo_se_escribe_sin_esperar_el_intervalo(self):
+        audit_writer = self._writer()
+        self._enviar(audit_writer, 'a', 'b', 'c', 'd')
+        self.assertTrue(self._esperar(lambda: audit_writer.lotes))
+        # 'd' espera su lote o el intervalo
+        self.assertEqual(audit_writer.lotes, [['a', 'b', 'c']])
+
+    def test_intervalo_vencido_escribe_lote_parcial(self):
+        audit_writer = self._writer(batch_size=100, flush_interval=0.05)
+        self._enviar(audit_writer, 'a', 'b')
+        self.assertTrue(audit_writer.flush(timeout=2))
+        self.assertEqual(audit_writer.lotes, [['a', 'b']])
+
+    def test_cola_llena_sync(self):
+        audit_writer = self._writer(iniciar=False, max_queue_size=2, overflow_policy='sync')
+        self._enviar(audit_writer, 'a', 'b', 'c')
+        # El tercero lo escribe el hilo del request
+        self.assertEqual(audit_writer.lotes, [['c']])
+        self.assertEqual(audit_writer.dropped, 0)
+        audit_writer.flush()
+        self.assertEqual(audit_writer.lotes, [['c'], ['a', 'b']])
+
+    def test_cola_llena_drop_oldest(self):
+        audit_writer = self._writer(iniciar=False, max_queue_size=2, overflow_policy='drop_oldest')
+        with self.assertLogs('apps.audit.writer', 'WARNING'):
+            self._enviar(audit_writer, 'a', 'b', 'c')
+        self.assertEqual(audit_writer.dropped, 1)
+        audit_writer.flush()
+        self.assertEqual(audit_writer.lotes, [['b', 'c']])
+
+    def test_cola_llena_drop_newest(self):
+        audit_writer = self._writer(iniciar=False, max_queue_size=2, overflow_policy='drop_newest')
+        with self.assertLogs('apps.audit.writer', 'WARNING'):
+            self._enviar(audit_writer, 'a', 'b', 'c')
+        self.assertEqual(audit_writer.dropped, 1)
+        audit_writer.flush()
+        self.assertEqual(audit_writer.lotes, [['a', 'b']])
+
+    def test_politica_invalida(self):
+        with self.assertRaises(ValueError):
+            writer.AuditWriter(overflow_policy='ignorar')
+
+    def test_shutdown_escribe_lo_pendiente(self):
+        with mock.patch.object(writer.atexit, 'register') as register:
+            audit_writer = self._writer(batch_size=100)
+            self._enviar(audit_writer, 'a', 'b')
+        register.assert_called_once_with(audit_writer.shutdown)
+
+        audit_writer.shutdown()
+        self.assertFalse(audit_writer._thread.is_alive())
+        self.assertEqual(audit_writer.lotes, [['a', 'b']])
+
+
+class AuditWriterSettingsTests(TestCase):
+    """AUDIT_WRITER['ASYNC'] False: inserción en el momento, dentro de la transacción."""
+
+    def test_modo_sincrono(self):
+        self.assertFalse(writer.get_audit_writer().enabled)
+        entrada = HistorialActividad.log_activity(request=None, tipo_accion='other', accion='sync')
+        self.assertIsNotNone(entrada.pk)
+
+    def test_override_recrea_el_escritor(self):
+        anterior = writer.get_audit_writer()
+        with override_settings(AUDIT_WRITER={'ASYNC': False, 'BATCH_SIZE': 7}):
+            self.assertIsNot(writer.get_audit_writer(), anterior)
+            self.assertEqual(writer.get_audit_writer().batch_size, 7)
+        self.assertEqual(writer.get_audit_writer().batch_size, anterior.batch_size)
+
+
+class AuditCursorPaginationTests(TestCase):
+    """GET /api/audit/logs/?cursor=: keyset sobre (fecha_hora, id)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', email='admin@gym.com', password='Admin1234!')
+        cls.base = datetime(2024, 5, 1, 10, tzinfo=dt_timezone.utc)
+        # Siete empates en fecha_hora: el id decide el orden
+        for i in range(7):
+            HistorialActividad.objects.create(accion=f'empate {i}', fecha_hora=cls.base)
+        for i in range(3):
+            HistorialActividad.objects.create(accion=f'después {i}', fecha_hora=cls.base + timedelta(minutes=i + 1))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _pagina(self, url='/api/audit/logs/', **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def _recorrer(self, **params):
+        paginas = []
+        data = self._pagina(cursor='', page_size=3, **params)
+        while True:
+            paginas.append([fila['id'] for fila in data['results']])
+            if not data['next']:
+                return paginas
+            data = self._pagina(data['next'])
+
+    def _esperado(self, *orden):
+        return list(HistorialActividad.objects.order_by(*orden).values_list('id', flat=True))
+
+    def test_desempata_por_id_sin_repetir_ni_saltear(self):
+        paginas = self._recorrer()
+        self.assertEqual([len(p) for p in paginas], [3, 3, 3, 1])
+        self.assertEqual(sum(paginas, []), self._esperado('-fecha_hora', '-id'))
+
+        paginas = self._recorrer(ordering='fecha_hora')
+        self.assertEqual(sum(paginas, []), self._esperado('fecha_hora', 'id'))
+
+    def test_estable_con_filas_nuevas(self):
+        primera = self._pagina(cursor='', page_size=3)
+        # Una fila nueva al principio no corre las páginas siguientes
+        HistorialActividad.objects.create(accion='nueva', fecha_hora=self.base + timedelta(hours=1))
+        segunda = self._pagina(primera['next'])
+        esperado = [i for i in self._esperado('-fecha_hora', '-id') if i not in [f['id'] for f in primera['results']]]
+        self.assertEqual([f['id'] for f in segunda['results']], esperado[1:4])
+
+    def test_pagina_anterior(self):
+        primera = self._pagina(cursor='', page_size=3)
+        self.assertIsNone(primera['previous'])
+        self.assertNotIn('count', primera)
+        segunda = self._pagina(primera['next'])
+        anterior = self._pagina(segunda['previous'])
+        self.assertEqual(anterior['results'], primera['results'])
+        self.assertIsNone(anterior['previous'])
+
+    def test_cursor_invalido(self):
+        self.assertEqual(self.client.get('/api/audit/logs/', {'cursor': 'no-es-un-cursor'}).status_code, 404)
+
+
+class AuditSearchTests(TestCase):
+    """Parámetro q de la bitácora: índice de texto completo (FTS5 en SQLite, GIN en PostgreSQL)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.login = HistorialActividad.objects.create(
+            accion='Inicio de sesión', descripcion='Ingreso desde recepción', tipo_accion='login'
+        )
+        cls.cliente = HistorialActividad.objects.create(
+            accion='Crear cliente', descripcion='Alta de cliente', tipo_accion='create_client',
+            datos_adicionales={'ci': '4455667', 'nombre': 'Valeria'},
+        )
+        cls.pago = HistorialActividad.objects.create(
+            accion='Registrar pago', descripcion='Pago de membresía mensual', tipo_accion='other',
+            user_agent='Mozilla/5.0 Firefox',
+        )
+
+    def setUp(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest(f'Sin índice de texto completo para {connection.vendor}')
+
+    def _buscar(self, q):
+        queryset, orden = search.apply_search(HistorialActividad.objects.all(), q)
+        self.assertIsNotNone(orden)
+        return set(queryset.values_list('id', flat=True))
+
+    def test_prefijos_y_todas_las_palabras(self):
+        self.assertEqual(self._buscar('sesi'), {self.login.pk})
+        self.assertEqual(self._buscar('cliente alta'), {self.cliente.pk})
+        self.assertEqual(self._buscar('cliente pago'), set())
+        self.assertEqual(self._buscar('firefox'), {self.pago.pk})
+
+    def test_valores_de_datos_adicionales(self):
+        self.assertEqual(self._buscar('4455667'), {self.cliente.pk})
+        self.assertEqual(self._buscar('valeria'), {self.cliente.pk})
+
+    def test_actualizar_y_borrar_mantienen_el_indice(self):
+        HistorialActividad.objects.filter(pk=self.pago.pk).update(accion='Anular pago', descripcion='Reembolso')
+        self.assertEqual(self._buscar('reembolso'), {self.pago.pk})
+        self.assertEqual(self._buscar('mensual'), set())
+
+        HistorialActividad.objects.filter(pk=self.cliente.pk).delete()
+        self.assertEqual(self._buscar('valeria'), set())
+        if connection.vendor == 'sqlite':
+            # El trigger de DELETE saca la fila de la tabla FTS5 (no solo del resultado)
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT rowid FROM {search.FTS_TABLE} WHERE rowid = %s', [self.cliente.pk])
+                self.assertIsNone(cursor.fetchone())
+
+    def test_orden_por_relevancia(self):
+        HistorialActividad.objects.create(accion='Pago', descripcion='Pago pago pago', tipo_accion='other')
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser(username='admin', email='admin@gym.com'))
+        resultados = client.get('/api/audit/logs/', {'q': 'pago'}).data['results']
+        self.assertEqual(len(resultados), 2)
+        self.assertEqual(resultados[0]['descripcion'], 'Pago pago pago')
+
+
+class AuditExportTests(TestCase):
+    """GET /api/audit/logs/export/: contenido CSV/JSONL y mismos filtros que el listado."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', email='admin@gym.com', password='Admin1234!')
+        fecha = datetime(2024, 3, 10, 9, tzinfo=dt_timezone.utc)
+        cls.login = HistorialActividad.objects.create(
+            usuario=cls.admin, accion='Inicio de sesión', tipo_accion='login', nivel='info', fecha_hora=fecha
+        )
+        cls.error = HistorialActividad.objects.create(
+            accion='Falla, "pago"', tipo_accion='other', nivel='error', fecha_hora=fecha + timedelta(days=1),
+            datos_adicionales={'monto': 150, 'nota': 'ñandú'},
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _exportar(self, **params):
+        response = self.client.get('/api/audit/logs/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv(self):
+        # Sin date_to la propia exportación (registrada antes de transmitir) entra en el archivo
+        response, contenido = self._exportar(date_to='2024-03-31')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment; filename="bitacora_', response['Content-Disposition'])
+        self.assertTrue(contenido.startswith('﻿'))
+
+        filas = list(csv.DictReader(io.StringIO(contenido.lstrip('﻿'))))
+        self.assertEqual([int(f['id']) for f in filas], [self.error.pk, self.login.pk])
+        self.assertEqual(filas[0]['accion'], 'Falla, "pago"')
+        self.assertEqual(json.loads(filas[0]['datos_adicionales']), {'monto': 150, 'nota': 'ñandú'})
+        self.assertEqual(filas[1]['usuario'], 'admin')
+
+    def test_jsonl_con_filtros(self):
+        response, contenido = self._exportar(formato='jsonl', nivel='error')
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        filas = [json.loads(linea) for linea in contenido.splitlines()]
+        self.assertEqual([f['id'] for f in filas], [self.error.pk])
+        self.assertEqual(filas[0]['datos_adicionales']['nota'], 'ñandú')
+
+        _, contenido = self._exportar(formato='jsonl', date_to='2024-03-10', ordering='fecha_hora')
+        self.assertEqual([json.loads(linea)['id'] for linea in contenido.splitlines()], [self.login.pk])
+
+    def test_registra_la_exportacion(self):
+        self._exportar(formato='jsonl', tipo_accion='login')
+        entrada = HistorialActividad.objects.get(accion='Exportar bitácora')
+        self.assertEqual(
+            entrada.datos_adicionales, {'formato': 'jsonl', 'filtros': {'formato': 'jsonl', 'tipo_accion': 'login'}}
+        )
+
+    def test_formato_invalido(self):
+        self.assertEqual(self.client.get('/api/audit/logs/export/', {'formato': 'xml'}).status_code, 400)
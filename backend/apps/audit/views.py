@@ -1,9 +1,13 @@
-from django.db.models import Q
+import csv
+import json
+from datetime import datetime, time
+
+from django.utils import timezone
 from django.utils.dateparse import parse_datetime, parse_date
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.contrib.auth import get_user_model
 
-from rest_framework import permissions
+from rest_framework import permissions, status
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
@@ -13,11 +17,33 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
 from apps.audit.models import HistorialActividad as Bitacora
+from apps.audit.search import apply_search
 from apps.audit.serializers import BitacoraSerializer
 from apps.roles.models import UserRole
+from apps.core.pagination import CursorPaginationMixin, KeysetPagination
 from apps.core.permissions import HasPermission, PermissionCodes
 
 
+def parse_date_bound(value, end_of_day=False):
+    """
+    Convierte date_from/date_to (date o datetime ISO) en un datetime aware.
+    Con solo fecha, date_to incluye el día completo (23:59:59.999999).
+    """
+    if not value:
+        return None
+    # parse_date primero: parse_datetime también acepta "YYYY-MM-DD" (medianoche)
+    d = parse_date(value)
+    if d is not None:
+        dt = datetime.combine(d, time.max if end_of_day else time.min)
+    else:
+        dt = parse_datetime(value)
+        if dt is None:
+            return None
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
 # --- Paginación por defecto (20 por página) ---
 class AuditPagination(PageNumberPagination):
     page_size = 20
@@ -25,27 +51,46 @@ class AuditPagination(PageNumberPagination):
     max_page_size = 100
 
 
+# --- Paginación por cursor (?cursor=): keyset sobre (fecha_hora, id), sin COUNT ---
+class AuditCursorPagination(KeysetPagination):
+    page_size = 20
+    ordering = ("-fecha_hora", "-id")
+
+    def get_ordering(self, request, queryset, view=None):
+        if request.query_params.get("ordering") == "fecha_hora":
+            return ("fecha_hora", "id")
+        return self.ordering
+
+
+# --- Filtros compartidos por el listado y la exportación ---
+AUDIT_FILTER_PARAMETERS = [
+    OpenApiParameter("user_id", OpenApiTypes.INT, OpenApiParameter.QUERY, description="Filtra por ID de usuario"),
+    OpenApiParameter("username", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Filtra por username de usuario"),
+    OpenApiParameter("email", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Filtra por email de usuario"),
+    OpenApiParameter("tipo_accion", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Exacto. Ej: login, logout, create_role..."),
+    OpenApiParameter("nivel", OpenApiTypes.STR, OpenApiParameter.QUERY, description="info | warning | error | critical"),
+    OpenApiParameter("ip", OpenApiTypes.STR, OpenApiParameter.QUERY, description="IP exacta o parte"),
+    OpenApiParameter("date_from", OpenApiTypes.STR, OpenApiParameter.QUERY, description="ISO date/datetime (incluye)"),
+    OpenApiParameter("date_to", OpenApiTypes.STR, OpenApiParameter.QUERY, description="ISO date/datetime (incluye)"),
+    OpenApiParameter("q", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Búsqueda de texto completo (prefijos) en acción/descripcion/user_agent/datos_adicionales, ordenada por relevancia"),
+    OpenApiParameter("ordering", OpenApiTypes.STR, OpenApiParameter.QUERY, description="campo para ordenar (p.ej. -fecha_hora)"),
+]
+
+
 @extend_schema(
     tags=["Bitácora"],
-    parameters=[
-        OpenApiParameter("user_id", OpenApiTypes.INT, OpenApiParameter.QUERY, description="Filtra por ID de usuario"),
-        OpenApiParameter("username", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Filtra por username de usuario"),
-        OpenApiParameter("email", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Filtra por email de usuario"),
-        OpenApiParameter("tipo_accion", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Exacto. Ej: login, logout, create_role..."),
-        OpenApiParameter("nivel", OpenApiTypes.STR, OpenApiParameter.QUERY, description="info | warning | error | critical"),
-        OpenApiParameter("ip", OpenApiTypes.STR, OpenApiParameter.QUERY, description="IP exacta o parte"),
-        OpenApiParameter("date_from", OpenApiTypes.STR, OpenApiParameter.QUERY, description="ISO date/datetime (incluye)"),
-        OpenApiParameter("date_to", OpenApiTypes.STR, OpenApiParameter.QUERY, description="ISO date/datetime (incluye)"),
-        OpenApiParameter("q", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Búsqueda en acción/descripcion/user_agent/datos_adicionales"),
-        OpenApiParameter("ordering", OpenApiTypes.STR, OpenApiParameter.QUERY, description="campo para ordenar (p.ej. -fecha_hora)"),
+    parameters=AUDIT_FILTER_PARAMETERS + [
+        OpenApiParameter("cursor", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Paginación por cursor (vacío = primera página). Solo ordena por fecha_hora"),
     ],
 )
-class AuditLogListView(ListAPIView):
+class AuditLogListView(CursorPaginationMixin, ListAPIView):
     """
     GET /api/audit/logs/?q=&tipo_accion=&nivel=&user_id=&username=&email=&ip=&date_from=&date_to=&ordering=
+    GET /api/audit/logs/?cursor=   (paginación por cursor, sin total)
     """
     serializer_class = BitacoraSerializer
     pagination_class = AuditPagination
+    cursor_pagination_class = AuditCursorPagination
     permission_classes = [HasPermission]
     required_permission = PermissionCodes.AUDIT_VIEW
 
@@ -61,7 +106,7 @@ class AuditLogListView(ListAPIView):
         q = self.request.query_params.get("q")
         date_from = self.request.query_params.get("date_from")
         date_to = self.request.query_params.get("date_to")
-        ordering = self.request.query_params.get("ordering") or "-fecha_hora"
+        ordering = self.request.query_params.get("ordering")
 
         if user_id:
             qs = qs.filter(usuario_id=user_id)
@@ -75,32 +120,28 @@ class AuditLogListView(ListAPIView):
             qs = qs.filter(nivel=nivel)
         if ip:
             qs = qs.filter(ip_address__icontains=ip)
+        # búsqueda de texto completo (GIN/tsvector en PostgreSQL, FTS5 en SQLite)
+        rank_ordering = None
         if q:
-            qs = qs.filter(
-                Q(accion__icontains=q)
-                | Q(descripcion__icontains=q)
-                | Q(user_agent__icontains=q)
-                | Q(datos_adicionales__icontains=q)
-            )
-
-        # fechas (acepta date o datetime)
-        if date_from:
-            dt = parse_datetime(date_from) or parse_date(date_from)
-            if dt:
-                qs = qs.filter(fecha_hora__gte=dt)
-        if date_to:
-            dt = parse_datetime(date_to) or parse_date(date_to)
-            if dt:
-                # <= date_to 23:59:59 si es solo fecha
-                if hasattr(dt, "year") and not hasattr(dt, "hour"):
-                    from datetime import datetime, time
-                    dt = datetime.combine(dt, time.max)
-                qs = qs.filter(fecha_hora__lte=dt)
+            qs, rank_ordering = apply_search(qs, q)
+
+        # fechas (acepta date o datetime). Se filtra directamente sobre fecha_hora
+        # (clave de partición) con datetimes aware: en PostgreSQL particionado solo
+        # se leen las particiones de los meses del rango.
+        dt_from = parse_date_bound(date_from)
+        dt_to = parse_date_bound(date_to, end_of_day=True)
+        if dt_from:
+            qs = qs.filter(fecha_hora__gte=dt_from)
+        if dt_to:
+            qs = qs.filter(fecha_hora__lte=dt_to)
 
         # orden
         allowed_order = {"fecha_hora", "-fecha_hora", "nivel", "-nivel", "tipo_accion", "-tipo_accion", "id", "-id"}
         if ordering in allowed_order:
             qs = qs.order_by(ordering)
+        elif rank_ordering and not ordering:
+            # con q y sin orden explícito: más relevantes primero
+            qs = qs.order_by(rank_ordering, "-fecha_hora")
         else:
             qs = qs.order_by("-fecha_hora")
 
@@ -119,3 +160,87 @@ class AuditLogDetailView(RetrieveAPIView):
 
 
 
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: retorna la línea en lugar de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+EXPORT_COLUMNS = [
+    "id", "fecha_hora", "usuario", "tipo_accion", "accion", "descripcion",
+    "nivel", "ip_address", "user_agent", "datos_adicionales",
+]
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _export_row(log):
+    return {
+        "id": log.id,
+        "fecha_hora": log.fecha_hora.isoformat() if log.fecha_hora else None,
+        "usuario": log.usuario.username if log.usuario_id else None,
+        "tipo_accion": log.tipo_accion,
+        "accion": log.accion,
+        "descripcion": log.descripcion,
+        "nivel": log.nivel,
+        "ip_address": log.ip_address,
+        "user_agent": log.user_agent,
+        "datos_adicionales": log.datos_adicionales,
+    }
+
+
+@extend_schema(
+    tags=["Bitácora"],
+    parameters=AUDIT_FILTER_PARAMETERS + [
+        OpenApiParameter("formato", OpenApiTypes.STR, OpenApiParameter.QUERY, description="csv (por defecto) | jsonl"),
+    ],
+    responses={200: OpenApiTypes.BINARY},
+)
+class AuditLogExportView(AuditLogListView):
+    """
+    GET /api/audit/logs/export/?formato=csv|jsonl&<mismos filtros que el listado>
+
+    Descarga en streaming: recorre el queryset con iterator() (cursor del
+    servidor en PostgreSQL) y escribe fila por fila, así la memoria no crece
+    con la cantidad de registros.
+    """
+    pagination_class = None
+    cursor_pagination_class = None
+    required_permission = PermissionCodes.AUDIT_EXPORT
+
+    def get(self, request, *args, **kwargs):
+        formato = (request.query_params.get("formato") or "csv").lower()
+        if formato not in ("csv", "jsonl"):
+            return Response({"detail": "formato debe ser csv o jsonl"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = self.get_queryset().iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        stamp = timezone.now().strftime("%Y%m%d_%H%M%S")
+
+        if formato == "jsonl":
+            content = (json.dumps(_export_row(log), ensure_ascii=False, default=str) + "\n" for log in rows)
+            response = StreamingHttpResponse(content, content_type="application/x-ndjson; charset=utf-8")
+        else:
+            response = StreamingHttpResponse(self._csv_lines(rows), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="bitacora_{stamp}.{formato}"'
+
+        Bitacora.log_activity(
+            request=request,
+            usuario=request.user,
+            tipo_accion="other",
+            accion="Exportar bitácora",
+            descripcion=f"Exportación de bitácora en formato {formato}",
+            nivel="info",
+            datos_adicionales={"formato": formato, "filtros": request.query_params.dict()},
+        )
+        return response
+
+    def _csv_lines(self, rows):
+        writer = csv.writer(_Echo())
+        yield "\ufeff"  # BOM para que Excel lea UTF-8
+        yield writer.writerow(EXPORT_COLUMNS)
+        for log in rows:
+            row = _export_row(log)
+            row["datos_adicionales"] = json.dumps(row["datos_adicionales"], ensure_ascii=False)
+            yield writer.writerow([row[col] for col in EXPORT_COLUMNS])
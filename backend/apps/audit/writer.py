@@ -0,0 +1,277 @@
+"""
+Escritor asíncrono y por lotes de la Bitácora (HistorialActividad)
+
+Los registros se encolan en memoria y un hilo en segundo plano los inserta
+con bulk_create cuando se junta un lote (BATCH_SIZE) o pasa el intervalo
+(FLUSH_INTERVAL). Así la escritura de auditoría sale del camino crítico
+de cada request.
+
+El hilo escribe con su propia conexión: un registro encolado se guarda
+aunque después se revierta la transacción del request que lo generó (un
+intento fallido también queda en la bitácora). En modo síncrono, en cambio,
+se inserta dentro de esa transacción.
+
+Configuración (settings.AUDIT_WRITER):
+    ASYNC:           False -> inserción síncrona (tests, scripts)
+    BATCH_SIZE:      registros por bulk_create
+    FLUSH_INTERVAL:  segundos máximos que un registro espera en la cola
+    MAX_QUEUE_SIZE:  límite de memoria de la cola
+    OVERFLOW_POLICY: qué hacer con la cola llena
+                     "sync"        -> escribir en el hilo del request (no se pierde nada)
+                     "drop_oldest" -> descartar el registro más antiguo
+                     "drop_newest" -> descartar el registro nuevo
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ASYNC': True,
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 2.0,
+    'MAX_QUEUE_SIZE': 10000,
+    'OVERFLOW_POLICY': 'sync',
+}
+
+OVERFLOW_POLICIES = ('sync', 'drop_oldest', 'drop_newest')
+
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Cola en memoria + hilo consumidor que inserta registros de bitácora por lotes.
+    """
+
+    def __init__(self, batch_size=200, flush_interval=2.0, max_queue_size=10000,
+                 overflow_policy='sync', enabled=True):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"OVERFLOW_POLICY inválida: {overflow_policy}")
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.enabled = enabled
+
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+    # ---------- API pública ----------
+
+    def submit(self, entry):
+        """
+        Encola un HistorialActividad sin guardar.
+        Retorna la instancia (su pk será None hasta que se escriba el lote).
+        """
+        entry.sync_legacy_fields()
+
+        if not self.enabled or self._stopping:
+            entry.save()
+            return entry
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self._handle_overflow(entry)
+        return entry
+
+    def flush(self, timeout=None):
+        """
+        Espera a que todo lo encolado se escriba.
+        Si el hilo no está corriendo, escribe lo pendiente en el hilo actual.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._drain()
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def shutdown(self, timeout=5.0):
+        """Detiene el hilo y escribe todo lo pendiente (registrado en atexit)."""
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+            thread = self._thread
+
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            thread.join(timeout)
+
+        # Lo que haya quedado (hilo muerto o timeout) se escribe aquí mismo
+        self._drain()
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    # ---------- Internos ----------
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            first_start = self._thread is None
+            self._thread = threading.Thread(
+                target=self._run, name='audit-writer', daemon=True
+            )
+            self._thread.start()
+            if first_start:
+                atexit.register(self.shutdown)
+
+    def _handle_overflow(self, entry):
+        if self.overflow_policy == 'sync':
+            # Contrapresión: el request paga la escritura, pero no se pierde nada
+            self._write([entry])
+            return
+
+        if self.overflow_policy == 'drop_oldest':
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                pass
+
+        self.dropped += 1
+        if self.dropped == 1 or self.dropped % 1000 == 0:
+            logger.warning("Bitácora: cola llena, %s registros descartados", self.dropped)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._collect()
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+
+    def _collect(self):
+        """Junta hasta BATCH_SIZE registros o hasta que venza FLUSH_INTERVAL."""
+        batch = []
+        item = self._queue.get()
+        if item is _STOP:
+            return batch, True
+        batch.append(item)
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+            if item is not _STOP:
+                batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch):
+        from apps.audit.models import HistorialActividad
+
+        # Solo el hilo del escritor administra su propia conexión; en el hilo
+        # del request (overflow "sync", flush) la maneja Django.
+        in_worker = threading.current_thread() is self._thread
+        if in_worker:
+            close_old_connections()
+        try:
+            HistorialActividad.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception:
+            # Un registro inválido (p.ej. usuario eliminado) no debe tumbar el lote entero
+            logger.exception("Bitácora: falló bulk_create, reintentando registro por registro")
+            for entry in batch:
+                try:
+                    entry.pk = None
+                    entry.save(force_insert=True)
+                except Exception:
+                    logger.exception("Bitácora: registro descartado (%s)", entry.accion)
+        finally:
+            if in_worker:
+                close_old_connections()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer():
+    """Retorna el escritor de bitácora del proceso (se crea al primer uso)."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                config = {**DEFAULTS, **getattr(settings, 'AUDIT_WRITER', {})}
+                _writer = AuditWriter(
+                    batch_size=config['BATCH_SIZE'],
+                    flush_interval=config['FLUSH_INTERVAL'],
+                    max_queue_size=config['MAX_QUEUE_SIZE'],
+                    overflow_policy=config['OVERFLOW_POLICY'],
+                    enabled=config['ASYNC'],
+                )
+    return _writer
+
+
+def reset_audit_writer():
+    """Detiene el escritor actual (escribiendo lo pendiente); el próximo uso crea otro con la configuración vigente."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.shutdown()
+
+
+@receiver(setting_changed)
+def _audit_writer_setting_changed(setting, **kwargs):
+    if setting == 'AUDIT_WRITER':
+        reset_audit_writer()
+
+
+def flush_audit_log(timeout=None):
+    """Atajo para forzar la escritura de la bitácora pendiente."""
+    if _writer is None:
+        return True
+    return _writer.flush(timeout=timeout)
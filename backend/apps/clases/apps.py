@@ -5,3 +5,6 @@ class ClasesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.clases'
     verbose_name = 'Clases'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,157 @@
+"""
+Horario semanal de clases (salones × franjas horarias con ocupación)
+
+El armado de la semana es una lectura precalculada: se guarda en caché bajo
+la versión de la semana y se sirve con un ETag fuerte derivado de esa
+versión. Si el cliente envía If-None-Match con el ETag vigente se responde
+304 sin tocar la base de datos.
+
+Invalidación: los signals de Clase, InscripcionClase y Salon (y las escrituras
+masivas que no disparan signals) cambian la versión de las semanas afectadas
+al confirmar la transacción. La versión es un token aleatorio, así que aunque
+la caché se vacíe nunca se reutiliza un ETag viejo.
+
+Con LocMemCache cada proceso tiene su propia caché: la versión expira a los
+CLASES_SEMANA_CACHE_TIMEOUT segundos, lo que acota lo que un proceso puede
+servir desactualizado. Con varios workers conviene una caché compartida
+(REDIS_URL).
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Clase, Salon
+
+CACHE_PREFIX = 'clases:semana'
+GLOBAL_VERSION_KEY = f'{CACHE_PREFIX}:global'
+
+
+def _cache_timeout():
+    return getattr(settings, 'CLASES_SEMANA_CACHE_TIMEOUT', 300)
+
+
+def lunes_de(fecha):
+    """Lunes de la semana de `fecha`."""
+    return fecha - timedelta(days=fecha.weekday())
+
+
+# ==========================================
+# VERSIONES
+# ==========================================
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        nueva = uuid.uuid4().hex[:12]
+        # add(): si otro request la creó primero, se usa la suya
+        cache.add(key, nueva, _cache_timeout())
+        version = cache.get(key) or nueva
+    return version
+
+
+def _version_key(lunes):
+    return f'{CACHE_PREFIX}:version:{lunes.isoformat()}'
+
+
+def etag_semana(lunes):
+    """ETag fuerte de la semana: solo lee la caché."""
+    return f'"semana-{lunes.isoformat()}-{_version(GLOBAL_VERSION_KEY)}-{_version(_version_key(lunes))}"'
+
+
+def _bump(keys):
+    cache.delete_many(list(keys))
+
+
+def invalidar_semanas(fechas):
+    """Invalida las semanas de `fechas` al confirmar la transacción en curso."""
+    keys = {_version_key(lunes_de(fecha)) for fecha in fechas if fecha}
+    if keys:
+        transaction.on_commit(lambda: _bump(keys))
+
+
+def invalidar_todas():
+    """Invalida todas las semanas (p.ej. cambió el nombre de un salón)."""
+    transaction.on_commit(lambda: _bump([GLOBAL_VERSION_KEY]))
+
+
+def invalidar_clases(clase_ids):
+    """Invalida las semanas de las clases indicadas (una consulta)."""
+    clase_ids = {clase_id for clase_id in clase_ids if clase_id}
+    if clase_ids:
+        invalidar_semanas(
+            Clase.objects.filter(pk__in=clase_ids).values_list('fecha', flat=True).distinct()
+        )
+
+
+# ==========================================
+# ARMADO
+# ==========================================
+
+def construir_semana(lunes):
+    """
+    Arma el horario de la semana: días, franjas (hora_inicio, hora_fin) y, por
+    salón, sus clases con la franja que ocupan y la ocupación.
+    """
+    domingo = lunes + timedelta(days=6)
+    clases = list(
+        Clase.objects.filter(fecha__range=(lunes, domingo))
+        .order_by('salon_id', 'fecha', 'hora_inicio', 'id')
+        .values(
+            'id', 'salon_id', 'fecha', 'hora_inicio', 'hora_fin', 'estado',
+            'cupo_maximo', 'inscritos_confirmados', 'disciplina__nombre',
+            'instructor_id', 'instructor__first_name', 'instructor__last_name',
+        )
+    )
+
+    franjas = sorted({(c['hora_inicio'], c['hora_fin']) for c in clases})
+    indice_franja = {franja: i for i, franja in enumerate(franjas)}
+
+    salones = {
+        salon['id']: {**salon, 'clases': []}
+        for salon in Salon.objects.filter(Q(activo=True) | Q(pk__in={c['salon_id'] for c in clases}))
+        .order_by('nombre')
+        .values('id', 'nombre', 'capacidad')
+    }
+
+    for c in clases:
+        salones[c['salon_id']]['clases'].append({
+            'id': c['id'],
+            'fecha': c['fecha'].isoformat(),
+            'dia': c['fecha'].weekday(),
+            'franja': indice_franja[(c['hora_inicio'], c['hora_fin'])],
+            'hora_inicio': c['hora_inicio'].isoformat(),
+            'hora_fin': c['hora_fin'].isoformat(),
+            'disciplina': c['disciplina__nombre'],
+            'instructor_id': c['instructor_id'],
+            'instructor': f"{c['instructor__first_name']} {c['instructor__last_name']}".strip(),
+            'estado': c['estado'],
+            'cupo_maximo': c['cupo_maximo'],
+            'inscritos_confirmados': c['inscritos_confirmados'],
+            'cupos_disponibles': c['cupo_maximo'] - c['inscritos_confirmados'],
+        })
+
+    return {
+        'inicio': lunes.isoformat(),
+        'fin': domingo.isoformat(),
+        'dias': [(lunes + timedelta(days=i)).isoformat() for i in range(7)],
+        'franjas': [
+            {'hora_inicio': inicio.isoformat(), 'hora_fin': fin.isoformat()}
+            for inicio, fin in franjas
+        ],
+        'salones': list(salones.values()),
+    }
+
+
+def obtener_semana(lunes):
+    """Retorna (etag, datos) de la semana, armándola solo si no está en caché."""
+    etag = etag_semana(lunes)
+    key = f'{CACHE_PREFIX}:datos:{etag.strip(chr(34))}'
+    datos = cache.get(key)
+    if datos is None:
+        datos = construir_semana(lunes)
+        cache.set(key, datos, _cache_timeout())
+    return etag, datos
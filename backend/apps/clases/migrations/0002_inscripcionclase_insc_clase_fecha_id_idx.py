@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-17 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clases', '0001_initial'),
+        ('clients', '0003_client_cliente_registro_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inscripcionclase',
+            index=models.Index(fields=['-fecha_inscripcion', '-id'], name='insc_clase_fecha_id_idx'),
+        ),
+    ]
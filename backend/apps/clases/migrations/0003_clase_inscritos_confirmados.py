@@ -0,0 +1,31 @@
+# Generated by Django 5.0 on 2026-10-17 10:18
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def calcular_inscritos(apps, schema_editor):
+    Clase = apps.get_model('clases', 'Clase')
+    InscripcionClase = apps.get_model('clases', 'InscripcionClase')
+    confirmados = (
+        InscripcionClase.objects.filter(clase=OuterRef('pk'), estado='confirmada')
+        .order_by().values('clase').annotate(total=Count('id')).values('total')
+    )
+    Clase.objects.update(inscritos_confirmados=Coalesce(Subquery(confirmados), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clases', '0002_inscripcionclase_insc_clase_fecha_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clase',
+            name='inscritos_confirmados',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Contador mantenido por señales de InscripcionClase (ver repair_clase_counters)', verbose_name='Inscritos Confirmados'),
+        ),
+        migrations.RunPython(calcular_inscritos, migrations.RunPython.noop),
+    ]
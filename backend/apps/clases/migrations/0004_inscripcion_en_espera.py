@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-17 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clases', '0003_clase_inscritos_confirmados'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='inscripcionclase',
+            name='estado',
+            field=models.CharField(choices=[('confirmada', 'Confirmada'), ('cancelada', 'Cancelada'), ('asistio', 'Asistió'), ('no_asistio', 'No Asistió'), ('en_espera', 'En Lista de Espera')], default='confirmada', max_length=20, verbose_name='Estado'),
+        ),
+    ]
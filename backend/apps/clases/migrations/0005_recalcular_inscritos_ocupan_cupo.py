@@ -0,0 +1,27 @@
+# Generated by Django 5.0 on 2026-10-17 18:40
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def recalcular_inscritos(apps, schema_editor):
+    """Las inscripciones con asistencia marcada también ocupan cupo."""
+    Clase = apps.get_model('clases', 'Clase')
+    InscripcionClase = apps.get_model('clases', 'InscripcionClase')
+    ocupados = (
+        InscripcionClase.objects.filter(clase=OuterRef('pk'), estado__in=['confirmada', 'asistio', 'no_asistio'])
+        .order_by().values('clase').annotate(total=Count('id')).values('total')
+    )
+    Clase.objects.update(inscritos_confirmados=Coalesce(Subquery(ocupados), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clases', '0004_inscripcion_en_espera'),
+    ]
+
+    operations = [
+        migrations.RunPython(recalcular_inscritos, migrations.RunPython.noop),
+    ]
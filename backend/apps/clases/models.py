@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 from apps.core.models import TimeStampedModel
 from apps.core.constants import (
     ESTADOS_CLASE, CLASE_PROGRAMADA,
@@ -91,6 +92,12 @@ class Clase(TimeStampedModel):
         null=True,
         verbose_name="Observaciones"
     )
+    inscritos_confirmados = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Inscritos Confirmados",
+        help_text="Contador mantenido por señales de InscripcionClase (ver repair_clase_counters)"
+    )
 
     class Meta:
         db_table = 'clase'
@@ -108,11 +115,31 @@ class Clase(TimeStampedModel):
     def __str__(self):
         return f"{self.disciplina.nombre} - {self.fecha} {self.hora_inicio} ({self.instructor.get_full_name()})"
 
+    def save(self, *args, **kwargs):
+        # inscritos_confirmados solo cambia con UPDATE atómicos (F): una
+        # instancia cargada antes de una inscripción no debe pisarlo al guardarse
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'inscritos_confirmados'
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def cupos_disponibles(self):
-        """Calcula cupos disponibles basado en inscripciones"""
-        inscritos = self.inscripciones.filter(estado='confirmada').count()
-        return self.cupo_maximo - inscritos
+        """Calcula cupos disponibles con el contador de inscritos (sin consultas)"""
+        return self.cupo_maximo - self.inscritos_confirmados
+
+    @classmethod
+    def ajustar_inscritos(cls, clase_id, delta):
+        """Suma `delta` al contador de inscritos confirmados con un UPDATE atómico (F)."""
+        if not delta:
+            return
+        queryset = cls.objects.filter(pk=clase_id)
+        if delta < 0:
+            # Nunca bajo cero: una deriva se corrige con repair_clase_counters
+            queryset = queryset.filter(inscritos_confirmados__gte=-delta)
+        queryset.update(inscritos_confirmados=F('inscritos_confirmados') + delta)
 
     @property
     def esta_llena(self):
@@ -158,6 +185,10 @@ class InscripcionClase(TimeStampedModel):
         verbose_name = "Inscripción a Clase"
         verbose_name_plural = "Inscripciones a Clases"
         ordering = ['-fecha_inscripcion']
+        indexes = [
+            # Paginación por cursor (fecha_inscripcion, id)
+            models.Index(fields=['-fecha_inscripcion', '-id'], name='insc_clase_fecha_id_idx'),
+        ]
         # Un cliente no puede inscribirse dos veces a la misma clase
         constraints = [
             models.UniqueConstraint(
@@ -0,0 +1,233 @@
+"""
+Detección de conflictos de horario (salón e instructor)
+
+Carga en UNA consulta las clases vigentes de los días, salones e
+instructores involucrados y arma un árbol de intervalos por recurso y día.
+Cada propuesta se consulta contra su árbol y luego se inserta en él, así
+que también se detectan los choques entre propuestas del mismo lote.
+Se reportan todos los conflictos juntos, no solo el primero.
+
+Uso:
+    detector = DetectorConflictos([Propuesta(salon_id=1, instructor_id=2, fecha=..., ...)])
+    conflictos = detector.detectar()
+
+`expandir_fechas` arma las fechas de una regla de recurrencia semanal
+(programación masiva de clases).
+"""
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db.models import Q
+
+from apps.core.constants import CLASE_PROGRAMADA, CLASE_EN_CURSO
+from .models import Clase
+
+# Estados que ocupan salón e instructor
+ESTADOS_OCUPAN = [CLASE_PROGRAMADA, CLASE_EN_CURSO]
+
+SALON = 'salon'
+INSTRUCTOR = 'instructor'
+
+
+# ==========================================
+# ÁRBOL DE INTERVALOS
+# ==========================================
+
+class _Nodo:
+    __slots__ = ('inicio', 'fin', 'dato', 'max_fin', 'prioridad', 'izq', 'der')
+
+    def __init__(self, inicio, fin, dato):
+        self.inicio = inicio
+        self.fin = fin
+        self.dato = dato
+        self.max_fin = fin
+        self.prioridad = random.random()
+        self.izq = None
+        self.der = None
+
+    def actualizar(self):
+        self.max_fin = self.fin
+        for hijo in (self.izq, self.der):
+            if hijo is not None and hijo.max_fin > self.max_fin:
+                self.max_fin = hijo.max_fin
+
+
+class IntervalTree:
+    """
+    Árbol de intervalos semiabiertos [inicio, fin) sobre un treap (balanceo
+    aleatorio), aumentado con el fin máximo de cada subárbol.
+    """
+
+    def __init__(self):
+        self._raiz = None
+        self._cantidad = 0
+
+    def __len__(self):
+        return self._cantidad
+
+    def insertar(self, inicio, fin, dato=None):
+        self._raiz = self._insertar(self._raiz, _Nodo(inicio, fin, dato))
+        self._cantidad += 1
+
+    def _insertar(self, nodo, nuevo):
+        if nodo is None:
+            return nuevo
+        if (nuevo.inicio, id(nuevo)) < (nodo.inicio, id(nodo)):
+            nodo.izq = self._insertar(nodo.izq, nuevo)
+            if nodo.izq.prioridad > nodo.prioridad:
+                nodo = self._rotar_derecha(nodo)
+        else:
+            nodo.der = self._insertar(nodo.der, nuevo)
+            if nodo.der.prioridad > nodo.prioridad:
+                nodo = self._rotar_izquierda(nodo)
+        nodo.actualizar()
+        return nodo
+
+    @staticmethod
+    def _rotar_derecha(nodo):
+        raiz = nodo.izq
+        nodo.izq = raiz.der
+        raiz.der = nodo
+        nodo.actualizar()
+        raiz.actualizar()
+        return raiz
+
+    @staticmethod
+    def _rotar_izquierda(nodo):
+        raiz = nodo.der
+        nodo.der = raiz.izq
+        raiz.izq = nodo
+        nodo.actualizar()
+        raiz.actualizar()
+        return raiz
+
+    def solapados(self, inicio, fin):
+        """Datos de los intervalos que se solapan con [inicio, fin), ordenados por inicio."""
+        resultado = []
+        pendientes = [self._raiz]
+        while pendientes:
+            nodo = pendientes.pop()
+            # Ningún intervalo de este subárbol termina después de `inicio`
+            if nodo is None or nodo.max_fin <= inicio:
+                continue
+            if nodo.inicio < fin and nodo.fin > inicio:
+                resultado.append((nodo.inicio, nodo.dato))
+            pendientes.append(nodo.izq)
+            # A la derecha todos empiezan en o después de nodo.inicio
+            if nodo.inicio < fin:
+                pendientes.append(nodo.der)
+        resultado.sort(key=lambda item: item[0])
+        return [dato for _, dato in resultado]
+
+
+# ==========================================
+# DETECTOR
+# ==========================================
+
+@dataclass
+class Propuesta:
+    """Una clase a validar (nueva o editada)."""
+    salon_id: int
+    instructor_id: int
+    fecha: Any
+    hora_inicio: Any
+    hora_fin: Any
+    excluir_id: Optional[int] = None  # la propia clase, al editar
+
+
+@dataclass
+class Conflicto:
+    indice: int                # posición de la propuesta en el lote
+    recurso: str               # 'salon' | 'instructor'
+    fecha: Any
+    hora_inicio: Any           # horario ocupado con el que choca
+    hora_fin: Any
+    clase_id: Optional[int] = None        # clase existente
+    con_propuesta: Optional[int] = None   # u otra propuesta del lote
+
+    @property
+    def mensaje(self):
+        if self.recurso == SALON:
+            return f'Conflicto de horarios: El salón ya está ocupado de {self.hora_inicio} a {self.hora_fin}'
+        return f'El instructor ya tiene una clase programada de {self.hora_inicio} a {self.hora_fin}'
+
+
+class DetectorConflictos:
+    def __init__(self, propuestas: List[Propuesta]):
+        self.propuestas = list(propuestas)
+        self._arboles: Dict[Tuple[str, int, Any], IntervalTree] = {}
+
+    def _arbol(self, recurso, recurso_id, fecha):
+        clave = (recurso, recurso_id, fecha)
+        arbol = self._arboles.get(clave)
+        if arbol is None:
+            arbol = self._arboles[clave] = IntervalTree()
+        return arbol
+
+    def _cargar_existentes(self):
+        fechas = {p.fecha for p in self.propuestas}
+        salones = {p.salon_id for p in self.propuestas}
+        instructores = {p.instructor_id for p in self.propuestas}
+        excluir = {p.excluir_id for p in self.propuestas if p.excluir_id}
+
+        existentes = (
+            Clase.objects.filter(fecha__in=fechas, estado__in=ESTADOS_OCUPAN)
+            .filter(Q(salon_id__in=salones) | Q(instructor_id__in=instructores))
+            .exclude(pk__in=excluir)
+            .values_list('id', 'salon_id', 'instructor_id', 'fecha', 'hora_inicio', 'hora_fin')
+        )
+        for clase_id, salon_id, instructor_id, fecha, inicio, fin in existentes:
+            dato = ('clase', clase_id, inicio, fin)
+            if salon_id in salones:
+                self._arbol(SALON, salon_id, fecha).insertar(inicio, fin, dato)
+            if instructor_id in instructores:
+                self._arbol(INSTRUCTOR, instructor_id, fecha).insertar(inicio, fin, dato)
+
+    def detectar(self) -> List[Conflicto]:
+        """Todos los conflictos del lote (contra la base y entre propuestas)."""
+        if not self.propuestas:
+            return []
+        self._cargar_existentes()
+
+        conflictos = []
+        for indice, p in enumerate(self.propuestas):
+            for recurso, recurso_id in ((SALON, p.salon_id), (INSTRUCTOR, p.instructor_id)):
+                arbol = self._arbol(recurso, recurso_id, p.fecha)
+                for origen, ref, inicio, fin in arbol.solapados(p.hora_inicio, p.hora_fin):
+                    conflictos.append(Conflicto(
+                        indice=indice,
+                        recurso=recurso,
+                        fecha=p.fecha,
+                        hora_inicio=inicio,
+                        hora_fin=fin,
+                        clase_id=ref if origen == 'clase' else None,
+                        con_propuesta=ref if origen == 'propuesta' else None,
+                    ))
+                arbol.insertar(p.hora_inicio, p.hora_fin, ('propuesta', indice, p.hora_inicio, p.hora_fin))
+        return conflictos
+
+
+def detectar_conflictos(propuestas):
+    """Atajo: lista de Conflicto para las propuestas dadas."""
+    return DetectorConflictos(propuestas).detectar()
+
+
+# ==========================================
+# RECURRENCIA
+# ==========================================
+
+def expandir_fechas(fecha_inicio, fecha_fin, dias_semana):
+    """
+    Fechas entre `fecha_inicio` y `fecha_fin` (inclusive) que caen en alguno
+    de `dias_semana` (0 = lunes ... 6 = domingo), en orden.
+    """
+    fechas = []
+    for dia in sorted(set(dias_semana)):
+        fecha = fecha_inicio + timedelta(days=(dia - fecha_inicio.weekday()) % 7)
+        while fecha <= fecha_fin:
+            fechas.append(fecha)
+            fecha += timedelta(days=7)
+    fechas.sort()
+    return fechas
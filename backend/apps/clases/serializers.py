@@ -1,9 +1,12 @@
 from rest_framework import serializers
+from django.db import transaction
 from django.utils import timezone
-from django.db.models import Q
 from datetime import datetime, time
-from apps.core.constants import CLASE_PROGRAMADA, CLASE_EN_CURSO
+from apps.core.constants import ESTADOS_OCUPAN_CUPO
 from .models import Salon, Clase, InscripcionClase
+from .horario import invalidar_semanas
+from .scheduling import Propuesta, detectar_conflictos, expandir_fechas
+from .services import inscribir_cliente, reservar_cupo
 from apps.disciplinas.models import Disciplina
 from apps.disciplinas.serializers import DisciplinaSerializer
 from apps.users.models import User
@@ -46,10 +49,10 @@ class ClaseSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'disciplina', 'disciplina_nombre', 'instructor', 'instructor_nombre',
             'salon', 'salon_nombre', 'fecha', 'hora_inicio', 'hora_fin',
-            'cupo_maximo', 'cupos_disponibles', 'esta_llena', 'estado', 'estado_display',
-            'observaciones', 'created_at', 'updated_at'
+            'cupo_maximo', 'inscritos_confirmados', 'cupos_disponibles', 'esta_llena',
+            'estado', 'estado_display', 'observaciones', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['inscritos_confirmados', 'created_at', 'updated_at']
 
     def get_instructor_nombre(self, obj):
         return obj.instructor.get_full_name()
@@ -76,52 +79,29 @@ class ClaseSerializer(serializers.ModelSerializer):
                     'cupo_maximo': f'El cupo máximo no puede exceder la capacidad del salón ({salon.capacidad})'
                 })
 
-        # Validar disponibilidad del salón (no solapamiento de horarios)
-        fecha = data.get('fecha')
-        salon = data.get('salon')
-        hora_inicio = data.get('hora_inicio')
-        hora_fin = data.get('hora_fin')
-
-        if fecha and salon and hora_inicio and hora_fin:
-            # Buscar clases en el mismo salón, misma fecha que se solapen
-            clases_conflicto = Clase.objects.filter(
-                salon=salon,
-                fecha=fecha,
-                estado__in=[CLASE_PROGRAMADA, CLASE_EN_CURSO]
-            ).filter(
-                Q(hora_inicio__lt=hora_fin, hora_fin__gt=hora_inicio)  # Solapamiento
-            )
-
-            # Si estamos editando, excluir la clase actual
-            if self.instance:
-                clases_conflicto = clases_conflicto.exclude(pk=self.instance.pk)
+        # Validar disponibilidad del salón y del instructor (no solapamiento
+        # de horarios) en una sola consulta. Al editar, lo que no viene en
+        # el request se toma de la clase actual.
+        actual = self.instance
+        propuesta = {
+            campo: data.get(campo, getattr(actual, campo, None))
+            for campo in ('fecha', 'salon', 'instructor', 'hora_inicio', 'hora_fin')
+        }
 
-            if clases_conflicto.exists():
-                clase_conf = clases_conflicto.first()
-                raise serializers.ValidationError({
-                    'salon': f'Conflicto de horarios: El salón ya está ocupado de {clase_conf.hora_inicio} a {clase_conf.hora_fin}'
-                })
-
-        # Validar disponibilidad del instructor (no puede tener dos clases al mismo tiempo)
-        instructor = data.get('instructor')
-        
-        if fecha and instructor and hora_inicio and hora_fin:
-            clases_instructor = Clase.objects.filter(
-                instructor=instructor,
-                fecha=fecha,
-                estado__in=[CLASE_PROGRAMADA, CLASE_EN_CURSO]
-            ).filter(
-                Q(hora_inicio__lt=hora_fin, hora_fin__gt=hora_inicio)
-            )
-
-            if self.instance:
-                clases_instructor = clases_instructor.exclude(pk=self.instance.pk)
-
-            if clases_instructor.exists():
-                clase_conf = clases_instructor.first()
-                raise serializers.ValidationError({
-                    'instructor': f'El instructor ya tiene una clase programada de {clase_conf.hora_inicio} a {clase_conf.hora_fin}'
-                })
+        if all(propuesta.values()):
+            conflictos = detectar_conflictos([Propuesta(
+                salon_id=propuesta['salon'].pk,
+                instructor_id=propuesta['instructor'].pk,
+                fecha=propuesta['fecha'],
+                hora_inicio=propuesta['hora_inicio'],
+                hora_fin=propuesta['hora_fin'],
+                excluir_id=actual.pk if actual else None,
+            )])
+            if conflictos:
+                errores = {}
+                for conflicto in conflictos:
+                    errores.setdefault(conflicto.recurso, []).append(conflicto.mensaje)
+                raise serializers.ValidationError(errores)
 
         return data
 
@@ -138,14 +118,115 @@ class ClaseListSerializer(serializers.ModelSerializer):
         model = Clase
         fields = [
             'id', 'disciplina_nombre', 'instructor_nombre', 'salon_nombre',
-            'fecha', 'hora_inicio', 'hora_fin', 'cupo_maximo', 'cupos_disponibles',
-            'estado', 'estado_display'
+            'fecha', 'hora_inicio', 'hora_fin', 'cupo_maximo', 'inscritos_confirmados',
+            'cupos_disponibles', 'estado', 'estado_display'
         ]
 
     def get_instructor_nombre(self, obj):
         return obj.instructor.get_full_name()
 
 
+class ClaseRecurrenteSerializer(serializers.Serializer):
+    """
+    Programación masiva: una regla semanal (días, horario, rango de fechas)
+    que se expande en una clase por fecha. Todas se validan juntas contra
+    los horarios existentes y se crean en una sola transacción.
+    """
+    MAX_DIAS_RANGO = 366
+    MAX_CLASES = 1000
+
+    disciplina = serializers.PrimaryKeyRelatedField(queryset=Disciplina.objects.all())
+    instructor = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
+    salon = serializers.PrimaryKeyRelatedField(queryset=Salon.objects.all())
+    dias_semana = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6),
+        allow_empty=False,
+        help_text="0 = lunes ... 6 = domingo"
+    )
+    hora_inicio = serializers.TimeField()
+    hora_fin = serializers.TimeField()
+    fecha_inicio = serializers.DateField()
+    fecha_fin = serializers.DateField()
+    cupo_maximo = serializers.IntegerField(min_value=1)
+    observaciones = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    def validate(self, data):
+        if data['hora_fin'] <= data['hora_inicio']:
+            raise serializers.ValidationError({
+                'hora_fin': 'La hora de fin debe ser posterior a la hora de inicio'
+            })
+
+        if data['fecha_fin'] < data['fecha_inicio']:
+            raise serializers.ValidationError({
+                'fecha_fin': 'La fecha de fin debe ser igual o posterior a la fecha de inicio'
+            })
+        if (data['fecha_fin'] - data['fecha_inicio']).days >= self.MAX_DIAS_RANGO:
+            raise serializers.ValidationError({
+                'fecha_fin': f'El rango no puede superar {self.MAX_DIAS_RANGO} días'
+            })
+
+        salon = data['salon']
+        if data['cupo_maximo'] > salon.capacidad:
+            raise serializers.ValidationError({
+                'cupo_maximo': f'El cupo máximo no puede exceder la capacidad del salón ({salon.capacidad})'
+            })
+
+        fechas = expandir_fechas(data['fecha_inicio'], data['fecha_fin'], data['dias_semana'])
+        if not fechas:
+            raise serializers.ValidationError({
+                'dias_semana': 'Ninguna fecha del rango cae en los días indicados'
+            })
+        if len(fechas) > self.MAX_CLASES:
+            raise serializers.ValidationError(f'La regla genera más de {self.MAX_CLASES} clases')
+
+        # Todas las fechas contra los horarios existentes, en una sola consulta
+        conflictos = detectar_conflictos([
+            Propuesta(
+                salon_id=salon.pk,
+                instructor_id=data['instructor'].pk,
+                fecha=fecha,
+                hora_inicio=data['hora_inicio'],
+                hora_fin=data['hora_fin'],
+            )
+            for fecha in fechas
+        ])
+        if conflictos:
+            raise serializers.ValidationError({
+                'conflictos': [
+                    {
+                        'fecha': conflicto.fecha.isoformat(),
+                        'recurso': conflicto.recurso,
+                        'clase_id': conflicto.clase_id,
+                        'mensaje': conflicto.mensaje,
+                    }
+                    for conflicto in conflictos
+                ]
+            })
+
+        data['fechas'] = fechas
+        return data
+
+    def create(self, validated_data):
+        comunes = {
+            'disciplina': validated_data['disciplina'],
+            'instructor': validated_data['instructor'],
+            'salon': validated_data['salon'],
+            'hora_inicio': validated_data['hora_inicio'],
+            'hora_fin': validated_data['hora_fin'],
+            'cupo_maximo': validated_data['cupo_maximo'],
+            'observaciones': validated_data.get('observaciones'),
+        }
+        # bulk_create no dispara señales: las clases nuevas nacen sin
+        # inscritos, así que el contador en 0 ya es correcto; el horario
+        # semanal sí se invalida a mano
+        with transaction.atomic():
+            clases = Clase.objects.bulk_create([
+                Clase(fecha=fecha, **comunes) for fecha in validated_data['fechas']
+            ])
+            invalidar_semanas(validated_data['fechas'])
+        return clases
+
+
 class InscripcionClaseSerializer(serializers.ModelSerializer):
     cliente_nombre = serializers.CharField(source='cliente.nombre_completo', read_only=True)
     clase_info = serializers.SerializerMethodField()
@@ -163,14 +244,31 @@ class InscripcionClaseSerializer(serializers.ModelSerializer):
     def get_clase_info(self, obj):
         return f"{obj.clase.disciplina.nombre} - {obj.clase.fecha} {obj.clase.hora_inicio}"
 
-    def validate(self, data):
-        """Validar que haya cupos disponibles"""
-        clase = data.get('clase')
-        
-        if clase and not self.instance:  # Solo al crear
-            if clase.esta_llena:
+    def create(self, validated_data):
+        """
+        Inscribe con reserva atómica de cupo: si la clase está llena el
+        cliente queda en lista de espera (estado en_espera) en lugar de rechazarse.
+        """
+        return inscribir_cliente(
+            clase=validated_data['clase'],
+            cliente=validated_data['cliente'],
+            observaciones=validated_data.get('observaciones'),
+        )
+
+    def update(self, instance, validated_data):
+        """Confirmar a mano (p.ej. desde en_espera) también debe conseguir cupo."""
+        nuevo_estado = validated_data.get('estado', instance.estado)
+        nueva_clase = validated_data.get('clase', instance.clase)
+        ocupa_cupo_nuevo = nuevo_estado in ESTADOS_OCUPAN_CUPO and (
+            instance.estado not in ESTADOS_OCUPAN_CUPO or nueva_clase.pk != instance.clase_id
+        )
+        if not ocupa_cupo_nuevo:
+            return super().update(instance, validated_data)
+
+        with transaction.atomic():
+            if not reservar_cupo(nueva_clase.pk):
                 raise serializers.ValidationError({
                     'clase': 'La clase ya está llena. No hay cupos disponibles.'
                 })
-
-        return data
+            instance._cupo_reservado = True
+            return super().update(instance, validated_data)
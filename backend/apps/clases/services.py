@@ -0,0 +1,166 @@
+"""
+Servicios de Clases: contador de inscritos confirmados e inscripción con
+lista de espera.
+
+La reserva de cupo es un UPDATE condicional sobre el contador
+(inscritos_confirmados < cupo_maximo): la base de datos lo ejecuta de forma
+atómica, así que aunque lleguen cientos de solicitudes a la vez ninguna
+puede sobrepasar el cupo, y no hace falta leer-y-luego-escribir. Quien no
+consigue cupo queda "en_espera" (FIFO por fecha_inscripcion, id) y se
+promueve solo cuando se libera un lugar.
+
+Bloqueos: la inscripción escribe primero la fila de la clase y después
+solo filas nuevas o canceladas; la cancelación y la promoción bloquean una
+inscripción confirmada o en espera y después la clase. Como nunca esperan
+por la misma inscripción, no se forman ciclos (deadlocks).
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import serializers
+
+from apps.core.constants import (
+    ESTADOS_OCUPAN_CUPO, INSCRIPCION_CONFIRMADA, INSCRIPCION_CANCELADA_CLASE, INSCRIPCION_EN_ESPERA
+)
+from .horario import invalidar_clases
+from .models import Clase, InscripcionClase
+
+MENSAJE_DUPLICADO = 'El cliente ya está inscrito o en lista de espera para esta clase.'
+
+
+def confirmados_subquery():
+    """Subquery con la cantidad real de inscripciones que ocupan cupo en cada clase."""
+    return Coalesce(
+        Subquery(
+            InscripcionClase.objects.filter(clase=OuterRef('pk'), estado__in=ESTADOS_OCUPAN_CUPO)
+            .order_by().values('clase').annotate(total=Count('id')).values('total')
+        ),
+        Value(0),
+    )
+
+
+def clases_con_desfase(queryset=None):
+    """Clases cuyo contador no coincide con las inscripciones que ocupan cupo."""
+    queryset = queryset if queryset is not None else Clase.objects.all()
+    return (
+        queryset.annotate(reales=confirmados_subquery())
+        .exclude(inscritos_confirmados=F('reales'))
+        .order_by('id')
+    )
+
+
+def reparar_contadores(queryset=None, dry_run=False):
+    """
+    Recalcula inscritos_confirmados donde haya desfase.
+    Retorna la lista de (clase_id, valor_guardado, valor_real).
+    """
+    desfases = [
+        (clase.id, clase.inscritos_confirmados, clase.reales)
+        for clase in clases_con_desfase(queryset).only('id', 'inscritos_confirmados')
+    ]
+    if desfases and not dry_run:
+        Clase.objects.filter(pk__in=[d[0] for d in desfases]).update(
+            inscritos_confirmados=confirmados_subquery()
+        )
+        # update() no dispara señales
+        invalidar_clases([d[0] for d in desfases])
+    return desfases
+
+
+# ==========================================
+# INSCRIPCIÓN Y LISTA DE ESPERA
+# ==========================================
+
+def reservar_cupo(clase_id):
+    """Ocupa un cupo si queda alguno. Retorna True si lo consiguió."""
+    return Clase.objects.filter(
+        pk=clase_id, inscritos_confirmados__lt=F('cupo_maximo')
+    ).update(inscritos_confirmados=F('inscritos_confirmados') + 1) == 1
+
+
+def inscribir_cliente(clase, cliente, observaciones=None):
+    """
+    Inscribe al cliente: confirmada si hay cupo, en_espera si no.
+    Una inscripción cancelada previa se reutiliza (vuelve al final de la fila).
+
+    Raises:
+        serializers.ValidationError: si el cliente ya está inscrito o esperando.
+    """
+    try:
+        with transaction.atomic():
+            # La reserva es la primera escritura de la transacción: en SQLite
+            # toma el lock de escritura de entrada (leer primero y escribir
+            # después provoca "database is locked" con concurrencia)
+            confirmada = reservar_cupo(clase.pk)
+            estado = INSCRIPCION_CONFIRMADA if confirmada else INSCRIPCION_EN_ESPERA
+
+            previa = (
+                InscripcionClase.objects.filter(clase=clase, cliente=cliente)
+                .values_list('pk', 'estado').first()
+            )
+            if previa is None:
+                inscripcion = InscripcionClase(
+                    clase=clase, cliente=cliente, estado=estado, observaciones=observaciones
+                )
+                # El cupo ya se contó en reservar_cupo: la señal no debe sumarlo otra vez
+                inscripcion._cupo_reservado = True
+                inscripcion.save()
+                return inscripcion
+
+            cambios = {'estado': estado, 'fecha_inscripcion': timezone.now(), 'updated_at': timezone.now()}
+            if observaciones is not None:
+                cambios['observaciones'] = observaciones
+            # UPDATE condicional: si dos solicitudes reutilizan la misma
+            # cancelación, solo una lo logra
+            reutilizada = InscripcionClase.objects.filter(
+                pk=previa[0], estado=INSCRIPCION_CANCELADA_CLASE
+            ).update(**cambios)
+            if not reutilizada:
+                raise serializers.ValidationError({'cliente': MENSAJE_DUPLICADO})
+            if confirmada:
+                # update() directo: sin señales, la ocupación del horario cambia acá
+                invalidar_clases([clase.pk])
+            return InscripcionClase.objects.get(pk=previa[0])
+    except IntegrityError:
+        # Dos solicitudes simultáneas del mismo cliente: la segunda choca con
+        # unique_cliente_clase y su reserva se deshace con la transacción
+        raise serializers.ValidationError({'cliente': MENSAJE_DUPLICADO})
+
+
+def promover_lista_espera(clase_id):
+    """
+    Confirma a los primeros de la lista de espera mientras haya cupo.
+    Retorna los ids de las inscripciones promovidas.
+    """
+    promovidas = []
+    while True:
+        with transaction.atomic():
+            # skip_locked: dos cancelaciones simultáneas no promueven a la misma persona
+            candidata = (
+                InscripcionClase.objects.select_for_update(skip_locked=True)
+                .filter(clase_id=clase_id, estado=INSCRIPCION_EN_ESPERA)
+                .order_by('fecha_inscripcion', 'id')
+                .values_list('pk', flat=True)
+                .first()
+            )
+            if candidata is None or not reservar_cupo(clase_id):
+                break
+            # update() directo: sin señales, el cupo ya se reservó arriba
+            InscripcionClase.objects.filter(pk=candidata).update(
+                estado=INSCRIPCION_CONFIRMADA, updated_at=timezone.now()
+            )
+            promovidas.append(candidata)
+
+    if promovidas:
+        invalidar_clases([clase_id])
+        from apps.audit.models import HistorialActividad
+        HistorialActividad.log_activity(
+            request=None,
+            tipo_accion="update",
+            accion="PROMOVER_LISTA_ESPERA",
+            descripcion=f"Se confirmaron {len(promovidas)} inscripciones desde la lista de espera (Clase ID: {clase_id})",
+            datos_adicionales={"modulo": "INSCRIPCIONES_CLASE", "clase_id": clase_id, "inscripciones": promovidas},
+        )
+    return promovidas
+
@@ -0,0 +1,114 @@
+"""
+Signals de Clases.
+Mantienen Clase.inscritos_confirmados con UPDATE atómicos (F) al crear,
+eliminar o cambiar de estado/clase una InscripcionClase, y promueven la
+lista de espera cuando se libera un cupo (cancelación, eliminación o cambio
+de clase) o se amplía el cupo de la clase (ver apps.clases.services).
+También invalidan el horario semanal en caché (ver apps.clases.horario).
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.core.constants import ESTADOS_OCUPAN_CUPO
+from . import horario
+from .models import Clase, InscripcionClase, Salon
+from .services import promover_lista_espera
+
+
+def _invalidar_horario_inscripcion(instance, clase_anterior_id=None):
+    # Si la clase ya está cargada en la instancia se evita la consulta
+    if InscripcionClase.clase.is_cached(instance) and clase_anterior_id in (None, instance.clase_id):
+        horario.invalidar_semanas([instance.clase.fecha])
+    else:
+        horario.invalidar_clases([instance.clase_id, clase_anterior_id])
+
+
+@receiver(pre_save, sender=InscripcionClase)
+def guardar_inscripcion_anterior(sender, instance, raw=False, **kwargs):
+    instance._contador_anterior = None
+    if raw or instance.pk is None:
+        return
+    instance._contador_anterior = (
+        InscripcionClase.objects.filter(pk=instance.pk).values_list('clase_id', 'estado').first()
+    )
+
+
+@receiver(post_save, sender=InscripcionClase)
+def actualizar_contador_inscritos(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, '_contador_anterior', None)
+    ocupaba = bool(anterior) and anterior[1] in ESTADOS_OCUPAN_CUPO
+    ocupa = instance.estado in ESTADOS_OCUPAN_CUPO
+    # confirmada -> asistio/no_asistio en la misma clase: el lugar sigue ocupado
+    sigue_ocupando = ocupaba and ocupa and anterior[0] == instance.clase_id
+    # inscribir_cliente() ya reservó el cupo con un UPDATE condicional
+    reservado = getattr(instance, '_cupo_reservado', False)
+    instance._cupo_reservado = False
+
+    if sigue_ocupando:
+        return
+    if ocupaba:
+        Clase.ajustar_inscritos(anterior[0], -1)
+    if ocupa and not reservado:
+        Clase.ajustar_inscritos(instance.clase_id, 1)
+
+    # Cambió la ocupación que muestra el horario semanal
+    if ocupa or ocupaba:
+        _invalidar_horario_inscripcion(instance, anterior[0] if anterior else None)
+
+    # Se liberó un cupo: pasa el siguiente de la lista de espera
+    if ocupaba:
+        promover_lista_espera(anterior[0])
+
+
+@receiver(post_delete, sender=InscripcionClase)
+def descontar_inscrito(sender, instance, **kwargs):
+    if instance.estado in ESTADOS_OCUPAN_CUPO:
+        Clase.ajustar_inscritos(instance.clase_id, -1)
+        promover_lista_espera(instance.clase_id)
+        _invalidar_horario_inscripcion(instance)
+
+
+@receiver(pre_save, sender=Clase)
+def guardar_clase_anterior(sender, instance, raw=False, **kwargs):
+    instance._fecha_anterior = instance._cupo_anterior = None
+    if raw or instance.pk is None:
+        return
+    anterior = Clase.objects.filter(pk=instance.pk).values_list('fecha', 'cupo_maximo').first()
+    if anterior:
+        instance._fecha_anterior, instance._cupo_anterior = anterior
+
+
+@receiver(post_save, sender=Clase)
+def promover_por_cambio_de_cupo(sender, instance, created, raw=False, **kwargs):
+    """Si se amplió el cupo de la clase, entran los que esperaban."""
+    if raw or created:
+        return
+    cupo_anterior = getattr(instance, '_cupo_anterior', None)
+    if cupo_anterior is not None and instance.cupo_maximo > cupo_anterior:
+        promover_lista_espera(instance.pk)
+
+
+# ==========================================
+# HORARIO SEMANAL
+# ==========================================
+
+@receiver(post_save, sender=Clase)
+def invalidar_horario_clase(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    horario.invalidar_semanas([instance.fecha, getattr(instance, '_fecha_anterior', None)])
+
+
+@receiver(post_delete, sender=Clase)
+def invalidar_horario_clase_eliminada(sender, instance, **kwargs):
+    horario.invalidar_semanas([instance.fecha])
+
+
+@receiver(post_save, sender=Salon)
+@receiver(post_delete, sender=Salon)
+def invalidar_horario_salon(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    horario.invalidar_todas()
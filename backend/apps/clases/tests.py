@@ -1,3 +1,281 @@
+import random
+from datetime import date, time
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.audit.models import HistorialActividad
+from apps.clients.models import Client
+from apps.core.constants import (
+    CLASE_CANCELADA, INSCRIPCION_ASISTIO, INSCRIPCION_CANCELADA_CLASE, INSCRIPCION_CONFIRMADA,
+    INSCRIPCION_EN_ESPERA, INSCRIPCION_NO_ASISTIO
+)
+from apps.disciplinas.models import Disciplina
+from apps.users.models import User
+from .models import Clase, InscripcionClase, Salon
+from .scheduling import INSTRUCTOR, SALON, IntervalTree, Propuesta, detectar_conflictos
+from .services import inscribir_cliente, reservar_cupo
+
+
+class ClaseTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(username='instructor', email='instructor@gym.com')
+        cls.disciplina = Disciplina.objects.create(nombre='Spinning')
+        cls.salon = Salon.objects.create(nombre='Sala A', capacidad=20)
+        cls.clase = Clase.objects.create(
+            disciplina=cls.disciplina, instructor=cls.instructor, salon=cls.salon,
+            fecha=date(2030, 1, 7), hora_inicio=time(8), hora_fin=time(9), cupo_maximo=2,
+        )
+        cls.clientes = [
+            Client.objects.create(nombre=f'Cliente{i}', apellido='Perez', ci=f'{6000000 + i}')
+            for i in range(4)
+        ]
+
+    def _contador(self):
+        return Clase.objects.values_list('inscritos_confirmados', flat=True).get(pk=self.clase.pk)
+
+
+class ContadorInscritosTests(ClaseTestMixin, TestCase):
+    """Clase.inscritos_confirmados solo cambia con UPDATE atómicos."""
+
+    def test_save_de_instancia_vieja_no_pisa_el_contador(self):
+        vieja = Clase.objects.get(pk=self.clase.pk)
+        InscripcionClase.objects.create(clase=self.clase, cliente=self.clientes[0])
+        vieja.observaciones = 'Traer toalla'
+        vieja.save()
+        self.assertEqual(self._contador(), 1)
+        self.assertEqual(Clase.objects.get(pk=self.clase.pk).observaciones, 'Traer toalla')
+
+    def test_reserva_condicional_con_clase_llena(self):
+        self.assertTrue(reservar_cupo(self.clase.pk))
+        self.assertTrue(reservar_cupo(self.clase.pk))
+        self.assertFalse(reservar_cupo(self.clase.pk))
+        self.assertEqual(self._contador(), 2)
+
+    def test_repair_clase_counters_corrige_desfase(self):
+        InscripcionClase.objects.create(clase=self.clase, cliente=self.clientes[0])
+        Clase.objects.filter(pk=self.clase.pk).update(inscritos_confirmados=2)
+
+        call_command('repair_clase_counters', '--dry-run', stdout=StringIO())
+        self.assertEqual(self._contador(), 2)
+        call_command('repair_clase_counters', stdout=StringIO())
+        self.assertEqual(self._contador(), 1)
+        self.assertEqual(
+            InscripcionClase.objects.filter(clase=self.clase, estado=INSCRIPCION_CONFIRMADA).count(), 1
+        )
+
+
+class ListaEsperaTests(ClaseTestMixin, TestCase):
+    """Inscripción con cupo condicional y promoción FIFO desde la lista de espera."""
+
+    def _inscribir_todos(self):
+        return [inscribir_cliente(self.clase, cliente) for cliente in self.clientes]
+
+    def _estado(self, inscripcion):
+        return InscripcionClase.objects.values_list('estado', flat=True).get(pk=inscripcion.pk)
+
+    def test_sin_cupo_queda_en_espera(self):
+        inscripciones = self._inscribir_todos()
+        self.assertEqual(
+            [i.estado for i in inscripciones],
+            [INSCRIPCION_CONFIRMADA, INSCRIPCION_CONFIRMADA, INSCRIPCION_EN_ESPERA, INSCRIPCION_EN_ESPERA],
+        )
+        self.assertEqual(self._contador(), 2)
+
+    def test_cancelar_promueve_al_primero_en_espera(self):
+        primera, _, tercera, cuarta = self._inscribir_todos()
+        primera.estado = INSCRIPCION_CANCELADA_CLASE
+        primera.save()
+        self.assertEqual(self._estado(tercera), INSCRIPCION_CONFIRMADA)
+        self.assertEqual(self._estado(cuarta), INSCRIPCION_EN_ESPERA)
+        self.assertEqual(self._contador(), 2)
+
+    def test_marcar_asistencia_no_libera_cupo(self):
+        primera, segunda, tercera, _ = self._inscribir_todos()
+        primera.estado = INSCRIPCION_ASISTIO
+        primera.save()
+        segunda.estado = INSCRIPCION_NO_ASISTIO
+        segunda.save()
+        self.assertEqual(self._estado(tercera), INSCRIPCION_EN_ESPERA)
+        self.assertEqual(self._contador(), 2)
+
+        # Eliminar una inscripción con asistencia sí libera el lugar
+        primera.delete()
+        self.assertEqual(self._estado(tercera), INSCRIPCION_CONFIRMADA)
+        self.assertEqual(self._contador(), 2)
+
+    def test_solo_ampliar_el_cupo_promueve(self):
+        _, _, tercera, _ = self._inscribir_todos()
+        clase = Clase.objects.get(pk=self.clase.pk)
+        clase.observaciones = 'Cambio de música'
+        with self.assertNumQueries(2):   # valores anteriores + UPDATE, sin buscar en la lista de espera
+            clase.save()
+        self.assertEqual(self._estado(tercera), INSCRIPCION_EN_ESPERA)
+
+        clase.cupo_maximo = 3
+        clase.save()
+        self.assertEqual(self._estado(tercera), INSCRIPCION_CONFIRMADA)
+        self.assertEqual(self._contador(), 3)
+
+
+class HorarioSemanalTests(ClaseTestMixin, TestCase):
+    """El ETag del horario semanal cambia con la ocupación de sus clases."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_superuser(username='admin', email='admin@gym.com', password='Admin1234!')
+        )
+
+    def _semana(self):
+        response = self.client.get('/api/clases/semana/', {'inicio': self.clase.fecha.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        clase = next(c for s in response.data['salones'] for c in s['clases'] if c['id'] == self.clase.pk)
+        return response['ETag'], clase['inscritos_confirmados']
+
+    def test_reinscripcion_invalida_el_horario(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            inscripcion = inscribir_cliente(self.clase, self.clientes[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            inscripcion.estado = INSCRIPCION_CANCELADA_CLASE
+            inscripcion.save()
+        etag, ocupados = self._semana()
+        self.assertEqual(ocupados, 0)
+
+        # Reutiliza la inscripción cancelada (UPDATE directo, sin señales)
+        with self.captureOnCommitCallbacks(execute=True):
+            inscribir_cliente(self.clase, self.clientes[0])
+        nuevo_etag, ocupados = self._semana()
+        self.assertNotEqual(nuevo_etag, etag)
+        self.assertEqual(ocupados, 1)
+        response = self.client.get(
+            '/api/clases/semana/', {'inicio': self.clase.fecha.isoformat()}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class ConflictosHorarioTests(ClaseTestMixin, TestCase):
+    """Árbol de intervalos y DetectorConflictos (apps.clases.scheduling)."""
+
+    def _propuesta(self, inicio, fin, salon=None, instructor=None, **kwargs):
+        return Propuesta(
+            salon_id=(salon or self.salon).pk, instructor_id=(instructor or self.instructor).pk,
+            fecha=self.clase.fecha, hora_inicio=time(*inicio), hora_fin=time(*fin), **kwargs
+        )
+
+    def test_solapados(self):
+        arbol = IntervalTree()
+        for inicio, fin in [(8, 9), (9, 10), (7, 12), (13, 14), (10, 11)]:
+            arbol.insertar(inicio, fin, (inicio, fin))
+        self.assertEqual(len(arbol), 5)
+        self.assertEqual(arbol.solapados(9, 10), [(7, 12), (9, 10)])
+        self.assertEqual(arbol.solapados(8, 13), [(7, 12), (8, 9), (9, 10), (10, 11)])
+        # Intervalos semiabiertos: los turnos contiguos no se tocan
+        self.assertEqual(arbol.solapados(12, 13), [])
+        self.assertEqual(arbol.solapados(14, 15), [])
+        self.assertEqual(IntervalTree().solapados(0, 24), [])
+
+    def test_solapados_contra_fuerza_bruta(self):
+        aleatorio = random.Random(7)
+        intervalos = []
+        arbol = IntervalTree()
+        for i in range(300):
+            inicio = aleatorio.randrange(0, 1000)
+            fin = inicio + aleatorio.randrange(1, 50)
+            intervalos.append((inicio, fin, i))
+            arbol.insertar(inicio, fin, i)
+        for _ in range(100):
+            inicio = aleatorio.randrange(0, 1000)
+            fin = inicio + aleatorio.randrange(1, 80)
+            esperado = {i for a, b, i in intervalos if a < fin and b > inicio}
+            self.assertEqual(set(arbol.solapados(inicio, fin)), esperado)
+
+    def test_turnos_contiguos_no_chocan(self):
+        self.assertEqual(detectar_conflictos([self._propuesta((7,), (8,)), self._propuesta((9,), (10,))]), [])
+
+    def test_salon_e_instructor(self):
+        otro_salon = Salon.objects.create(nombre='Sala B', capacidad=10)
+        otro_instructor = User.objects.create_user(username='otro', email='otro@gym.com')
+        conflictos = detectar_conflictos([
+            self._propuesta((8, 30), (9, 30)),
+            self._propuesta((8, 30), (9, 30), salon=otro_salon),
+            self._propuesta((8, 30), (9, 30), instructor=otro_instructor),
+            self._propuesta((8, 30), (9, 30), salon=otro_salon, instructor=otro_instructor),
+        ])
+        self.assertEqual(
+            [(c.indice, c.recurso, c.clase_id, c.con_propuesta) for c in conflictos],
+            [
+                (0, SALON, self.clase.pk, None), (0, INSTRUCTOR, self.clase.pk, None),
+                (1, INSTRUCTOR, self.clase.pk, None), (1, INSTRUCTOR, None, 0),
+                (2, SALON, self.clase.pk, None), (2, SALON, None, 0),
+                (3, SALON, None, 1), (3, INSTRUCTOR, None, 2),
+            ],
+        )
+
+    def test_clase_editada_borrada_o_cancelada_libera_el_horario(self):
+        self.assertEqual(detectar_conflictos([self._propuesta((8,), (9,), excluir_id=self.clase.pk)]), [])
+
+        self.clase.estado = CLASE_CANCELADA
+        self.clase.save()
+        self.assertEqual(detectar_conflictos([self._propuesta((8,), (9,))]), [])
+
+        otra = Clase.objects.create(
+            disciplina=self.disciplina, instructor=self.instructor, salon=self.salon,
+            fecha=self.clase.fecha, hora_inicio=time(8, 30), hora_fin=time(9, 30), cupo_maximo=2,
+        )
+        self.assertEqual(len(detectar_conflictos([self._propuesta((8,), (9,))])), 2)
+        otra.delete()
+        self.assertEqual(detectar_conflictos([self._propuesta((8,), (9,))]), [])
+
+
+class ProgramacionMasivaTests(ClaseTestMixin, TestCase):
+    """POST /api/clases/bulk/: todo el lote o nada."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_superuser(username='admin', email='admin@gym.com', password='Admin1234!')
+        )
+
+    def _programar(self, **cambios):
+        datos = {
+            'disciplina': self.disciplina.pk, 'instructor': self.instructor.pk, 'salon': self.salon.pk,
+            # Lunes y miércoles de dos semanas, desde el lunes de self.clase
+            'dias_semana': [0, 2], 'fecha_inicio': '2030-01-07', 'fecha_fin': '2030-01-18',
+            'hora_inicio': '10:00', 'hora_fin': '11:00', 'cupo_maximo': 10, **cambios,
+        }
+        return self.client.post('/api/clases/bulk/', datos, format='json')
+
+    def test_crea_una_clase_por_fecha(self):
+        response = self._programar()
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['total'], 4)
+        self.assertEqual(
+            list(Clase.objects.exclude(pk=self.clase.pk).order_by('fecha').values_list('fecha', flat=True)),
+            [date(2030, 1, 7), date(2030, 1, 9), date(2030, 1, 14), date(2030, 1, 16)],
+        )
+        self.assertEqual(HistorialActividad.objects.filter(accion__icontains='PROGRAMAR_LOTE').count(), 1)
+
+    def test_un_conflicto_rechaza_todo_el_lote(self):
+        otro_salon = Salon.objects.create(nombre='Sala B', capacidad=20)
+        # Solo el lunes 7 choca: mismo instructor, otro salón
+        response = self._programar(salon=otro_salon.pk, hora_inicio='08:30', hora_fin='09:30')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(c['fecha'], c['recurso'], c['clase_id']) for c in response.json()['conflictos']],
+            # Los errores de validación se serializan como texto
+            [('2030-01-07', 'instructor', str(self.clase.pk))],
+        )
+        self.assertEqual(Clase.objects.count(), 1)
+        self.assertFalse(HistorialActividad.objects.filter(accion__icontains='PROGRAMAR_LOTE').exists())
 
-# Create your tests here.
+    def test_reglas_invalidas(self):
+        self.assertIn('dias_semana', self._programar(dias_semana=[5], fecha_fin='2030-01-10').data)
+        self.assertIn('hora_fin', self._programar(hora_fin='09:00').data)
+        self.assertIn('cupo_maximo', self._programar(cupo_maximo=50).data)
+        self.assertEqual(Clase.objects.count(), 1)
@@ -1,13 +1,22 @@
-from rest_framework import generics, status
+from rest_framework import generics, serializers, status
+from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, inline_serializer, OpenApiParameter, OpenApiResponse
+from .horario import lunes_de, obtener_semana, etag_semana
 from .models import Salon, Clase, InscripcionClase
 from .serializers import (
     SalonSerializer, ClaseSerializer, ClaseListSerializer,
-    InscripcionClaseSerializer
+    ClaseRecurrenteSerializer, InscripcionClaseSerializer
 )
 from apps.audit.helpers import registrar_bitacora
+from apps.core.pagination import CursorPaginationMixin, KeysetPagination
+from apps.core.constants import INSCRIPCION_CONFIRMADA
 from apps.core.permissions import HasPermission, PermissionCodes
 
 
@@ -198,21 +207,185 @@ class ClaseDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance.delete()
 
 
+class ClaseBulkCreateView(APIView):
+    """
+    CU20: Programación masiva de clases
+    POST: Expande una regla semanal (dias_semana, hora_inicio/hora_fin,
+    fecha_inicio/fecha_fin) en una clase por fecha. Si alguna fecha choca con
+    el salón o el instructor no se crea ninguna y se listan los conflictos.
+    """
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = PermissionCodes.CLASE_CREATE
+
+    @extend_schema(
+        tags=["Clases"],
+        request=ClaseRecurrenteSerializer,
+        responses={
+            201: inline_serializer(
+                name='ClaseLoteCreado',
+                fields={
+                    'total': serializers.IntegerField(),
+                    'clases': ClaseListSerializer(many=True),
+                },
+            ),
+            400: OpenApiResponse(description="Datos inválidos o conflictos de salón/instructor (ninguna clase se crea)"),
+        },
+    )
+    def post(self, request):
+        serializer = ClaseRecurrenteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        clases = serializer.save()
+
+        datos = serializer.validated_data
+        primera, ultima = clases[0], clases[-1]
+
+        # Auditoría: un solo registro para todo el lote
+        registrar_bitacora(
+            request=request,
+            usuario=request.user,
+            modulo="CLASES",
+            accion="PROGRAMAR_LOTE",
+            descripcion=(
+                f"Programó {len(clases)} clases de {datos['disciplina'].nombre} "
+                f"del {primera.fecha} al {ultima.fecha} {datos['hora_inicio']}-{datos['hora_fin']} "
+                f"(Instructor: {datos['instructor'].get_full_name()}, Salón: {datos['salon'].nombre})"
+            ),
+            tipo_accion="create",
+            datos_adicionales={
+                "total": len(clases),
+                "dias_semana": sorted(set(datos['dias_semana'])),
+                "primer_id": primera.id,
+                "ultimo_id": ultima.id,
+            },
+        )
+
+        return Response(
+            {
+                "total": len(clases),
+                "clases": ClaseListSerializer(clases, many=True).data,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class ClaseSemanaView(APIView):
+    """
+    CU20: Horario semanal
+    GET: Salones × franjas horarias con la ocupación de cada clase de la
+    semana que contiene ?inicio= (YYYY-MM-DD, por defecto la actual).
+    Responde con ETag; con If-None-Match vigente retorna 304 sin consultar
+    la base de datos.
+    """
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = PermissionCodes.CLASE_VIEW
+
+    @extend_schema(
+        tags=["Clases"],
+        parameters=[
+            OpenApiParameter(name='inicio', description='Cualquier fecha de la semana (YYYY-MM-DD, por defecto hoy)', required=False, type=OpenApiTypes.DATE),
+            OpenApiParameter(name='If-None-Match', description='ETag de una respuesta anterior', required=False, type=str, location=OpenApiParameter.HEADER),
+        ],
+        responses={
+            200: inline_serializer(
+                name='HorarioSemanal',
+                fields={
+                    'inicio': serializers.DateField(),
+                    'fin': serializers.DateField(),
+                    'dias': serializers.ListField(child=serializers.DateField()),
+                    'franjas': inline_serializer(
+                        name='HorarioFranja',
+                        fields={
+                            'hora_inicio': serializers.TimeField(),
+                            'hora_fin': serializers.TimeField(),
+                        },
+                        many=True,
+                    ),
+                    'salones': inline_serializer(
+                        name='HorarioSalon',
+                        fields={
+                            'id': serializers.IntegerField(),
+                            'nombre': serializers.CharField(),
+                            'capacidad': serializers.IntegerField(),
+                            'clases': inline_serializer(
+                                name='HorarioClase',
+                                fields={
+                                    'id': serializers.IntegerField(),
+                                    'fecha': serializers.DateField(),
+                                    'dia': serializers.IntegerField(help_text='0 = lunes'),
+                                    'franja': serializers.IntegerField(help_text='Índice en franjas'),
+                                    'hora_inicio': serializers.TimeField(),
+                                    'hora_fin': serializers.TimeField(),
+                                    'disciplina': serializers.CharField(),
+                                    'instructor_id': serializers.IntegerField(),
+                                    'instructor': serializers.CharField(),
+                                    'estado': serializers.CharField(),
+                                    'cupo_maximo': serializers.IntegerField(),
+                                    'inscritos_confirmados': serializers.IntegerField(),
+                                    'cupos_disponibles': serializers.IntegerField(),
+                                },
+                                many=True,
+                            ),
+                        },
+                        many=True,
+                    ),
+                },
+            ),
+            304: OpenApiResponse(description="El horario no cambió desde el ETag enviado en If-None-Match"),
+            400: OpenApiResponse(description="Formato de fecha inválido en 'inicio'"),
+        },
+    )
+    def get(self, request):
+        inicio = request.query_params.get('inicio')
+        if inicio:
+            try:
+                fecha = parse_date(inicio)
+            except ValueError:
+                fecha = None
+            if fecha is None:
+                return Response(
+                    {"inicio": "Formato de fecha inválido. Use YYYY-MM-DD."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        else:
+            fecha = timezone.localdate()
+        lunes = lunes_de(fecha)
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            etag = etag_semana(lunes)
+            if etag in parse_etags(if_none_match) or if_none_match.strip() == '*':
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = etag
+                return response
+
+        etag, datos = obtener_semana(lunes)
+        response = Response(datos)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
 # ==========================================
 # INSCRIPCIONES A CLASES
 # ==========================================
 
-class InscripcionClaseListCreateView(generics.ListCreateAPIView):
+class InscripcionClaseCursorPagination(KeysetPagination):
+    page_size = 10
+    ordering = ('-fecha_inscripcion', '-id')
+
+
+class InscripcionClaseListCreateView(CursorPaginationMixin, generics.ListCreateAPIView):
     """
-    GET: Listar inscripciones a clases
+    GET: Listar inscripciones a clases (?cursor= para paginación por cursor)
     POST: Inscribir cliente a clase
     """
     permission_classes = [IsAuthenticated, HasPermission]
     required_permissions = [PermissionCodes.INSCRIPCION_CLASE_VIEW]
     serializer_class = InscripcionClaseSerializer
+    cursor_pagination_class = InscripcionClaseCursorPagination
 
     def get_queryset(self):
-        queryset = InscripcionClase.objects.select_related('clase', 'cliente').all()
+        queryset = InscripcionClase.objects.select_related('clase__disciplina', 'cliente').all()
         
         # Filtro por clase
         clase_id = self.request.query_params.get('clase', None)
@@ -239,8 +412,8 @@ class InscripcionClaseListCreateView(generics.ListCreateAPIView):
             request=self.request,
             usuario=self.request.user,
             modulo="INSCRIPCIONES_CLASE",
-            accion="INSCRIBIR",
-            descripcion=f"Inscribió a {inscripcion.cliente.nombre_completo} en clase de {inscripcion.clase.disciplina.nombre} (ID: {inscripcion.id}, Clase: {inscripcion.clase.fecha} {inscripcion.clase.hora_inicio})"
+            accion="INSCRIBIR" if inscripcion.estado == INSCRIPCION_CONFIRMADA else "LISTA_ESPERA",
+            descripcion=f"{'Inscribió' if inscripcion.estado == INSCRIPCION_CONFIRMADA else 'Puso en lista de espera'} a {inscripcion.cliente.nombre_completo} en clase de {inscripcion.clase.disciplina.nombre} (ID: {inscripcion.id}, Clase: {inscripcion.clase.fecha} {inscripcion.clase.hora_inicio})"
         )
 
 
@@ -5,3 +5,6 @@ class ClientsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.clients'
     verbose_name = 'Clientes'
+
+    def ready(self):
+        from . import signals  # noqa: F401
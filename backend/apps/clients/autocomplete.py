@@ -0,0 +1,231 @@
+"""
+Índice de prefijos en memoria para el autocompletado de clientes
+
+Dos listas ordenadas (bisect) con claves normalizadas (ver
+apps.core.utils.normalizar_busqueda):
+    principal:   nombre completo y CI de cada cliente
+    secundario:  el nombre a partir de cada palabra siguiente
+                 ("jose luis perez" -> "luis perez", "perez")
+
+Una consulta es una búsqueda binaria + un recorrido de a lo sumo `limite`
+claves en cada lista, sin tocar la base de datos. Primero van las
+coincidencias del inicio del nombre o del CI, después las de otras
+palabras, cada grupo en orden alfabético.
+
+El índice se carga completo (una consulta) la primera vez que se usa y se
+mantiene con los signals de Client al confirmar cada transacción. Cada
+proceso tiene su propio índice: para acotar cuánto puede quedar
+desactualizado frente a escrituras de otros workers se reconstruye cada
+CLIENT_AUTOCOMPLETE_REFRESH segundos en un hilo aparte. Mientras tanto las
+consultas usan el índice anterior, y los cambios que llegan por signals
+durante la reconstrucción se vuelven a aplicar sobre el índice nuevo antes
+de reemplazarlo.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import connection
+
+from apps.core.utils import normalizar_busqueda, solo_digitos
+from .models import Client
+
+logger = logging.getLogger(__name__)
+
+
+def _refresh_seconds():
+    return getattr(settings, 'CLIENT_AUTOCOMPLETE_REFRESH', 300)
+
+
+def claves_cliente(nombre_completo, ci):
+    """Retorna (claves principales, claves secundarias) de un cliente."""
+    nombre = normalizar_busqueda(nombre_completo)
+    principales = [nombre] if nombre else []
+    ci = solo_digitos(ci)
+    if ci:
+        principales.append(ci)
+    palabras = nombre.split()
+    secundarias = [' '.join(palabras[i:]) for i in range(1, len(palabras))]
+    return principales, secundarias
+
+
+class IndicePrefijos:
+    def __init__(self):
+        self._principal = []     # [(clave, id)]
+        self._secundario = []    # [(clave, id)]
+        self._claves = {}        # id -> (principales, secundarias)
+        self._datos = {}         # id -> {"id", "nombre_completo", "ci"}
+        self._lock = threading.RLock()
+        self._pendientes = None  # cambios recibidos durante una recarga
+        self.construido_en = None
+
+    def __len__(self):
+        return len(self._datos)
+
+    @property
+    def recargando(self):
+        return self._pendientes is not None
+
+    # ---------- Escritura ----------
+
+    def iniciar_recarga(self):
+        """
+        Empieza a registrar los cambios de agregar()/quitar(): cargar() los
+        vuelve a aplicar, porque las filas que recibe pueden ser anteriores.
+        """
+        with self._lock:
+            self._pendientes = []
+
+    def cancelar_recarga(self):
+        with self._lock:
+            self._pendientes = None
+
+    def cargar(self, filas):
+        """Reemplaza el contenido con `filas` de (id, nombre, apellido, ci)."""
+        principal, secundario, claves, datos = [], [], {}, {}
+        for cliente_id, nombre, apellido, ci in filas:
+            nombre_completo = f"{nombre} {apellido}"
+            propias = claves_cliente(nombre_completo, ci)
+            principal.extend((clave, cliente_id) for clave in propias[0])
+            secundario.extend((clave, cliente_id) for clave in propias[1])
+            claves[cliente_id] = propias
+            datos[cliente_id] = {"id": cliente_id, "nombre_completo": nombre_completo, "ci": ci}
+        principal.sort()
+        secundario.sort()
+        with self._lock:
+            self._principal, self._secundario = principal, secundario
+            self._claves, self._datos = claves, datos
+            pendientes, self._pendientes = self._pendientes or [], None
+            for operacion, args in pendientes:
+                operacion(*args)
+            self.construido_en = time.monotonic()
+
+    def agregar(self, cliente_id, nombre_completo, ci):
+        with self._lock:
+            if self._pendientes is not None:
+                self._pendientes.append((self.agregar, (cliente_id, nombre_completo, ci)))
+            self._quitar(cliente_id)
+            principales, secundarias = claves_cliente(nombre_completo, ci)
+            for clave in principales:
+                insort(self._principal, (clave, cliente_id))
+            for clave in secundarias:
+                insort(self._secundario, (clave, cliente_id))
+            self._claves[cliente_id] = (principales, secundarias)
+            self._datos[cliente_id] = {"id": cliente_id, "nombre_completo": nombre_completo, "ci": ci}
+
+    def quitar(self, cliente_id):
+        with self._lock:
+            if self._pendientes is not None:
+                self._pendientes.append((self.quitar, (cliente_id,)))
+            self._quitar(cliente_id)
+
+    def _quitar(self, cliente_id):
+        propias = self._claves.pop(cliente_id, None)
+        self._datos.pop(cliente_id, None)
+        if propias is None:
+            return
+        for lista, claves in ((self._principal, propias[0]), (self._secundario, propias[1])):
+            for clave in claves:
+                posicion = bisect_left(lista, (clave, cliente_id))
+                if posicion < len(lista) and lista[posicion] == (clave, cliente_id):
+                    del lista[posicion]
+
+    # ---------- Lectura ----------
+
+    def buscar(self, q, limite=10):
+        """Hasta `limite` clientes cuyo nombre, alguna palabra o CI empieza con `q`."""
+        prefijo = normalizar_busqueda(q)
+        if not prefijo or limite <= 0:
+            return []
+        vistos = set()
+        resultados = []
+        with self._lock:
+            for lista in (self._principal, self._secundario):
+                posicion = bisect_left(lista, (prefijo,))
+                while posicion < len(lista) and len(resultados) < limite:
+                    clave, cliente_id = lista[posicion]
+                    if not clave.startswith(prefijo):
+                        break
+                    if cliente_id not in vistos:
+                        vistos.add(cliente_id)
+                        resultados.append(self._datos[cliente_id])
+                    posicion += 1
+                if len(resultados) >= limite:
+                    break
+        return resultados
+
+
+_indice = IndicePrefijos()
+_carga_lock = threading.Lock()
+
+
+def _recargar():
+    _indice.iniciar_recarga()
+    try:
+        _indice.cargar(Client.objects.values_list('id', 'nombre', 'apellido', 'ci').iterator())
+    except BaseException:
+        _indice.cancelar_recarga()
+        raise
+
+
+def _recargar_en_segundo_plano():
+    try:
+        _recargar()
+    except Exception:
+        # Se sigue usando el índice anterior; se reintenta en la próxima consulta
+        logger.exception('No se pudo reconstruir el índice de autocompletado')
+    finally:
+        connection.close()  # la conexión de este hilo no se reutiliza
+        _carga_lock.release()
+
+
+def get_index():
+    """
+    El índice del proceso. La primera carga es en la consulta que lo
+    necesita; si venció, se reconstruye en otro hilo y se responde con el
+    índice actual.
+    """
+    construido = _indice.construido_en
+    if construido is None:
+        with _carga_lock:
+            if _indice.construido_en is None:
+                _recargar()
+    elif time.monotonic() - construido > _refresh_seconds() and _carga_lock.acquire(blocking=False):
+        # El hilo libera _carga_lock al terminar: una sola recarga a la vez
+        try:
+            threading.Thread(
+                target=_recargar_en_segundo_plano, name='autocomplete-refresh', daemon=True
+            ).start()
+        except BaseException:
+            _carga_lock.release()
+            raise
+    return _indice
+
+
+def index_loaded():
+    """True si el índice está cargado o cargándose (los signals deben avisarle)."""
+    return _indice.construido_en is not None or _indice.recargando
+
+
+def indexar(cliente_id, nombre_completo, ci):
+    """Agrega o actualiza un cliente (si el índice ya está cargado)."""
+    if index_loaded():
+        _indice.agregar(cliente_id, nombre_completo, ci)
+
+
+def desindexar(cliente_id):
+    if index_loaded():
+        _indice.quitar(cliente_id)
+
+
+def reset_index():
+    """Descarta el índice: se vuelve a cargar en la próxima consulta."""
+    with _carga_lock:
+        _indice.cargar([])
+        _indice.construido_en = None
+
+
+def autocompletar(q, limite=10):
+    return get_index().buscar(q, limite)
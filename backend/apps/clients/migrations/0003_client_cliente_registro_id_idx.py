@@ -0,0 +1,17 @@
+# Generated by Django 5.0 on 2026-10-17 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_alter_client_experiencia'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['-fecha_registro', '-id'], name='cliente_registro_id_idx'),
+        ),
+    ]
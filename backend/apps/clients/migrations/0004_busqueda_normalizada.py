@@ -0,0 +1,66 @@
+# Generated by Django 5.0 on 2026-10-17 10:26
+
+from django.db import migrations, models
+
+
+def rellenar_campos_busqueda(apps, schema_editor):
+    from apps.core.utils import normalizar_busqueda, solo_digitos
+
+    Client = apps.get_model('clients', 'Client')
+    clientes = list(Client.objects.only('id', 'nombre', 'apellido', 'ci', 'telefono'))
+    for cliente in clientes:
+        cliente.nombre_busqueda = normalizar_busqueda(f"{cliente.nombre} {cliente.apellido}")[:101]
+        cliente.ci_busqueda = solo_digitos(cliente.ci)[:20]
+        cliente.telefono_busqueda = solo_digitos(cliente.telefono)[:20]
+    Client.objects.bulk_update(
+        clientes, ['nombre_busqueda', 'ci_busqueda', 'telefono_busqueda'], batch_size=500
+    )
+
+
+def instalar_trigramas(apps, schema_editor):
+    from apps.clients import search
+    search.install(schema_editor.connection, ['nombre_busqueda'])
+
+
+def quitar_trigramas(apps, schema_editor):
+    from apps.clients import search
+    search.uninstall(schema_editor.connection, ['nombre_busqueda'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0003_client_cliente_registro_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='ci_busqueda',
+            field=models.CharField(blank=True, editable=False, help_text='Solo dígitos', max_length=20, verbose_name='CI normalizado'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='nombre_busqueda',
+            field=models.CharField(blank=True, editable=False, help_text='Nombre y apellido en minúsculas y sin tildes', max_length=101, verbose_name='Nombre normalizado'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='telefono_busqueda',
+            field=models.CharField(blank=True, editable=False, help_text='Solo dígitos', max_length=20, verbose_name='Teléfono normalizado'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['ci_busqueda'], name='cliente_ci_busq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['telefono_busqueda'], name='cliente_tel_busq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['nombre_busqueda'], name='cliente_nombre_busq_idx'),
+        ),
+        migrations.RunPython(rellenar_campos_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(instalar_trigramas, quitar_trigramas),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0 on 2026-10-17 11:48
+
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def rellenar_email_busqueda(apps, schema_editor):
+    Client = apps.get_model('clients', 'Client')
+    Client.objects.update(email_busqueda=Lower(Trim('email')))
+
+
+def instalar_trigramas(apps, schema_editor):
+    from apps.clients import search
+    search.install(schema_editor.connection, ['email_busqueda'])
+
+
+def quitar_trigramas(apps, schema_editor):
+    from apps.clients import search
+    search.uninstall(schema_editor.connection, ['email_busqueda'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0004_busqueda_normalizada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='email_busqueda',
+            field=models.CharField(blank=True, editable=False, help_text='Email en minúsculas', max_length=254, verbose_name='Email normalizado'),
+        ),
+        migrations.RunPython(rellenar_email_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(instalar_trigramas, quitar_trigramas),
+    ]
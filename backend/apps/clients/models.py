@@ -1,7 +1,7 @@
 from django.db import models  # type: ignore
 from django.core.exceptions import ValidationError
 from apps.core.models import TimeStampedModel
-from apps.core.utils import validar_ci, normalizar_telefono
+from apps.core.utils import validar_ci, normalizar_telefono, normalizar_busqueda, solo_digitos
 from apps.core.constants import NIVELES_EXPERIENCIA, EXPERIENCIA_PRINCIPIANTE
 
 
@@ -40,6 +40,37 @@ class Client(TimeStampedModel):
     
     fecha_registro = models.DateField(auto_now_add=True, verbose_name="Fecha de Registro")
 
+    # Columnas normalizadas para la búsqueda (ver apps.clients.search);
+    # se recalculan en save()
+    nombre_busqueda = models.CharField(
+        max_length=101,
+        blank=True,
+        editable=False,
+        verbose_name="Nombre normalizado",
+        help_text="Nombre y apellido en minúsculas y sin tildes"
+    )
+    ci_busqueda = models.CharField(
+        max_length=20,
+        blank=True,
+        editable=False,
+        verbose_name="CI normalizado",
+        help_text="Solo dígitos"
+    )
+    telefono_busqueda = models.CharField(
+        max_length=20,
+        blank=True,
+        editable=False,
+        verbose_name="Teléfono normalizado",
+        help_text="Solo dígitos"
+    )
+    email_busqueda = models.CharField(
+        max_length=254,
+        blank=True,
+        editable=False,
+        verbose_name="Email normalizado",
+        help_text="Email en minúsculas"
+    )
+
     class Meta:
         db_table = 'cliente'
         verbose_name = 'Cliente'
@@ -48,6 +79,12 @@ class Client(TimeStampedModel):
         indexes = [
             models.Index(fields=['ci'], name='cliente_ci_idx'),
             models.Index(fields=['telefono'], name='cliente_telefono_idx'),
+            # Paginación por cursor (fecha_registro, id)
+            models.Index(fields=['-fecha_registro', '-id'], name='cliente_registro_id_idx'),
+            # Búsqueda exacta / por prefijo (rango sobre el btree)
+            models.Index(fields=['ci_busqueda'], name='cliente_ci_busq_idx'),
+            models.Index(fields=['telefono_busqueda'], name='cliente_tel_busq_idx'),
+            models.Index(fields=['nombre_busqueda'], name='cliente_nombre_busq_idx'),
         ]
 
     def __str__(self):
@@ -72,7 +109,20 @@ class Client(TimeStampedModel):
         if self.telefono:
             self.telefono = normalizar_telefono(self.telefono)
     
+    def actualizar_campos_busqueda(self):
+        """Recalcula las columnas normalizadas de búsqueda"""
+        self.nombre_busqueda = normalizar_busqueda(self.nombre_completo)[:101]
+        self.ci_busqueda = solo_digitos(self.ci)[:20]
+        self.telefono_busqueda = solo_digitos(self.telefono)[:20]
+        self.email_busqueda = (self.email or '').strip().lower()
+    
     def save(self, *args, **kwargs):
         """Sobrescribe save para ejecutar validaciones"""
         self.clean()
+        self.actualizar_campos_busqueda()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {
+                'nombre_busqueda', 'ci_busqueda', 'telefono_busqueda', 'email_busqueda'
+            }
         super().save(*args, **kwargs)
@@ -0,0 +1,144 @@
+"""
+Búsqueda de clientes (parámetro `search` de /api/clients/)
+
+Trabaja sobre columnas normalizadas que Client.save() mantiene:
+    nombre_busqueda     "nombre apellido" en minúsculas y sin tildes
+    ci_busqueda         solo dígitos
+    telefono_busqueda   solo dígitos
+    email_busqueda      email en minúsculas
+
+Cada palabra de la búsqueda debe coincidir (AND):
+    - Solo dígitos: prefijo de CI o de teléfono. Se consulta como rango
+      (>= '123' AND < '124') para que use el btree en cualquier motor. A
+      diferencia de la búsqueda anterior (icontains) no encuentra dígitos
+      en medio del CI/teléfono ni en el email.
+    - Con '@': subcadena del email.
+    - Texto: subcadena del nombre normalizado o del email ("gmail.com").
+      En PostgreSQL las resuelven los índices GIN de pg_trgm
+      (cliente_nombre_trgm_idx, cliente_email_trgm_idx); en SQLite es un
+      recorrido sobre columnas angostas.
+
+Orden por relevancia: CI o nombre exacto, nombre que empieza con la
+búsqueda, palabra que empieza con la búsqueda y el resto; en PostgreSQL
+se desempata por similitud de trigramas.
+"""
+from functools import reduce
+from operator import and_, or_
+
+from django.db import connection, transaction
+from django.db.models import Case, FloatField, Func, IntegerField, Q, Value, When
+
+from apps.core.utils import normalizar_busqueda, solo_digitos
+
+TABLE = 'cliente'
+# Columna -> índice GIN de trigramas (PostgreSQL)
+PG_TRGM_INDEXES = {
+    'nombre_busqueda': 'cliente_nombre_trgm_idx',
+    'email_busqueda': 'cliente_email_trgm_idx',
+}
+MAX_TERMS = 6
+
+_trgm_available = {}
+
+
+# ==========================================
+# INSTALACIÓN (migraciones)
+# ==========================================
+
+def install(conn, columnas=None):
+    """PostgreSQL: extensión pg_trgm e índices GIN de trigramas (por defecto, todos)."""
+    if conn.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except Exception:
+        # Sin privilegios para crear la extensión: la búsqueda sigue
+        # funcionando, solo que sin índice de trigramas
+        return
+    with conn.cursor() as cursor:
+        for columna in columnas or PG_TRGM_INDEXES:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {PG_TRGM_INDEXES[columna]} ON {TABLE} '
+                f'USING GIN ({columna} gin_trgm_ops)'
+            )
+    _trgm_available.clear()
+
+
+def uninstall(conn, columnas=None):
+    if conn.vendor != 'postgresql':
+        return
+    with conn.cursor() as cursor:
+        for columna in columnas or PG_TRGM_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {PG_TRGM_INDEXES[columna]}')
+    _trgm_available.clear()
+
+
+def trigram_available():
+    """True si la extensión pg_trgm está instalada (solo PostgreSQL)."""
+    if connection.vendor != 'postgresql':
+        return False
+    key = connection.settings_dict.get('NAME')
+    if key not in _trgm_available:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trgm_available[key] = cursor.fetchone() is not None
+    return _trgm_available[key]
+
+
+# ==========================================
+# CONSULTA
+# ==========================================
+
+def _prefijo(campo, valor):
+    """Q de prefijo como rango, para que use el índice btree."""
+    siguiente = valor[:-1] + chr(ord(valor[-1]) + 1)
+    return Q(**{f'{campo}__gte': valor, f'{campo}__lt': siguiente})
+
+
+def _filtro_palabra(palabra_original, palabra):
+    email = Q(email_busqueda__contains=palabra_original.lower())
+    if '@' in palabra_original:
+        return email
+    if palabra.isdigit():
+        return _prefijo('ci_busqueda', palabra) | _prefijo('telefono_busqueda', palabra)
+    return Q(nombre_busqueda__contains=palabra) | email
+
+
+def apply_search(queryset, search):
+    """
+    Filtra y ordena por relevancia los clientes que coinciden con `search`.
+    Retorna el queryset sin cambios si no hay nada que buscar.
+    """
+    originales = (search or '').split()[:MAX_TERMS]
+    palabras = [normalizar_busqueda(p) for p in originales]
+    pares = [(o, p) for o, p in zip(originales, palabras) if p]
+    if not pares:
+        return queryset
+
+    queryset = queryset.filter(reduce(and_, [_filtro_palabra(o, p) for o, p in pares]))
+
+    texto = ' '.join(p for _, p in pares)
+    digitos = solo_digitos(texto)
+    exactos = [Q(nombre_busqueda=texto)]
+    if digitos and texto.isdigit():
+        exactos.append(Q(ci_busqueda=digitos))
+    queryset = queryset.annotate(
+        busqueda_rank=Case(
+            When(reduce(or_, exactos), then=Value(0)),
+            When(nombre_busqueda__startswith=texto, then=Value(1)),
+            When(nombre_busqueda__contains=f' {texto}', then=Value(2)),
+            default=Value(3),
+            output_field=IntegerField(),
+        )
+    )
+
+    ordering = ['busqueda_rank']
+    if trigram_available():
+        queryset = queryset.annotate(
+            busqueda_similitud=Func(
+                'nombre_busqueda', Value(texto), function='similarity', output_field=FloatField()
+            )
+        )
+        ordering.append('-busqueda_similitud')
+    return queryset.order_by(*ordering, 'nombre_busqueda', 'id')
@@ -0,0 +1,27 @@
+"""
+Signals de Clientes.
+Mantienen al día el índice de autocompletado en memoria
+(ver apps.clients.autocomplete) al confirmar cada transacción.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import autocomplete
+from .models import Client
+
+
+@receiver(post_save, sender=Client)
+def indexar_cliente(sender, instance, raw=False, **kwargs):
+    if raw or not autocomplete.index_loaded():
+        return
+    cliente_id, nombre_completo, ci = instance.pk, instance.nombre_completo, instance.ci
+    transaction.on_commit(lambda: autocomplete.indexar(cliente_id, nombre_completo, ci))
+
+
+@receiver(post_delete, sender=Client)
+def desindexar_cliente(sender, instance, **kwargs):
+    if not autocomplete.index_loaded():
+        return
+    cliente_id = instance.pk
+    transaction.on_commit(lambda: autocomplete.desindexar(cliente_id))
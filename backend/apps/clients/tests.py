@@ -1,3 +1,119 @@
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from . import autocomplete
+from .models import Client
+from .search import apply_search
+
+
+class AutocompleteTests(TestCase):
+    """Índice de prefijos en memoria (apps.clients.autocomplete)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = Client.objects.create(nombre='Ana', apellido='Pérez', ci='4455667')
+        cls.andres = Client.objects.create(nombre='Andrés', apellido='Álvarez', ci='1234567')
+        cls.juan = Client.objects.create(nombre='Juan', apellido='Anaya', ci='7654321')
+
+    def setUp(self):
+        autocomplete.reset_index()
+        self.addCleanup(autocomplete.reset_index)
+
+    def _ids(self, q, limite=10):
+        return [c['id'] for c in autocomplete.autocompletar(q, limite)]
+
+    def test_orden_de_prefijos(self):
+        # Primero el inicio del nombre (alfabético), después otras palabras
+        self.assertEqual(self._ids('an'), [self.ana.pk, self.andres.pk, self.juan.pk])
+        self.assertEqual(self._ids('an', limite=2), [self.ana.pk, self.andres.pk])
+        self.assertEqual(self._ids('anaya'), [self.juan.pk])
+        self.assertEqual(self._ids('123'), [self.andres.pk])
+        self.assertEqual(self._ids('zz'), [])
+
+    def test_sin_tildes_ni_mayusculas(self):
+        self.assertEqual(self._ids('ANDRÉS'), [self.andres.pk])
+        self.assertEqual(self._ids('andres alv'), [self.andres.pk])
+        self.assertEqual(self._ids('alvarez'), [self.andres.pk])
+        self.assertEqual(autocomplete.autocompletar('perez')[0]['nombre_completo'], 'Ana Pérez')
+
+    def test_signals_agregan_y_quitan(self):
+        autocomplete.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo = Client.objects.create(nombre='Ángela', apellido='Rojas', ci='9988776')
+        with self.assertNumQueries(0):
+            self.assertEqual(self._ids('angela'), [nuevo.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo.nombre = 'Beatriz'
+            nuevo.save()
+        self.assertEqual(self._ids('angela'), [])
+        self.assertEqual(self._ids('beatriz'), [nuevo.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo.delete()
+        self.assertEqual(self._ids('beatriz'), [])
+
+    def test_recarga_reaplica_cambios_concurrentes(self):
+        indice = autocomplete.IndicePrefijos()
+        indice.cargar([(1, 'Ana', 'Pérez', '111')])
+        indice.iniciar_recarga()
+        # Llegan por signals mientras se leen las filas (ya viejas)
+        indice.agregar(2, 'Bruno Díaz', '222')
+        indice.quitar(1)
+        indice.cargar([(1, 'Ana', 'Pérez', '111')])
+        self.assertFalse(indice.recargando)
+        self.assertEqual([c['id'] for c in indice.buscar('bruno')], [2])
+        self.assertEqual(indice.buscar('ana'), [])
+
+    def test_recarga_vencida_en_segundo_plano(self):
+        autocomplete.get_index()
+        autocomplete._indice.construido_en -= autocomplete._refresh_seconds() + 1
+        with mock.patch.object(autocomplete.threading, 'Thread') as thread:
+            self.addCleanup(autocomplete._carga_lock.release)
+            with self.assertNumQueries(0):
+                self.assertEqual(self._ids('juan'), [self.juan.pk])
+                self.assertEqual(self._ids('juan'), [self.juan.pk])
+        # Una sola recarga a la vez, fuera de la petición
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once()
+
+
+class ClientSearchTests(TestCase):
+    """Parámetro `search` de /api/clients/ (apps.clients.search)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.jose = Client.objects.create(
+            nombre='José Luis', apellido='Núñez', ci='4455667', telefono='70011223', email='jlnunez@gmail.com'
+        )
+        cls.maria = Client.objects.create(
+            nombre='María', apellido='Pérez', ci='1234567', telefono='61234567', email='maria.perez@Empresa.BO'
+        )
+
+    def _ids(self, search):
+        return list(apply_search(Client.objects.all(), search).values_list('id', flat=True))
+
+    def test_nombre_sin_tildes(self):
+        self.assertEqual(self._ids('jose nunez'), [self.jose.pk])
+        self.assertEqual(self._ids('NÚÑEZ'), [self.jose.pk])
+        self.assertEqual(self._ids('luis'), [self.jose.pk])
+        self.assertEqual(self._ids('perez maria'), [self.maria.pk])
+
+    def test_digitos_de_ci_y_telefono(self):
+        self.assertEqual(self._ids('4455'), [self.jose.pk])
+        self.assertEqual(self._ids('6123'), [self.maria.pk])
+        # Prefijo, no subcadena
+        self.assertEqual(self._ids('5667'), [])
+
+    def test_email(self):
+        self.assertEqual(self._ids('gmail.com'), [self.jose.pk])
+        self.assertEqual(self._ids('jlnunez@'), [self.jose.pk])
+        self.assertEqual(self._ids('@empresa.bo'), [self.maria.pk])
+        self.assertEqual(self._ids('jlnu'), [self.jose.pk])
+
+    def test_email_normalizado_al_guardar(self):
+        self.assertEqual(Client.objects.get(pk=self.maria.pk).email_busqueda, 'maria.perez@empresa.bo')
+        self.maria.email = 'MP@otro.com'
+        self.maria.save(update_fields=['email'])
+        self.assertEqual(Client.objects.get(pk=self.maria.pk).email_busqueda, 'mp@otro.com')
@@ -1,13 +1,15 @@
-from rest_framework import status, permissions
+from rest_framework import serializers, status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q
-from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
+from drf_spectacular.utils import extend_schema, inline_serializer, OpenApiParameter, OpenApiExample
 
 from .models import Client
+from .autocomplete import autocompletar
+from .search import apply_search
 from .serializers import ClientSerializer, ClientListSerializer
 from apps.audit.models import HistorialActividad as Bitacora
+from apps.core.pagination import KeysetPagination, is_cursor_request
 
 
 class ClientPagination(PageNumberPagination):
@@ -16,12 +18,18 @@ class ClientPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class ClientCursorPagination(KeysetPagination):
+    page_size = 10
+    ordering = ('-fecha_registro', '-id')
+
+
 @extend_schema(
     tags=["Clientes"],
     parameters=[
-        OpenApiParameter(name='search', description='Buscar por nombre, apellido, CI o email', required=False, type=str),
+        OpenApiParameter(name='search', description='Buscar por nombre o apellido (sin distinguir tildes), prefijo de CI o teléfono, o email', required=False, type=str),
         OpenApiParameter(name='page', description='Número de página', required=False, type=int),
         OpenApiParameter(name='page_size', description='Cantidad de resultados por página', required=False, type=int),
+        OpenApiParameter(name='cursor', description='Paginación por cursor (vacío = primera página, sin total)', required=False, type=str),
     ],
     responses={200: ClientListSerializer(many=True)}
 )
@@ -38,18 +46,12 @@ class ClientListCreateView(APIView):
         
         queryset = Client.objects.all()
         
-        # Aplicar búsqueda
+        # Aplicar búsqueda (columnas normalizadas + índices, ordenado por relevancia)
         if search:
-            queryset = queryset.filter(
-                Q(nombre__icontains=search) |
-                Q(apellido__icontains=search) |
-                Q(ci__icontains=search) |
-                Q(email__icontains=search) |
-                Q(telefono__icontains=search)
-            )
+            queryset = apply_search(queryset, search)
         
         # Paginación
-        paginator = ClientPagination()
+        paginator = ClientCursorPagination() if is_cursor_request(request) else ClientPagination()
         page = paginator.paginate_queryset(queryset, request)
         
         if page is not None:
@@ -108,6 +110,50 @@ class ClientListCreateView(APIView):
         )
 
 
+@extend_schema(
+    tags=["Clientes"],
+    parameters=[
+        OpenApiParameter(name='q', description='Inicio del nombre, de cualquier palabra del nombre o del CI (sin distinguir tildes)', required=True, type=str),
+        OpenApiParameter(name='limit', description='Cantidad máxima de resultados (por defecto 10, máximo 50)', required=False, type=int),
+    ],
+    responses={
+        200: inline_serializer(
+            name='ClienteAutocompletado',
+            fields={
+                'results': inline_serializer(
+                    name='ClienteSugerencia',
+                    fields={
+                        'id': serializers.IntegerField(),
+                        'nombre_completo': serializers.CharField(),
+                        'ci': serializers.CharField(),
+                    },
+                    many=True,
+                ),
+            },
+        ),
+    },
+)
+class ClientAutocompleteView(APIView):
+    """
+    GET: Autocompletado de clientes para recepción.
+    Se resuelve con un índice de prefijos en memoria (apps.clients.autocomplete),
+    sin consultar la base de datos.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    default_limit = 10
+    max_limit = 50
+
+    def get(self, request):
+        q = request.query_params.get('q', '').strip()
+        try:
+            limite = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limite = self.default_limit
+        limite = max(1, min(limite, self.max_limit))
+
+        return Response({"results": autocompletar(q, limite) if q else []})
+
+
 @extend_schema(
     tags=["Clientes"],
     responses={200: ClientSerializer}
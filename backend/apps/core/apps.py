@@ -6,3 +6,14 @@ class CoreConfig(AppConfig):
     name = 'apps.core'
     verbose_name = 'Núcleo'
     verbose_name = 'Núcleo'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import metrics, slow_queries
+
+        # Tiempo en serializers para MetricsMiddleware
+        if metrics.config()['ENABLED']:
+            metrics.instrumentar_serializers()
+        # Registro de consultas lentas en cada conexión nueva
+        connection_created.connect(slow_queries.instalar, dispatch_uid='core.slow_queries')
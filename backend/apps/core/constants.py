@@ -35,14 +35,20 @@ INSCRIPCION_CONFIRMADA = 'confirmada'
 INSCRIPCION_CANCELADA_CLASE = 'cancelada'
 INSCRIPCION_ASISTIO = 'asistio'
 INSCRIPCION_NO_ASISTIO = 'no_asistio'
+INSCRIPCION_EN_ESPERA = 'en_espera'
 
 ESTADOS_INSCRIPCION_CLASE = [
     (INSCRIPCION_CONFIRMADA, 'Confirmada'),
     (INSCRIPCION_CANCELADA_CLASE, 'Cancelada'),
     (INSCRIPCION_ASISTIO, 'Asistió'),
     (INSCRIPCION_NO_ASISTIO, 'No Asistió'),
+    (INSCRIPCION_EN_ESPERA, 'En Lista de Espera'),
 ]
 
+# Estados que ocupan un cupo de la clase (Clase.inscritos_confirmados):
+# marcar la asistencia no libera el lugar
+ESTADOS_OCUPAN_CUPO = (INSCRIPCION_CONFIRMADA, INSCRIPCION_ASISTIO, INSCRIPCION_NO_ASISTIO)
+
 # Métodos de pago
 METODO_EFECTIVO = 'efectivo'
 METODO_TARJETA = 'tarjeta'
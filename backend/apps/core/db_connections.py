@@ -0,0 +1,72 @@
+"""
+Reutilización de conexiones a la base de datos
+
+La configuración está en settings.DATABASES (CONN_MAX_AGE y
+CONN_HEALTH_CHECKS), armada desde variables de entorno. Acá está el calentamiento al arrancar: config/wsgi.py llama a
+calentar() para que la primera petición de cada worker no pague la conexión
+(TCP + autenticación con PostgreSQL).
+
+El benchmark que compara los modos está en benchmarks.runner.ejecutar_conexiones
+(manage.py benchmark --connections).
+"""
+import logging
+import os
+import sys
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+
+def reutiliza(conn):
+    """True si la conexión sobrevive entre peticiones (CONN_MAX_AGE)."""
+    return bool(conn.settings_dict.get('CONN_MAX_AGE'))
+
+
+def calentar(aliases=None):
+    """
+    Abre y verifica (SELECT 1) la conexión de cada alias que la reutiliza.
+    Un error no impide arrancar:
+    la conexión se abrirá en la primera petición. Retorna {alias: ms} o
+    {alias: 'error: ...'}.
+
+    Las conexiones persistentes (CONN_MAX_AGE) son por hilo: calentarlas
+    solo ayuda si el hilo que importa config/wsgi.py es el que atiende las
+    peticiones (gunicorn con workers sync, uwsgi sin hilos). Con gunicorn
+    gthread conviene DATABASE_WARMUP=False, y con --preload la conexión del
+    proceso padre se descarta al hacer fork. En runserver, que atiende cada
+    petición en un hilo nuevo, no se calienta nada.
+    """
+    if not getattr(settings, 'DATABASE_WARMUP', True) or 'runserver' in sys.argv:
+        return {}
+
+    resultado = {}
+    for alias in aliases or connections:
+        conn = connections[alias]
+        if not reutiliza(conn):
+            continue
+        inicio = time.perf_counter()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except DatabaseError as e:
+            logger.warning('No se pudo calentar la conexión %s: %s', alias, e)
+            resultado[alias] = f'error: {e}'
+            continue
+        resultado[alias] = round((time.perf_counter() - inicio) * 1000, 3)
+    return resultado
+
+
+def _descartar_heredadas():
+    """
+    Después de un fork (gunicorn --preload) el hijo no usa las conexiones
+    del padre: el socket es compartido. Se olvidan sin cerrarlas.
+    """
+    for conn in connections.all(initialized_only=True):
+        conn.connection = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_descartar_heredadas)
@@ -0,0 +1,92 @@
+"""
+Comando de retención de la bitácora (historial_actividad)
+
+Exporta a JSONL gzip los meses más antiguos que la ventana de retención y los
+retira de la tabla. En PostgreSQL además mantiene las particiones mensuales.
+
+Uso:
+    python manage.py audit_retention --setup          # PostgreSQL: convertir a tabla particionada
+    python manage.py audit_retention                  # retención con AUDIT_RETENTION
+    python manage.py audit_retention --months 6 --dry-run
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.audit import partitioning
+from apps.audit.writer import flush_audit_log
+
+
+class Command(BaseCommand):
+    help = 'Archiva en JSONL gzip los meses antiguos de la bitácora y los retira de la tabla'
+
+    def add_arguments(self, parser):
+        config = getattr(settings, 'AUDIT_RETENTION', {})
+        parser.add_argument(
+            '--months', type=int, default=config.get('HOT_MONTHS', 12),
+            help='Meses completos que se conservan en la tabla (además del mes actual)',
+        )
+        parser.add_argument(
+            '--archive-dir', default=config.get('ARCHIVE_DIR'),
+            help='Directorio donde se escriben los archivos .jsonl.gz',
+        )
+        parser.add_argument(
+            '--ahead', type=int, default=config.get('PARTITIONS_AHEAD', 3),
+            help='PostgreSQL: meses futuros con partición creada',
+        )
+        parser.add_argument(
+            '--setup', action='store_true',
+            help='PostgreSQL: convierte historial_actividad en tabla particionada por mes',
+        )
+        parser.add_argument(
+            '--keep-detached', action='store_true',
+            help='No elimina la partición separada / filas en la tabla de archivo tras exportar',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Solo muestra qué meses se archivarían')
+
+    def handle(self, *args, **options):
+        if options['months'] < 0:
+            raise CommandError('--months debe ser >= 0')
+        if not options['archive_dir']:
+            raise CommandError('Falta --archive-dir (o AUDIT_RETENTION["ARCHIVE_DIR"])')
+
+        # Que lo encolado por el escritor asíncrono no quede fuera del corte
+        flush_audit_log(timeout=10)
+
+        if options['setup']:
+            if not partitioning.is_postgresql():
+                raise CommandError('--setup solo aplica a PostgreSQL.')
+            if options['dry_run']:
+                self.stdout.write('[dry-run] Se convertiría historial_actividad a tabla particionada.')
+            elif partitioning.convert_to_partitioned(months_ahead=options['ahead']):
+                self.stdout.write(self.style.SUCCESS('✅ historial_actividad convertida a tabla particionada por mes.'))
+            else:
+                self.stdout.write('historial_actividad ya estaba particionada.')
+
+        if partitioning.is_partitioned() and not options['dry_run']:
+            created = partitioning.ensure_future_partitions(months_ahead=options['ahead'])
+            for year, month in created:
+                self.stdout.write(f'  + partición {partitioning.partition_name(year, month)}')
+
+        now = datetime.now(dt_timezone.utc)
+        cutoff = partitioning.month_start(*partitioning.add_months(now.year, now.month, -options['months']))
+        months = partitioning.months_with_data_before(cutoff)
+
+        if not months:
+            self.stdout.write(self.style.SUCCESS(f'Nada que archivar antes de {cutoff:%Y-%m}.'))
+            return
+
+        total = 0
+        for year, month in months:
+            if options['dry_run']:
+                self.stdout.write(f'[dry-run] {year:04d}-{month:02d}')
+                continue
+            path, count = partitioning.archive_month(
+                year, month, options['archive_dir'], keep_detached=options['keep_detached']
+            )
+            total += count
+            self.stdout.write(f'  📦 {year:04d}-{month:02d}: {count} registros -> {path}')
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'✅ {len(months)} meses archivados ({total} registros).'))
@@ -0,0 +1,161 @@
+"""
+Comando para medir la latencia de la API con datos a escala.
+
+Corre sobre una base de datos de prueba aparte (test_<NAME>; en SQLite un
+archivo benchmark.sqlite3 junto a db.sqlite3), nunca sobre la de desarrollo.
+Con --keepdb la base y los datos cargados se reutilizan entre corridas.
+
+    python manage.py benchmark --scale 0.01 --requests 500 --output base.json
+    python manage.py benchmark --scale 0.01 --requests 500 --output nuevo.json --compare base.json
+    python manage.py benchmark --scale 0.01 --requests 500 --connections
+
+Con --connections, en lugar de la mezcla se comparan los modos de conexión
+(sin reuso, persistente, persistente con health checks) con check-ins que
+pasan por el WSGIHandler; con PostgreSQL la diferencia es el handshake TCP
+y la autenticación de cada conexión nueva.
+"""
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from apps.audit.writer import flush_audit_log
+from benchmarks import fixtures, runner
+
+# Escala completa (--scale 1): con 24 meses de historia son ~170.000
+# membresías y ~5.200.000 registros de bitácora
+CLIENTES = 50_000
+BITACORA = 5_000_000
+MESES = 24
+
+
+class Command(BaseCommand):
+    help = 'Benchmark de latencia de la API (p50/p95/p99, consultas y memoria) con resultados en JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help=f'Factor sobre {CLIENTES} clientes y {BITACORA} registros de bitácora genéricos')
+        parser.add_argument('--clients', type=int, help='Clientes (reemplaza --scale)')
+        parser.add_argument('--months', type=int, default=MESES, help='Meses de historia (membresías, clases, bitácora)')
+        parser.add_argument('--audit-rows', type=int, help='Registros de bitácora genéricos (reemplaza --scale)')
+        parser.add_argument('--requests', type=int, default=1000, help='Peticiones medidas')
+        parser.add_argument('--warmup', type=int, default=50, help='Peticiones previas que no se miden')
+        parser.add_argument('--alloc-every', type=int, default=10,
+                            help='Mide memoria (tracemalloc) en 1 de cada N peticiones; 0 desactiva')
+        parser.add_argument('--scenario', action='append', choices=sorted(runner.MEZCLA),
+                            help='Solo estos escenarios (se puede repetir)')
+        parser.add_argument('--connections', action='store_true',
+                            help='Compara la latencia por petición con y sin conexiones persistentes')
+        parser.add_argument('--seed', type=int, default=42, help='Semilla de datos y de la mezcla')
+        parser.add_argument('--output', type=str, help='Archivo JSON de resultados')
+        parser.add_argument('--compare', type=str, help='JSON de una corrida anterior para comparar')
+        parser.add_argument('--keepdb', action='store_true', help='Conserva la base de benchmark y sus datos')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests debe ser mayor a 0.')
+        base = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as archivo:
+                    base = json.load(archivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'No se pudo leer {options["compare"]}: {e}')
+
+        escala = options['scale']
+        cantidades = {
+            'clientes': options['clients'] if options['clients'] is not None else int(CLIENTES * escala),
+            'meses': options['months'],
+            'bitacora': options['audit_rows'] if options['audit_rows'] is not None else int(BITACORA * escala),
+        }
+
+        setup_test_environment()
+        # Los 404 esperados (check-in de CI inexistente) no son ruido útil
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        test_settings = connection.settings_dict['TEST']
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            # En archivo: la base en memoria compartida bloquea tablas entre
+            # hilos (escritor de bitácora) y no sirve para --keepdb
+            test_settings['NAME'] = str(settings.BASE_DIR / 'benchmark.sqlite3')
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'], serialize=False)
+        try:
+            self._correr(cantidades, options, base)
+        finally:
+            flush_audit_log(timeout=30)
+            connection.creation.destroy_test_db(nombre_original, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+    def _correr(self, cantidades, options, base):
+        inicio = time.perf_counter()
+        conteos = fixtures.cargar_escala(
+            cantidades['clientes'], cantidades['meses'], cantidades['bitacora'],
+            seed=options['seed'], log=lambda m: self.stdout.write(f'  cargando {m}'),
+        )
+        self.stdout.write(f'Datos listos en {time.perf_counter() - inicio:.1f}s: {conteos or "reutilizados"}')
+        cache.clear()
+
+        if options['connections']:
+            resultados = runner.ejecutar_conexiones(
+                requests=options['requests'], warmup=options['warmup'], seed=options['seed'], log=self.stdout.write,
+            )
+        else:
+            mezcla = runner.MEZCLA
+            if options['scenario']:
+                mezcla = {nombre: runner.MEZCLA[nombre] for nombre in options['scenario']}
+            resultados = runner.ejecutar(
+                requests=options['requests'], warmup=options['warmup'], alloc_every=options['alloc_every'],
+                mezcla=mezcla, seed=options['seed'], log=self.stdout.write,
+            )
+        resultado = {
+            'meta': runner.metadatos(
+                {**cantidades, 'filas_insertadas': conteos},
+                {k: options[k] for k in ('requests', 'warmup', 'alloc_every', 'seed', 'scenario', 'connections')},
+            ),
+            'scenarios': resultados,
+        }
+
+        self._tabla(resultados)
+        if options['connections']:
+            self._reduccion(resultados)
+        if options['output']:
+            runner.escribir(options['output'], resultado)
+            self.stdout.write(self.style.SUCCESS(f'Resultados en {options["output"]}'))
+        if base:
+            self._comparacion(runner.comparar(base, resultado))
+
+    def _tabla(self, resultados):
+        self.stdout.write(f"\n{'escenario':<20}{'n':>6}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+                          f"{'consultas':>11}{'mem KiB':>9}")
+        for nombre, r in resultados.items():
+            lat, alloc = r['latency_ms'], r['alloc_kb']
+            self.stdout.write(
+                f"{nombre:<20}{r['requests']:>6}{r['errors']:>5}"
+                f"{_num(lat['p50']):>9}{_num(lat['p95']):>9}{_num(lat['p99']):>9}"
+                f"{_num(r['queries']['mean']):>11}{_num(alloc['peak_mean'], 0):>9}"
+            )
+
+    def _reduccion(self, conexiones):
+        base = conexiones['sin_reuso']['latency_ms']
+        self.stdout.write(f"\n{'modo':<20}{'conexiones':>11}{'p50 vs sin reuso':>18}{'media vs sin reuso':>20}")
+        for modo, r in conexiones.items():
+            p50 = (r['latency_ms']['p50'] - base['p50']) / base['p50'] * 100
+            media = (r['latency_ms']['mean'] - base['mean']) / base['mean'] * 100
+            self.stdout.write(f"{modo:<20}{r['connections_opened']:>11}{p50:>+17.1f}%{media:>+19.1f}%")
+
+    def _comparacion(self, filas):
+        self.stdout.write(f"\n{'escenario':<18}{'métrica':<16}{'base':>10}{'actual':>10}{'var %':>8}")
+        for escenario, metrica, anterior, actual, variacion in filas:
+            linea = f'{escenario:<18}{metrica:<16}{_num(anterior):>10}{_num(actual):>10}{variacion:>+8.1f}'
+            if variacion > 10:
+                linea = self.style.WARNING(linea)
+            self.stdout.write(linea)
+
+
+def _num(valor, decimales=1):
+    return '-' if valor is None else f'{valor:.{decimales}f}'
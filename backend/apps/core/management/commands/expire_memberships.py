@@ -0,0 +1,41 @@
+"""
+Comando para marcar como vencidas las membresías cuya fecha_fin ya pasó.
+Pensado para correr cada noche (cron), después de medianoche. Es idempotente
+y se puede volver a correr si se interrumpe.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.membresias.vencimiento import BATCH_SIZE, vencer_membresias
+
+
+class Command(BaseCommand):
+    help = 'Marca como vencidas (en lotes) las membresías activas o suspendidas con fecha_fin pasada'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', type=str, help='Fecha de corte YYYY-MM-DD (por defecto hoy)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Membresías por lote')
+        parser.add_argument('--dry-run', action='store_true', help='Solo cuenta lo pendiente')
+
+    def handle(self, *args, **options):
+        hoy = None
+        if options['fecha']:
+            hoy = parse_date(options['fecha'])
+            if hoy is None:
+                raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size debe ser mayor a 0.')
+
+        resultado = vencer_membresias(hoy=hoy, batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        if not resultado['total']:
+            self.stdout.write(self.style.SUCCESS('✅ No hay membresías pendientes de vencer.'))
+            return
+        for estado, cantidad in resultado['por_estado'].items():
+            self.stdout.write(f'  {estado} -> vencido: {cantidad}')
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{resultado['total']} membresías por vencer (sin cambios, --dry-run)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {resultado['total']} membresías marcadas como vencidas en {resultado['lotes']} lotes."
+            ))
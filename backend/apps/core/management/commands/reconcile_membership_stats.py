@@ -0,0 +1,20 @@
+"""
+Comando para recalcular las estadísticas precalculadas de membresías
+(resumen del dashboard y serie mensual). Pensado para correr a diario (cron).
+"""
+from django.core.management.base import BaseCommand
+
+from apps.membresias import stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el resumen y la serie mensual de estadísticas de membresías'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Recalculando estadísticas de membresías...'))
+        resumen = stats.reconciliar()
+        self.stdout.write(
+            f'  Total: {resumen.total_membresias} | Activas: {resumen.activas} | '
+            f'Vencidas: {resumen.vencidas} | Ingresos: Bs. {resumen.ingresos_totales}'
+        )
+        self.stdout.write(self.style.SUCCESS('Proceso finalizado.'))
@@ -0,0 +1,26 @@
+"""
+Comando para corregir Clase.inscritos_confirmados si se desfasó
+(cambios masivos con queryset.update(), SQL manual, restauraciones).
+"""
+from django.core.management.base import BaseCommand
+
+from apps.clases.services import reparar_contadores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el contador de inscritos confirmados de las clases con desfase'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo muestra los desfases')
+
+    def handle(self, *args, **options):
+        desfases = reparar_contadores(dry_run=options['dry_run'])
+        if not desfases:
+            self.stdout.write(self.style.SUCCESS('✅ Todos los contadores están correctos.'))
+            return
+        for clase_id, guardado, real in desfases:
+            self.stdout.write(f'  Clase {clase_id}: {guardado} -> {real}')
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(desfases)} clases con desfase (sin cambios, --dry-run).'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ {len(desfases)} clases corregidas.'))
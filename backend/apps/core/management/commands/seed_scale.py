@@ -0,0 +1,46 @@
+"""
+Comando para generar datos sintéticos a escala (benchmarks, capacidad)
+
+    python manage.py seed_scale --clients 100000 --months 24
+    python manage.py seed_scale --clients 50000 --months 24 --audit-rows 5000000
+
+Agrega datos a la base configurada: usar sobre una base de pruebas o
+descartable, nunca en producción.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from seeders.scale_seeder import BATCH_SIZE, ScaleSeeder
+
+
+class Command(BaseCommand):
+    help = 'Genera clientes, membresías, pagos, clases, inscripciones y bitácora a escala'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=10_000, help='Clientes a generar')
+        parser.add_argument('--months', type=int, default=12, help='Meses de historia hacia atrás')
+        parser.add_argument('--seed', type=int, default=42, help='Semilla (mismos datos con la misma semilla)')
+        parser.add_argument('--audit-rows', type=int, default=0,
+                            help='Registros de bitácora genéricos además de los que generan altas, membresías y turnos')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Filas por lote (una transacción por lote)')
+
+    def handle(self, *args, **options):
+        if options['clients'] < 0 or options['audit_rows'] < 0 or options['months'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--clients y --audit-rows no pueden ser negativos; --months y --batch-size deben ser mayores a 0.')
+
+        inicio = time.perf_counter()
+        seeder = ScaleSeeder(
+            clientes=options['clients'], meses=options['months'], seed=options['seed'],
+            actividad_extra=options['audit_rows'], batch_size=options['batch_size'],
+        )
+        if not seeder.run():
+            raise CommandError('No se pudieron generar los datos.')
+
+        duracion = time.perf_counter() - inicio
+        for tabla, filas in seeder.conteos.items():
+            self.stdout.write(f'  {tabla:<32}{filas:>12,}')
+        total = seeder.created_count
+        self.stdout.write(self.style.SUCCESS(
+            f'{total:,} filas en {duracion:.1f}s ({total / max(duracion, 0.001):,.0f} filas/s)'
+        ))
@@ -0,0 +1,243 @@
+"""
+Métricas de rendimiento por petición (MetricsMiddleware, GET /api/metrics/)
+
+Por cada petición muestreada se mide:
+    duración       tiempo total de la petición (perf_counter)
+    BD             tiempo y cantidad de consultas (connection.execute_wrapper)
+    serializers    tiempo en serializer.data e is_valid() de DRF, incluidas
+                   las consultas que disparen (relaciones sin prefetch)
+    respuesta      tamaño del cuerpo en bytes (sin contar las respuestas
+                   por streaming)
+
+y se acumula en histogramas en memoria por ruta (nombre de la URL) y
+método. El contador de peticiones por estado HTTP incluye también las no
+muestreadas. Los datos son de cada proceso y se pierden al reiniciarlo:
+con varios workers, Prometheus ve el proceso que atienda cada scrape.
+
+Configuración en settings.REQUEST_METRICS (ENABLED, SAMPLE_RATE).
+"""
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+PREFIJO = 'gym_http'
+SIN_RUTA = 'unmatched'
+
+# Límites superiores de los buckets (le) de cada histograma
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+BUCKETS_BYTES = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# nombre -> (buckets, descripción)
+HISTOGRAMAS = {
+    'request_duration_seconds': (BUCKETS_SEGUNDOS, 'Duración total de la petición'),
+    'request_db_seconds': (BUCKETS_SEGUNDOS, 'Tiempo en consultas SQL por petición'),
+    'request_queries': (BUCKETS_CONSULTAS, 'Consultas SQL por petición'),
+    'request_serializer_seconds': (BUCKETS_SEGUNDOS, 'Tiempo en serializers de DRF por petición'),
+    'response_size_bytes': (BUCKETS_BYTES, 'Tamaño del cuerpo de la respuesta'),
+}
+
+# Medición de la petición en curso (la usan los serializers instrumentados)
+_medicion_actual = ContextVar('metrics_medicion', default=None)
+
+
+def config():
+    valores = getattr(settings, 'REQUEST_METRICS', {})
+    return {
+        'ENABLED': valores.get('ENABLED', True),
+        'SAMPLE_RATE': valores.get('SAMPLE_RATE', 1.0),
+    }
+
+
+class Histograma:
+    """Histograma acumulativo al estilo Prometheus (conteo por bucket, suma y total)."""
+
+    __slots__ = ('buckets', 'conteos', 'suma', 'total')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.conteos = [0] * len(buckets)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        indice = bisect_left(self.buckets, valor)
+        if indice < len(self.conteos):
+            self.conteos[indice] += 1
+        self.suma += valor
+        self.total += 1
+
+    def acumulados(self):
+        """[(le, conteo acumulado)] incluyendo +Inf."""
+        filas, acumulado = [], 0
+        for limite, conteo in zip(self.buckets, self.conteos):
+            acumulado += conteo
+            filas.append((_numero(limite), acumulado))
+        filas.append(('+Inf', self.total))
+        return filas
+
+
+class Registro:
+    """Histogramas por (ruta, método) y peticiones por (ruta, método, estado)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histogramas = {}
+            self.peticiones = {}
+
+    def contar(self, ruta, metodo, estado):
+        clave = (ruta, metodo, estado)
+        with self._lock:
+            self.peticiones[clave] = self.peticiones.get(clave, 0) + 1
+
+    def observar(self, ruta, metodo, valores):
+        """`valores`: {nombre de histograma: valor}; los None se omiten."""
+        with self._lock:
+            serie = self.histogramas.get((ruta, metodo))
+            if serie is None:
+                serie = self.histogramas[(ruta, metodo)] = {
+                    nombre: Histograma(buckets) for nombre, (buckets, _) in HISTOGRAMAS.items()
+                }
+            for nombre, valor in valores.items():
+                if valor is not None:
+                    serie[nombre].observar(valor)
+
+    def exportar(self):
+        """Texto en el formato de exposición de Prometheus (0.0.4)."""
+        lineas = []
+        with self._lock:
+            lineas.append(f'# HELP {PREFIJO}_requests_total Peticiones atendidas (todas, no solo las muestreadas)')
+            lineas.append(f'# TYPE {PREFIJO}_requests_total counter')
+            for (ruta, metodo, estado), total in sorted(self.peticiones.items()):
+                lineas.append(f'{PREFIJO}_requests_total{_etiquetas(ruta, metodo, status=estado)} {total}')
+
+            for nombre, (_, descripcion) in HISTOGRAMAS.items():
+                metrica = f'{PREFIJO}_{nombre}'
+                lineas.append(f'# HELP {metrica} {descripcion}')
+                lineas.append(f'# TYPE {metrica} histogram')
+                for (ruta, metodo), serie in sorted(self.histogramas.items()):
+                    histograma = serie[nombre]
+                    if not histograma.total:
+                        continue
+                    for limite, acumulado in histograma.acumulados():
+                        lineas.append(f'{metrica}_bucket{_etiquetas(ruta, metodo, le=limite)} {acumulado}')
+                    lineas.append(f'{metrica}_sum{_etiquetas(ruta, metodo)} {_numero(histograma.suma)}')
+                    lineas.append(f'{metrica}_count{_etiquetas(ruta, metodo)} {histograma.total}')
+
+        lineas.append(f'# HELP {PREFIJO}_metrics_sample_rate Fracción de peticiones que se miden')
+        lineas.append(f'# TYPE {PREFIJO}_metrics_sample_rate gauge')
+        lineas.append(f'{PREFIJO}_metrics_sample_rate {_numero(config()["SAMPLE_RATE"])}')
+        return '\n'.join(lineas) + '\n'
+
+
+registro = Registro()
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _etiquetas(ruta, metodo, **extra):
+    pares = [('route', ruta), ('method', metodo), *extra.items()]
+    return '{' + ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in pares) + '}'
+
+
+# ==========================================
+# MEDICIÓN DE UNA PETICIÓN
+# ==========================================
+
+class Medicion:
+    """Acumula tiempos de una petición; se usa como execute_wrapper de la conexión."""
+
+    __slots__ = ('consultas', 'db', 'serializer', '_profundidad')
+
+    def __init__(self):
+        self.consultas = 0
+        self.db = 0.0
+        self.serializer = 0.0
+        self._profundidad = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+def muestrear(tasa):
+    """True si la petición actual se mide (una de cada 1/tasa en promedio)."""
+    return tasa >= 1 or random.random() < tasa
+
+
+def activar(medicion):
+    return _medicion_actual.set(medicion)
+
+
+def desactivar(token):
+    _medicion_actual.reset(token)
+
+
+def nombre_ruta(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return SIN_RUTA
+    return match.url_name or match.route or SIN_RUTA
+
+
+def tamano_respuesta(response):
+    if getattr(response, 'streaming', False):
+        return None
+    return len(response.content)
+
+
+# ==========================================
+# SERIALIZERS DE DRF
+# ==========================================
+
+def _cronometrar(funcion):
+    """Suma a la medición en curso el tiempo de `funcion` (solo la llamada más externa)."""
+
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        medicion = _medicion_actual.get()
+        if medicion is None or medicion._profundidad:
+            return funcion(*args, **kwargs)
+        medicion._profundidad += 1
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            medicion.serializer += time.perf_counter() - inicio
+            medicion._profundidad -= 1
+
+    envoltura._metrics_instrumentado = True
+    return envoltura
+
+
+def instrumentar_serializers():
+    """
+    Envuelve BaseSerializer.data e is_valid() para medir el tiempo de
+    serialización. Fuera de una petición medida el costo es una lectura de
+    ContextVar. Idempotente; se llama desde CoreConfig.ready().
+    """
+    from rest_framework.serializers import BaseSerializer
+
+    if getattr(BaseSerializer.is_valid, '_metrics_instrumentado', False):
+        return
+    BaseSerializer.is_valid = _cronometrar(BaseSerializer.is_valid)
+    BaseSerializer.data = property(_cronometrar(BaseSerializer.data.fget))
@@ -1,3 +1,10 @@
+import time
+
+from django.db import connection
+
+from . import metrics
+
+
 class IPAddressMiddleware:
     """
     Middleware para obtener la dirección IP real del cliente.
@@ -27,4 +34,47 @@ class IPAddressMiddleware:
         request.client_ip = client_ip
 
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
+
+class MetricsMiddleware:
+    """
+    Middleware de métricas de rendimiento (ver apps.core.metrics).
+
+    Cuenta todas las peticiones por ruta, método y estado. En las
+    muestreadas (settings.REQUEST_METRICS['SAMPLE_RATE']) mide además la
+    duración total, el tiempo y la cantidad de consultas SQL, el tiempo en
+    serializers y el tamaño de la respuesta. Va primero en MIDDLEWARE para
+    que la duración incluya al resto de middlewares.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        opciones = metrics.config()
+        if not opciones['ENABLED']:
+            return self.get_response(request)
+        if not metrics.muestrear(opciones['SAMPLE_RATE']):
+            response = self.get_response(request)
+            metrics.registro.contar(metrics.nombre_ruta(request), request.method, response.status_code)
+            return response
+
+        medicion = metrics.Medicion()
+        token = metrics.activar(medicion)
+        inicio = time.perf_counter()
+        try:
+            with connection.execute_wrapper(medicion):
+                response = self.get_response(request)
+        finally:
+            metrics.desactivar(token)
+        duracion = time.perf_counter() - inicio
+
+        ruta = metrics.nombre_ruta(request)
+        metrics.registro.contar(ruta, request.method, response.status_code)
+        metrics.registro.observar(ruta, request.method, {
+            'request_duration_seconds': duracion,
+            'request_db_seconds': medicion.db,
+            'request_queries': medicion.consultas,
+            'request_serializer_seconds': medicion.serializer,
+            'response_size_bytes': metrics.tamano_respuesta(response),
+        })
+        return response
@@ -0,0 +1,179 @@
+"""
+Paginación por cursor (keyset) compartida
+
+Alternativa opcional a PageNumberPagination para listados grandes: en lugar
+de OFFSET + COUNT(*), cada página filtra a partir de la última fila vista
+usando el orden compuesto (p.ej. fecha_hora, id). El costo de una página es
+el mismo sin importar qué tan profunda sea y no se calcula el total.
+
+Se activa con el parámetro ?cursor= (vacío para la primera página); la
+respuesta trae "next"/"previous" con el cursor ya armado:
+
+    {"next": "...?cursor=eyJwIjpb...", "previous": null, "results": [...]}
+"""
+import base64
+import datetime
+import json
+from collections import OrderedDict
+from functools import reduce
+from operator import and_, or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+CURSOR_QUERY_PARAM = 'cursor'
+
+
+def is_cursor_request(request):
+    """True si el cliente pidió paginación por cursor (?cursor=, aunque esté vacío)."""
+    return request is not None and CURSOR_QUERY_PARAM in request.query_params
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación keyset sobre un orden compuesto y único.
+
+    `ordering` debe terminar en un campo único (normalmente id) para que no
+    haya empates; todos los campos deben ser columnas del modelo.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = CURSOR_QUERY_PARAM
+    ordering = ('-id',)
+    invalid_cursor_message = 'Cursor inválido'
+
+    def get_ordering(self, request, queryset, view=None):
+        return self.ordering
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size) if self.max_page_size else size
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering_fields = [
+            (name.lstrip('-'), name.startswith('-'))
+            for name in self.get_ordering(request, queryset, view)
+        ]
+        self.model = queryset.model
+
+        position, reverse = self.decode_cursor(request)
+
+        # Página anterior: se recorre en sentido contrario y luego se invierte
+        order = [
+            f"{'-' if desc != reverse else ''}{name}"
+            for name, desc in self.ordering_fields
+        ]
+        queryset = queryset.order_by(*order)
+        if position is not None:
+            queryset = queryset.filter(self._after(position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = position is not None if not reverse else has_more
+        self.first = results[0] if results else None
+        self.last = results[-1] if results else None
+        self.page = results
+        return results
+
+    def _after(self, position, reverse):
+        """Filtro lexicográfico: filas estrictamente después de `position`."""
+        clauses = []
+        for i, (name, desc) in enumerate(self.ordering_fields):
+            lookup = 'lt' if desc != reverse else 'gt'
+            equal = [Q(**{prev: position[j]}) for j, (prev, _) in enumerate(self.ordering_fields[:i])]
+            clauses.append(reduce(and_, equal + [Q(**{f'{name}__{lookup}': position[i]})]))
+        return reduce(or_, clauses)
+
+    # ---------- Cursores ----------
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values = data['p']
+            if len(values) != len(self.ordering_fields):
+                raise ValueError
+            position = [
+                self.model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.ordering_fields, values)
+            ]
+            return position, bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance, reverse=False):
+        values = []
+        for name, _ in self.ordering_fields:
+            value = getattr(instance, name)
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                value = value.isoformat()
+            values.append(value)
+        payload = json.dumps({'p': values, 'r': 1 if reverse else 0}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        url = remove_query_param(self.request.build_absolute_uri(), 'page')
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self.last)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first is None:
+            return None
+        return self.encode_cursor(self.first, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CursorPaginationMixin:
+    """
+    Para vistas genéricas: usa `cursor_pagination_class` cuando llega ?cursor=
+    y la `pagination_class` habitual en cualquier otro caso.
+    """
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.pagination_class
+            if self.cursor_pagination_class is not None and is_cursor_request(self.request):
+                pagination_class = self.cursor_pagination_class
+            self._paginator = pagination_class() if pagination_class is not None else None
+        return self._paginator
@@ -3,8 +3,14 @@ Sistema de permisos granular para el gimnasio.
 Define todos los permisos posibles en el sistema.
 """
 
+import threading
+import weakref
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from rest_framework.permissions import BasePermission
-from typing import List
+from typing import FrozenSet, List, Optional
 
 
 # ==========================================
@@ -215,7 +221,7 @@ class HasPermission(BasePermission):
             return False
         
         # Verificar si el usuario tiene el permiso
-        return user_has_permission(request.user, required_permission)
+        return user_has_permission(request.user, required_permission, request=request)
 
 
 class HasAnyPermission(BasePermission):
@@ -235,10 +241,8 @@ class HasAnyPermission(BasePermission):
             return False
         
         # Retorna True si tiene al menos uno de los permisos
-        return any(
-            user_has_permission(request.user, perm) 
-            for perm in required_permissions
-        )
+        codes = get_user_permission_codes(request.user, request=request)
+        return any(perm in codes for perm in required_permissions)
 
 
 class HasAllPermissions(BasePermission):
@@ -258,10 +262,8 @@ class HasAllPermissions(BasePermission):
             return False
         
         # Retorna True solo si tiene TODOS los permisos
-        return all(
-            user_has_permission(request.user, perm) 
-            for perm in required_permissions
-        )
+        codes = get_user_permission_codes(request.user, request=request)
+        return all(perm in codes for perm in required_permissions)
 
 
 class IsAdminOrReadOnly(BasePermission):
@@ -280,17 +282,331 @@ class IsAdminOrReadOnly(BasePermission):
         return False
 
 
+class IsSuperUser(BasePermission):
+    """
+    Solo superusuarios (endpoints operativos como /api/metrics/).
+    """
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and request.user.is_superuser)
+
+
+# ==========================================
+# RESOLVER DE PERMISOS (CACHÉ)
+# ==========================================
+#
+# Los permisos de un usuario se resuelven en este orden:
+#   1. Memo del request: HasPermission, la vista y cualquier helper
+#      reutilizan el mismo frozenset durante la petición.
+#   2. Claims del access token JWT (ver apps.users.tokens): si la época
+#      del token coincide con la actual, no se consulta la BD.
+#   3. Caché de Django (por proceso con LocMemCache), invalidado por los
+#      signals de apps.roles.
+#   4. Base de datos: UNA consulta que trae códigos y roles.
+#
+# La invalidación global usa un contador de versión dentro de la clave:
+# incrementarlo deja obsoletas todas las entradas sin tener que listarlas.
+# La clave incluye además la época de permisos (guardada en la BD): con
+# LocMemCache el contador es de cada proceso, la época no, así que otro
+# worker deja de usar sus entradas viejas apenas ve la época nueva.
+#
+# Versiones de permisos:
+#   - User.permisos_version: cambia al asignar/quitar roles al usuario o
+#     al cambiar los permisos de uno de sus roles. Solo vence los tokens
+#     (y el caché) de ese usuario; se compara con el usuario que la
+#     autenticación JWT ya carga, sin consultas extra.
+#   - Época global (EpocaPermisos): cambia solo con el catálogo de
+#     permisos (Permiso), que puede afectar a cualquiera.
+# Los signals de apps.roles no incrementan nada en el momento: acumulan
+# los cambios y se aplican una sola vez al confirmar la transacción
+# (schedule_permission_invalidation).
+
+PERMISSION_CACHE_PREFIX = "core:perms"
+PERMISSION_CACHE_VERSION_KEY = f"{PERMISSION_CACHE_PREFIX}:version"
+PERMISSION_EPOCH_CACHE_KEY = f"{PERMISSION_CACHE_PREFIX}:epoch"
+REQUEST_CACHE_ATTR = "_user_access_cache"
+ADMIN_PERMISSION_CODES = frozenset(PermissionGroups.ADMIN)
+
+# Claims JWT con los permisos del usuario
+PERMISSIONS_CLAIM = "permissions"
+ROLES_CLAIM = "roles"
+PERMISSION_EPOCH_CLAIM = "perm_epoch"
+PERMISSION_VERSION_CLAIM = "perm_version"
+
+
+def _cache_timeout():
+    return getattr(settings, 'PERMISSION_CACHE_TIMEOUT', 300)
+
+
+def _cache_version():
+    return cache.get(PERMISSION_CACHE_VERSION_KEY, 0)
+
+
+def _cache_key(user_id, version=None, epoch=None, user_version=0):
+    if version is None:
+        version = _cache_version()
+    if epoch is None:
+        epoch = get_permission_epoch()
+    return f"{PERMISSION_CACHE_PREFIX}:{version}:{epoch}:{user_id}:{user_version}"
+
+
+def _load_user_access(user_id) -> dict:
+    """
+    Carga códigos de permiso y roles del usuario en una sola consulta.
+
+    Returns:
+        dict: {"codes": frozenset[str], "role_names": frozenset[str],
+               "roles": tuple[(id, nombre, descripcion)]}
+    """
+    from apps.roles.models import UserRole
+
+    rows = UserRole.objects.filter(usuario_id=user_id).values_list(
+        'rol_id', 'rol__nombre', 'rol__descripcion', 'rol__permisos__codigo'
+    )
+
+    codes = set()
+    roles = {}
+    for rol_id, nombre, descripcion, codigo in rows:
+        roles[rol_id] = (rol_id, nombre, descripcion)
+        if codigo:
+            codes.add(codigo)
+
+    return {
+        "codes": frozenset(codes),
+        "role_names": frozenset(nombre for _, nombre, _ in roles.values()),
+        "roles": tuple(sorted(roles.values(), key=lambda r: r[1])),
+    }
+
+
+def _access_from_token(request, user) -> Optional[dict]:
+    """
+    Construye el acceso del usuario a partir de los claims del access token.
+    Retorna None si no hay token, si no trae claims o si su época o su
+    versión de permisos son viejas.
+    """
+    token = getattr(request, 'auth', None) if request is not None else None
+    if token is None or not hasattr(token, 'get'):
+        return None
+
+    codes = token.get(PERMISSIONS_CLAIM)
+    epoch = token.get(PERMISSION_EPOCH_CLAIM)
+    if codes is None or epoch is None:
+        return None
+
+    from rest_framework_simplejwt.settings import api_settings
+    if str(token.get(api_settings.USER_ID_CLAIM)) != str(user.pk):
+        return None
+    if epoch < get_permission_epoch():
+        return None
+    if token.get(PERMISSION_VERSION_CLAIM, 0) < getattr(user, 'permisos_version', 0):
+        return None
+
+    return {
+        "codes": frozenset(codes),
+        "role_names": frozenset(token.get(ROLES_CLAIM) or ()),
+    }
+
+
+def _request_memo(request):
+    """Retorna el dict de memo del request (compartido entre DRF y Django)."""
+    if request is None:
+        return None
+    # Guardar en el HttpRequest subyacente para que middleware y vistas DRF
+    # compartan la misma memo.
+    http_request = getattr(request, '_request', request)
+    memo = getattr(http_request, REQUEST_CACHE_ATTR, None)
+    if memo is None:
+        memo = {}
+        setattr(http_request, REQUEST_CACHE_ATTR, memo)
+    return memo
+
+
+def get_user_access(user, request=None, use_token=True) -> dict:
+    """
+    Resuelve (y memoriza) los permisos y roles de un usuario.
+
+    Con use_token=False se ignoran los claims JWT y siempre se obtienen los
+    roles completos (id, nombre, descripcion) desde caché/BD.
+    """
+    if not user or not user.is_authenticated:
+        return {"codes": frozenset(), "role_names": frozenset(), "roles": ()}
+
+    memo = _request_memo(request)
+    memo_key = (user.pk, use_token)
+    if memo is not None and memo_key in memo:
+        return memo[memo_key]
+
+    access = _access_from_token(request, user) if use_token else None
+    if access is None:
+        key = _cache_key(user.pk, user_version=getattr(user, 'permisos_version', 0))
+        access = cache.get(key)
+        if access is None:
+            access = _load_user_access(user.pk)
+            cache.set(key, access, _cache_timeout())
+
+    if memo is not None:
+        memo[memo_key] = access
+    return access
+
+
+def get_user_permission_codes(user, request=None) -> FrozenSet[str]:
+    """
+    Retorna el conjunto inmutable de códigos de permiso del usuario.
+    El superuser recibe todos los códigos del sistema sin consultar la BD.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    if user.is_superuser:
+        return ADMIN_PERMISSION_CODES
+
+    return get_user_access(user, request=request)["codes"]
+
+
+def get_user_role_names(user, request=None) -> FrozenSet[str]:
+    """Retorna los nombres de los roles asignados al usuario (cacheado)."""
+    return get_user_access(user, request=request)["role_names"]
+
+
+def invalidate_user_permissions(user_id, user_version=0) -> None:
+    """Elimina del caché los permisos de un usuario concreto."""
+    cache.delete(_cache_key(user_id, user_version=user_version))
+
+
+def bump_user_permission_versions(user_ids=(), role_ids=()) -> int:
+    """
+    Incrementa permisos_version de los usuarios dados y de los que tienen
+    alguno de los roles dados (un solo UPDATE): vence sus access tokens y
+    sus permisos cacheados, sin afectar al resto. Retorna las filas tocadas.
+    """
+    from django.db.models import F, Q
+    from apps.roles.models import UserRole
+    from apps.users.models import User
+
+    filtro = Q()
+    if user_ids:
+        filtro |= Q(pk__in=list(user_ids))
+    if role_ids:
+        filtro |= Q(pk__in=UserRole.objects.filter(rol_id__in=list(role_ids)).values('usuario_id'))
+    if not filtro:
+        return 0
+    return User.objects.filter(filtro).update(permisos_version=F('permisos_version') + 1)
+
+
+class _InvalidacionPendiente:
+    """Invalidaciones acumuladas de una transacción; es el callback de on_commit."""
+    __slots__ = ('users', 'roles', 'everyone', 'applied', '__weakref__')
+
+    def __init__(self):
+        self.users = set()
+        self.roles = set()
+        self.everyone = False
+        self.applied = False
+
+    def __call__(self):
+        self.applied = True
+        if self.users or self.roles:
+            bump_user_permission_versions(self.users, self.roles)
+        if self.everyone:
+            bump_permission_epoch()
+
+
+# Por hilo y alias de conexión: referencia débil a la invalidación pendiente.
+# La única referencia fuerte la tiene la cola de on_commit de Django: si la
+# transacción (o el savepoint) se deshace, Django la descarta y la
+# referencia queda en None, así que la próxima transacción registra la suya.
+_pendientes = threading.local()
+
+
+def schedule_permission_invalidation(user_ids=(), role_ids=(), everyone=False) -> None:
+    """
+    Acumula una invalidación de permisos y la aplica al confirmar la
+    transacción en curso (de inmediato si no hay una): un cambio de N filas
+    dentro de un atomic() registra un solo callback e incrementa las
+    versiones una sola vez.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        pendiente = _InvalidacionPendiente()
+        pendiente.users.update(user_ids)
+        pendiente.roles.update(role_ids)
+        pendiente.everyone = everyone
+        pendiente()
+        return
+
+    ref = getattr(_pendientes, connection.alias, None)
+    pendiente = ref() if ref is not None else None
+    if pendiente is None or pendiente.applied:
+        pendiente = _InvalidacionPendiente()
+        setattr(_pendientes, connection.alias, weakref.ref(pendiente))
+        transaction.on_commit(pendiente, using=connection.alias)
+    pendiente.users.update(user_ids)
+    pendiente.roles.update(role_ids)
+    pendiente.everyone = pendiente.everyone or everyone
+
+
+def get_permission_epoch(fresh=False) -> int:
+    """
+    Retorna la época actual de permisos.
+    Se lee de la BD solo cuando expira la copia en caché, o siempre con
+    fresh=True (al emitir tokens: la copia de este proceso puede ser vieja).
+    """
+    epoch = None if fresh else cache.get(PERMISSION_EPOCH_CACHE_KEY)
+    if epoch is None:
+        from apps.roles.models import EpocaPermisos
+        epoch = EpocaPermisos.objects.get_or_create(pk=1)[0].valor
+        cache.set(PERMISSION_EPOCH_CACHE_KEY, epoch, getattr(settings, 'PERMISSION_EPOCH_CACHE_TIMEOUT', 30))
+    return epoch
+
+
+def bump_permission_epoch() -> int:
+    """
+    Incrementa la época de permisos: todos los access tokens emitidos antes
+    quedan obsoletos y los permisos cacheados se descartan.
+    """
+    from django.db.models import F
+    from apps.roles.models import EpocaPermisos
+
+    if not EpocaPermisos.objects.filter(pk=1).update(valor=F('valor') + 1):
+        EpocaPermisos.objects.get_or_create(pk=1, defaults={'valor': 1})
+    epoch = EpocaPermisos.objects.get(pk=1).valor
+    cache.set(PERMISSION_EPOCH_CACHE_KEY, epoch, getattr(settings, 'PERMISSION_EPOCH_CACHE_TIMEOUT', 30))
+    invalidate_all_permissions()
+    return epoch
+
+
+def get_permission_claims(user) -> dict:
+    """Claims de permisos a incrustar en el access token del usuario."""
+    # Leer la época ANTES que los permisos: si cambian entre medio, el token
+    # queda con una época vieja y se rechaza en vez de aceptar permisos viejos.
+    # Se lee de la BD: con la copia en caché de este proceso, permisos
+    # cacheados antes de una invalidación quedarían con la época nueva.
+    # La versión del usuario es la de la instancia, cargada antes que los
+    # permisos (login y refresh la acaban de leer): en el peor caso queda
+    # vieja y el token se rechaza y se renueva.
+    epoch = get_permission_epoch(fresh=True)
+    access = get_user_access(user, use_token=False)
+    codes = ADMIN_PERMISSION_CODES if user.is_superuser else access["codes"]
+    return {
+        PERMISSIONS_CLAIM: sorted(codes),
+        ROLES_CLAIM: sorted(access["role_names"]),
+        PERMISSION_EPOCH_CLAIM: epoch,
+        PERMISSION_VERSION_CLAIM: getattr(user, 'permisos_version', 0),
+    }
+
+
 # ==========================================
 # FUNCIONES HELPER
 # ==========================================
 
-def user_has_permission(user, permission_code: str) -> bool:
+def user_has_permission(user, permission_code: str, request=None) -> bool:
     """
     Verifica si un usuario tiene un permiso específico.
     
     Args:
         user: Usuario de Django
         permission_code: Código del permiso (ej: "client.view")
+        request: Request actual (opcional, habilita la memo por petición)
     
     Returns:
         bool: True si tiene el permiso, False si no
@@ -302,27 +618,27 @@ def user_has_permission(user, permission_code: str) -> bool:
     if user.is_superuser:
         return True
     
-    # Obtener todos los permisos del usuario a través de sus roles
-    from apps.roles.models import Permiso
-    
-    user_permissions = Permiso.objects.filter(
-        roles__userrole__usuario=user
-    ).values_list('codigo', flat=True)  # ✅ CORREGIDO: usar 'codigo' en lugar de 'nombre'
-    
-    return permission_code in user_permissions
+    return permission_code in get_user_permission_codes(user, request=request)
 
 
-def user_has_any_permission(user, permission_codes: List[str]) -> bool:
+def user_has_any_permission(user, permission_codes: List[str], request=None) -> bool:
     """Verifica si el usuario tiene AL MENOS UNO de los permisos."""
-    return any(user_has_permission(user, code) for code in permission_codes)
+    codes = get_user_permission_codes(user, request=request)
+    return any(code in codes for code in permission_codes)
 
 
-def user_has_all_permissions(user, permission_codes: List[str]) -> bool:
+def user_has_all_permissions(user, permission_codes: List[str], request=None) -> bool:
     """Verifica si el usuario tiene TODOS los permisos."""
-    return all(user_has_permission(user, code) for code in permission_codes)
+    codes = get_user_permission_codes(user, request=request)
+    return all(code in codes for code in permission_codes)
+
 
+def user_has_any_role(user, role_names, request=None) -> bool:
+    """Verifica si el usuario tiene al menos uno de los roles indicados (por nombre)."""
+    return not get_user_role_names(user, request=request).isdisjoint(role_names)
 
-def get_user_permissions(user) -> List[str]:
+
+def get_user_permissions(user, request=None) -> List[str]:
     """
     Obtiene todos los códigos de permisos que tiene un usuario.
     
@@ -335,13 +651,17 @@ def get_user_permissions(user) -> List[str]:
     if user.is_superuser:
         return PermissionGroups.ADMIN
     
-    from apps.roles.models import Permiso
-    
-    return list(
-        Permiso.objects.filter(
-            roles__userrole__usuario=user
-        ).values_list('codigo', flat=True).distinct()  # ✅ CORREGIDO: usar 'codigo'
-    )
+    return sorted(get_user_permission_codes(user, request=request))
+
+
+def get_user_roles_data(user, request=None) -> List[dict]:
+    """
+    Obtiene los roles del usuario como dicts (id, nombre, descripcion) desde el caché.
+    """
+    return [
+        {'id': rol_id, 'nombre': nombre, 'descripcion': descripcion}
+        for rol_id, nombre, descripcion in get_user_access(user, request=request, use_token=False)["roles"]
+    ]
 
 
 def get_user_roles(user):
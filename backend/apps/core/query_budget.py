@@ -0,0 +1,133 @@
+"""
+Presupuesto de consultas SQL por endpoint (soporte para tests)
+
+Mide cuántas consultas hace cada endpoint de la API y cuáles se repiten
+(mismo SQL salvo los valores literales, la firma típica de un N+1), para
+que los tests fallen cuando un endpoint supera el presupuesto declarado.
+
+Uso (ver apps.core.tests.QueryBudgetTests):
+
+    rutas = rutas_api()                      # {nombre: patrón} de config/urls.py
+    medicion = medir(client, 'client-list-create', 'get', reverse(...), presupuesto=4)
+    medicion.excedido                        # True si total > presupuesto
+    print(reporte([medicion, ...]))          # tabla por endpoint + repeticiones
+
+Si la variable de entorno QUERY_BUDGET_REPORT tiene una ruta, el reporte
+completo se escribe ahí al terminar los tests.
+"""
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver
+
+REPORT_ENV = 'QUERY_BUDGET_REPORT'
+
+_LITERAL_CADENA = re.compile(r"'(?:[^']|'')*'")
+_LITERAL_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LISTA_IN = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def normalizar_sql(sql):
+    """
+    SQL sin literales: "... WHERE id = 5" y "... WHERE id = 7" dan el mismo
+    patrón. Acepta también el SQL con marcadores %s (antes de interpolar).
+    """
+    sql = sql.replace('%s', '?')
+    sql = _LITERAL_CADENA.sub('?', sql)
+    sql = _LITERAL_NUMERO.sub('?', sql)
+    sql = _LISTA_IN.sub('(...)', sql)
+    return _ESPACIOS.sub(' ', sql).strip()
+
+
+def rutas_api(prefijo='api/'):
+    """
+    {nombre: patrón} de las rutas con nombre del urlconf raíz que empiezan
+    con `prefijo` (los include(), como admin/, no se recorren).
+    """
+    rutas = {}
+    for patron in get_resolver().url_patterns:
+        if isinstance(patron, URLPattern) and patron.name and str(patron.pattern).startswith(prefijo):
+            rutas[patron.name] = str(patron.pattern)
+    return rutas
+
+
+@dataclass
+class Medicion:
+    nombre: str
+    metodo: str
+    url: str
+    presupuesto: int
+    status: int = 0
+    consultas: list = field(default_factory=list)
+
+    @property
+    def total(self):
+        return len(self.consultas)
+
+    @property
+    def excedido(self):
+        return self.total > self.presupuesto
+
+    @property
+    def repetidas(self):
+        """[(patrón, veces)] de los patrones que aparecen más de una vez."""
+        conteo = Counter(normalizar_sql(sql) for sql in self.consultas)
+        return [(patron, veces) for patron, veces in conteo.most_common() if veces > 1]
+
+
+def medir(client, nombre, metodo, url, presupuesto, **kwargs):
+    """
+    Ejecuta la petición con `client` y retorna su Medicion. Las respuestas en
+    streaming se consumen dentro de la medición: sus consultas corren al
+    recorrer el contenido, no al llamar a la vista.
+    """
+    with CaptureQueriesContext(connection) as capturadas:
+        response = getattr(client, metodo)(url, **kwargs)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    return Medicion(
+        nombre=nombre,
+        metodo=metodo.upper(),
+        url=url,
+        presupuesto=presupuesto,
+        status=response.status_code,
+        consultas=[q['sql'] for q in capturadas.captured_queries],
+    )
+
+
+def reporte(mediciones, max_sql=120):
+    """Texto con una fila por endpoint y, debajo, sus consultas repetidas."""
+    ancho = max([len(m.nombre) for m in mediciones] + [8])
+    lineas = [
+        f"{'endpoint':<{ancho}}  método  status  consultas  presupuesto  repetidas",
+        '-' * (ancho + 52),
+    ]
+    for m in sorted(mediciones, key=lambda m: (-m.total, m.nombre)):
+        marca = '  << EXCEDIDO' if m.excedido else ''
+        repetidas = sum(veces for _, veces in m.repetidas)
+        lineas.append(
+            f"{m.nombre:<{ancho}}  {m.metodo:<6}  {m.status:<6}  {m.total:>9}  {m.presupuesto:>11}  "
+            f"{repetidas:>9}{marca}"
+        )
+    for m in mediciones:
+        if m.repetidas:
+            lineas.append('')
+            lineas.append(f"{m.nombre} ({m.metodo} {m.url}):")
+            for patron, veces in m.repetidas:
+                corto = patron if len(patron) <= max_sql else patron[:max_sql - 3] + '...'
+                lineas.append(f"  {veces:>3}x  {corto}")
+    return '\n'.join(lineas)
+
+
+def escribir_reporte(mediciones):
+    """Escribe el reporte en la ruta de QUERY_BUDGET_REPORT, si está definida."""
+    ruta = os.environ.get(REPORT_ENV)
+    if ruta:
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write(reporte(mediciones) + '\n')
+    return ruta
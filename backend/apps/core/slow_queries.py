@@ -0,0 +1,223 @@
+"""
+Registro de consultas lentas (GET /api/slow-queries/)
+
+Un execute_wrapper instalado en cada conexión (signal connection_created)
+mide todas las consultas; las que superan THRESHOLD_MS se guardan en un
+buffer circular en memoria (las últimas MAX_ENTRIES) con:
+
+    sql            sentencia normalizada (sin valores, listas IN colapsadas)
+    fingerprint    hash de los parámetros: agrupa ejecuciones con los mismos
+                   valores sin guardar los valores (pueden ser datos personales)
+    vista          vista de DRF y serializer en la pila de llamadas, y la
+                   primera línea del proyecto que disparó la consulta
+    plan           EXPLAIN de la consulta (PostgreSQL: EXPLAIN, o EXPLAIN
+                   ANALYZE para SELECT si ANALYZE=True; SQLite: EXPLAIN QUERY
+                   PLAN), capturado en el momento con los mismos parámetros
+
+El costo para las consultas rápidas es medir el tiempo; el EXPLAIN y la
+inspección de la pila solo se hacen para las lentas. Como las métricas,
+el buffer es de cada proceso.
+
+Configuración en settings.SLOW_QUERY_LOG.
+"""
+import hashlib
+import itertools
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .query_budget import normalizar_sql
+
+# Solo estas sentencias tienen plan (BEGIN, SAVEPOINT, DDL, etc. no)
+_CON_PLAN = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+_RAIZ_PROYECTO = str(Path(settings.BASE_DIR).resolve())
+_ESTE_ARCHIVO = str(Path(__file__).resolve())
+
+_local = threading.local()
+
+
+def config():
+    valores = getattr(settings, 'SLOW_QUERY_LOG', {})
+    return {
+        'ENABLED': valores.get('ENABLED', True),
+        'THRESHOLD_MS': valores.get('THRESHOLD_MS', 200),
+        'EXPLAIN': valores.get('EXPLAIN', True),
+        'ANALYZE': valores.get('ANALYZE', False),
+        'MAX_ENTRIES': valores.get('MAX_ENTRIES', 200),
+    }
+
+
+@dataclass
+class ConsultaLenta:
+    id: int
+    fecha_hora: str
+    alias: str
+    vendor: str
+    duracion_ms: float
+    sql: str
+    fingerprint: str
+    many: bool
+    vista: str = None
+    serializer: str = None
+    origen: str = None
+    plan: list = field(default_factory=list)
+    plan_error: str = None
+
+    def as_dict(self):
+        return asdict(self)
+
+
+class Buffer:
+    """Buffer circular de ConsultaLenta (las más nuevas al final)."""
+
+    def __init__(self, maximo):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._entradas = deque(maxlen=maximo)
+
+    def agregar(self, **datos):
+        with self._lock:
+            entrada = ConsultaLenta(id=next(self._ids), **datos)
+            self._entradas.append(entrada)
+        return entrada
+
+    def listar(self):
+        """Entradas de la más nueva a la más vieja."""
+        with self._lock:
+            return list(reversed(self._entradas))
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def redimensionar(self, maximo):
+        with self._lock:
+            if self._entradas.maxlen != maximo:
+                self._entradas = deque(self._entradas, maxlen=maximo)
+
+
+buffer = Buffer(config()['MAX_ENTRIES'])
+
+
+# ==========================================
+# CAPTURA
+# ==========================================
+
+def registrar_lentas(execute, sql, params, many, context):
+    """execute_wrapper: mide la consulta y registra la que supere el umbral."""
+    opciones = config()
+    if not opciones['ENABLED'] or getattr(_local, 'capturando', False):
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    resultado = execute(sql, params, many, context)
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    if duracion_ms >= opciones['THRESHOLD_MS']:
+        _local.capturando = True
+        try:
+            _capturar(sql, params, many, context['connection'], duracion_ms, opciones)
+        finally:
+            _local.capturando = False
+    return resultado
+
+
+def _capturar(sql, params, many, conn, duracion_ms, opciones):
+    vista, serializer, origen = _llamador()
+    plan, plan_error = [], None
+    if opciones['EXPLAIN'] and not many:
+        try:
+            plan = explicar(conn, sql, params, analyze=opciones['ANALYZE'])
+        except Exception as e:
+            plan_error = f'{type(e).__name__}: {e}'
+    buffer.redimensionar(opciones['MAX_ENTRIES'])
+    buffer.agregar(
+        fecha_hora=timezone.now().isoformat(timespec='milliseconds'),
+        alias=conn.alias,
+        vendor=conn.vendor,
+        duracion_ms=round(duracion_ms, 3),
+        sql=normalizar_sql(sql),
+        fingerprint=fingerprint(params),
+        many=many,
+        vista=vista,
+        serializer=serializer,
+        origen=origen,
+        plan=plan,
+        plan_error=plan_error,
+    )
+
+
+def fingerprint(params):
+    """Hash corto de los parámetros (mismos valores, mismo fingerprint)."""
+    return hashlib.sha256(repr(params).encode('utf-8', 'replace')).hexdigest()[:16]
+
+
+def explicar(conn, sql, params, analyze=False):
+    """
+    Plan de `sql` como lista de líneas, o [] si la sentencia no tiene plan.
+    ANALYZE solo se usa con SELECT (ejecutaría de nuevo las escrituras) y en
+    PostgreSQL. Corre dentro de un savepoint: si falla, no rompe la
+    transacción de la petición.
+    """
+    verbo = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ''
+    if verbo not in _CON_PLAN or not conn.features.supports_explaining_query_execution:
+        return []
+    opciones = {}
+    if analyze and conn.vendor == 'postgresql' and verbo in ('SELECT', 'WITH'):
+        opciones['analyze'] = True
+    prefijo = conn.ops.explain_query_prefix(**opciones)
+    with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+        cursor.execute(f'{prefijo} {sql}', params)
+        filas = cursor.fetchall()
+    if conn.vendor == 'sqlite':
+        return _arbol_sqlite(filas)
+    return [' '.join(str(valor) for valor in fila) for fila in filas]
+
+
+def _arbol_sqlite(filas):
+    """EXPLAIN QUERY PLAN devuelve (id, padre, -, detalle): se indenta por nivel."""
+    niveles, lineas = {0: -1}, []
+    for id_nodo, padre, _, detalle in filas:
+        nivel = niveles.get(padre, -1) + 1
+        niveles[id_nodo] = nivel
+        lineas.append('  ' * nivel + detalle)
+    return lineas
+
+
+def _llamador():
+    """(vista, serializer, origen) a partir de la pila de llamadas."""
+    from rest_framework.serializers import BaseSerializer
+    from rest_framework.views import APIView
+
+    vista = serializer = origen = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        archivo = frame.f_code.co_filename
+        instancia = frame.f_locals.get('self')
+        if vista is None and isinstance(instancia, APIView):
+            vista = f'{type(instancia).__module__}.{type(instancia).__name__}'
+        elif serializer is None and isinstance(instancia, BaseSerializer):
+            # El más interno (el que disparó la consulta); de un ListSerializer, su hijo
+            clase = getattr(instancia, 'child', instancia)
+            serializer = f'{type(clase).__module__}.{type(clase).__name__}'
+        if (origen is None and archivo.startswith(_RAIZ_PROYECTO) and archivo != _ESTE_ARCHIVO
+                and 'site-packages' not in archivo):
+            relativo = Path(archivo).relative_to(_RAIZ_PROYECTO)
+            origen = f'{relativo}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return vista, serializer, origen
+
+
+def instalar(sender=None, connection=None, **kwargs):
+    """
+    Receptor de connection_created: agrega el wrapper a la conexión una sola
+    vez. Va primero en la lista: los execute_wrapper() temporales (métricas,
+    tests) agregan y quitan el último.
+    """
+    if registrar_lentas not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, registrar_lentas)
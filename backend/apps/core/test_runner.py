@@ -0,0 +1,19 @@
+"""
+Runner de tests del proyecto (settings.TEST_RUNNER).
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+from apps.audit.writer import reset_audit_writer
+
+
+class TestRunner(DiscoverRunner):
+    """
+    La bitácora se escribe de forma síncrona: los registros quedan visibles
+    al instante y dentro de la transacción de cada test.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.AUDIT_WRITER = {**settings.AUDIT_WRITER, 'ASYNC': False}
+        reset_audit_writer()
@@ -1,3 +1,483 @@
-from django.test import TestCase
+import sys
+from datetime import time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Sum
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.audit import search
+from apps.audit.models import HistorialActividad
+from apps.clases.models import Clase, InscripcionClase, Salon
+from apps.clases.services import clases_con_desfase
+from apps.clients.autocomplete import reset_index
+from apps.clients.models import Client
+from apps.core.constants import (
+    ESTADO_ACTIVO,
+    ESTADO_PROMOCION_ACTIVA,
+    ESTADO_VENCIDO,
+    METODO_EFECTIVO,
+)
+from apps.core.permissions import get_permission_epoch
+from apps.disciplinas.models import Disciplina
+from apps.membresias import stats
+from apps.membresias.models import (
+    EstadisticaMembresiaMensual, InscripcionMembresia, Membresia, PlanMembresia, ResumenMembresias
+)
+from apps.promociones.models import Promocion
+from apps.roles.models import Permiso, RolPermiso, Role, UserRole
+from apps.users.models import PasswordResetToken, User
+from benchmarks import fixtures, runner
+from seeders.scale_seeder import ScaleSeeder
+from . import db_connections, metrics, slow_queries
+from .query_budget import escribir_reporte, medir, reporte, rutas_api
+
+# Presupuesto de consultas por nombre de ruta (config/urls.py). Toda ruta de
+# /api/ debe figurar aquí: un endpoint nuevo sin presupuesto hace fallar el
+# test. Los valores son para el fixture de QueryBudgetTests (N filas de cada
+# cosa): un N+1 los supera con holgura.
+#
+#   nombre: (método, presupuesto)
+QUERY_BUDGETS = {
+    'schema': ('get', 0),
+    'swagger-ui': ('get', 0),
+    'redoc': ('get', 0),
+    'users-create-admin': ('post', 20),
+    'current-user': ('get', 2),
+    'auth-login': ('post', 5),
+    'auth-logout': ('post', 8),
+    'token-refresh': ('post', 4),
+    'password-reset-request': ('post', 5),
+    'password-reset-confirm': ('post', 6),
+    'user-list-create': ('get', 3),
+    'user-detail': ('get', 2),
+    'role-list-create': ('get', 3),
+    'role-detail': ('get', 3),
+    'role-assign': ('post', 10),
+    'role-remove': ('post', 8),
+    'permission-list-create': ('get', 2),
+    'permission-detail': ('get', 1),
+    'role-permission-assign': ('post', 10),
+    'role-permission-remove': ('post', 6),
+    # Escritura: crece con los permisos que se agregan (get_or_create por cada
+    # uno); las versiones de los usuarios se incrementan una vez, al confirmar
+    'role-permission-set': ('put', 13),
+    'audit-log-list': ('get', 2),
+    'audit-log-detail': ('get', 1),
+    # Streaming: la lectura de filas corre al consumir el contenido (medir() lo recorre)
+    'audit-log-export': ('get', 2),
+    'client-list-create': ('get', 2),
+    'client-autocomplete': ('get', 1),
+    'client-detail': ('get', 1),
+    'membresia-list-create': ('get', 2),
+    'membresia-detail': ('get', 3),
+    'membresia-stats': ('get', 9),
+    'membresia-consultar-estado': ('get', 3),
+    'membresia-checkin': ('get', 2),
+    'plan-membresia-list': ('get', 1),
+    'promocion-list-create': ('get', 1),
+    'promocion-detail': ('get', 1),
+    'disciplina-list-create': ('get', 2),
+    'disciplina-detail': ('get', 1),
+    'salon-list-create': ('get', 2),
+    'salon-detail': ('get', 1),
+    'clase-list-create': ('get', 2),
+    'clase-bulk-create': ('post', 9),
+    'clase-semana': ('get', 2),
+    'clase-detail': ('get', 1),
+    'inscripcion-clase-list-create': ('get', 2),
+    'inscripcion-clase-detail': ('get', 2),
+    'metrics': ('get', 0),
+    'slow-query-list': ('get', 0),
+}
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Llama a cada ruta de /api/ con un conjunto de datos realista y compara
+    las consultas SQL contra QUERY_BUDGETS. El mensaje de falla (y el archivo
+    de QUERY_BUDGET_REPORT, si está definida) trae el reporte por endpoint
+    con los patrones de consulta repetidos.
+    """
+
+    N = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        f = cls.fx = type('Fixture', (), {})()
+        hoy = timezone.localdate()
+
+        f.admin = User.objects.create_superuser(username='admin', email='admin@gym.com', password='Admin1234!')
+        f.usuarios = [
+            User.objects.create(username=f'user{i}', email=f'user{i}@gym.com', first_name=f'U{i}')
+            for i in range(cls.N)
+        ]
+        # De otro usuario: password-reset-request invalida los tokens del admin
+        f.reset_token = PasswordResetToken.objects.create(
+            user=f.usuarios[0], expires_at=timezone.now() + timedelta(hours=1), ip_address='127.0.0.1'
+        )
+
+        permisos = [Permiso.objects.create(codigo=f'perm.{i}', nombre=f'Permiso {i}') for i in range(cls.N)]
+        f.permiso = permisos[0]
+        f.roles = [Role.objects.create(nombre=f'Rol {i}') for i in range(3)]
+        for rol in f.roles:
+            for permiso in permisos[1:]:
+                RolPermiso.objects.create(rol=rol, permiso=permiso)
+        for i, usuario in enumerate(f.usuarios):
+            UserRole.objects.create(usuario=usuario, rol=f.roles[i % 3])
+            UserRole.objects.create(usuario=usuario, rol=f.roles[(i + 1) % 3])
+
+        for i in range(cls.N):
+            HistorialActividad.objects.create(
+                usuario=f.usuarios[i], tipo_accion='login', accion='Inicio de Sesión', nivel='info'
+            )
+        f.log = HistorialActividad.objects.first()
+
+        f.plan = PlanMembresia.objects.create(nombre='Mensual', duracion=30, precio_base=Decimal('150'))
+        PlanMembresia.objects.create(nombre='Trimestral', duracion=90, precio_base=Decimal('400'))
+        f.promocion = Promocion.objects.create(
+            nombre='Promo', meses=1, descuento=Decimal('10'), fecha_inicio=hoy - timedelta(days=30),
+            fecha_fin=hoy + timedelta(days=30), estado=ESTADO_PROMOCION_ACTIVA,
+        )
+
+        f.clientes = [
+            Client.objects.create(nombre=f'Cliente{i}', apellido='Perez', ci=f'{5000000 + i}', telefono=f'7000000{i}')
+            for i in range(cls.N)
+        ]
+        for i, cliente in enumerate(f.clientes):
+            inscripcion = InscripcionMembresia.objects.create(
+                cliente=cliente, monto=Decimal('150'), metodo_de_pago=METODO_EFECTIVO
+            )
+            membresia = Membresia.objects.create(
+                inscripcion=inscripcion, plan=f.plan, usuario_registro=f.admin,
+                estado=ESTADO_ACTIVO if i % 4 else ESTADO_VENCIDO,
+                fecha_inicio=hoy - timedelta(days=10), fecha_fin=hoy + timedelta(days=20 - i),
+            )
+            membresia.promociones.add(f.promocion)
+        f.membresia = Membresia.objects.first()
+
+        f.disciplina = Disciplina.objects.create(nombre='Spinning')
+        Disciplina.objects.create(nombre='Yoga')
+        f.salones = [Salon.objects.create(nombre=f'Sala {i}', capacidad=30) for i in range(3)]
+        f.lunes = hoy + timedelta(days=7 - hoy.weekday())
+        f.clases = [
+            Clase.objects.create(
+                disciplina=f.disciplina, instructor=f.usuarios[i % 3], salon=f.salones[i % 3],
+                fecha=f.lunes + timedelta(days=i % 5), hora_inicio=time(8 + i // 5), hora_fin=time(9 + i // 5),
+                cupo_maximo=20,
+            )
+            for i in range(cls.N)
+        ]
+        for clase in f.clases:
+            for cliente in f.clientes[:4]:
+                InscripcionClase.objects.create(clase=clase, cliente=cliente)
+        f.inscripcion_clase = InscripcionClase.objects.first()
+
+    def setUp(self):
+        cache.clear()
+        # La época de permisos se cachea por proceso (PERMISSION_EPOCH_CACHE_TIMEOUT):
+        # leerla no es un costo de cada petición
+        get_permission_epoch()
+        reset_index()
+        self.client = APIClient()
+        self.client.force_authenticate(self.fx.admin)
+
+    def _peticion(self, nombre):
+        """(url, kwargs de la petición) de cada ruta."""
+        f = self.fx
+        pk = {
+            'user-detail': f.usuarios[0].pk,
+            'role-detail': f.roles[0].pk,
+            'permission-detail': f.permiso.pk,
+            'audit-log-detail': f.log.pk,
+            'client-detail': f.clientes[0].pk,
+            'membresia-detail': f.membresia.pk,
+            'promocion-detail': f.promocion.pk,
+            'disciplina-detail': f.disciplina.pk,
+            'salon-detail': f.salones[0].pk,
+            'clase-detail': f.clases[0].pk,
+            'inscripcion-clase-detail': f.inscripcion_clase.pk,
+        }
+        if nombre in pk:
+            return reverse(nombre, kwargs={'pk': pk[nombre]}), {}
+        if nombre.startswith('role-permission-'):
+            url = reverse(nombre, kwargs={'role_id': f.roles[0].pk})
+        else:
+            url = reverse(nombre)
+
+        refresh = str(RefreshToken.for_user(f.admin))
+        datos = {
+            'users-create-admin': {
+                'username': 'nuevo', 'email': 'nuevo@gym.com', 'password': 'Nuevo1234!',
+                'first_name': 'Nuevo', 'last_name': 'Admin',
+            },
+            'auth-login': {'email': 'admin@gym.com', 'password': 'Admin1234!'},
+            'auth-logout': {'refresh': refresh},
+            'token-refresh': {'refresh': refresh},
+            'password-reset-request': {'email': 'admin@gym.com'},
+            'password-reset-confirm': {
+                'token': str(f.reset_token.token),
+                'new_password': 'Otra1234!',
+            },
+            'role-assign': {'user_id': f.usuarios[0].pk, 'role_id': f.roles[2].pk},
+            'role-remove': {'user_id': f.usuarios[1].pk, 'role_id': f.roles[1].pk},
+            'role-permission-assign': {'permiso_id': f.permiso.pk},
+            'role-permission-remove': {'permiso_id': f.permiso.pk + 1},
+            'role-permission-set': {'permisos': [f.permiso.pk, f.permiso.pk + 1]},
+            'clase-bulk-create': {
+                'disciplina': f.disciplina.pk, 'instructor': f.admin.pk, 'salon': f.salones[0].pk,
+                'fecha_inicio': (f.lunes + timedelta(days=28)).isoformat(),
+                'fecha_fin': (f.lunes + timedelta(days=55)).isoformat(),
+                'dias_semana': [0, 2, 4], 'hora_inicio': '18:00', 'hora_fin': '19:00', 'cupo_maximo': 15,
+            },
+        }
+        params = {
+            'client-autocomplete': {'q': 'cli'},
+            'membresia-consultar-estado': {'cliente_id': f.clientes[1].pk},
+            'membresia-checkin': {'ci': f.clientes[1].ci},
+            'clase-semana': {'inicio': f.lunes.isoformat()},
+        }
+        if nombre in datos:
+            return url, {'data': datos[nombre], 'format': 'json'}
+        if nombre in params:
+            return url, {'data': params[nombre]}
+        return url, {}
+
+    def test_presupuesto_de_consultas_por_endpoint(self):
+        rutas = rutas_api()
+        sin_presupuesto = sorted(set(rutas) - set(QUERY_BUDGETS))
+        self.assertFalse(sin_presupuesto, f'Rutas sin presupuesto en QUERY_BUDGETS: {sin_presupuesto}')
+
+        mediciones = []
+        for nombre in rutas:
+            metodo, presupuesto = QUERY_BUDGETS[nombre]
+            url, kwargs = self._peticion(nombre)
+            medicion = medir(self.client, nombre, metodo, url, presupuesto, **kwargs)
+            self.assertLess(
+                medicion.status, 400,
+                f'{medicion.metodo} {url} respondió {medicion.status}: el fixture no cubre el endpoint',
+            )
+            mediciones.append(medicion)
+
+        escribir_reporte(mediciones)
+        excedidos = [m.nombre for m in mediciones if m.excedido]
+        self.assertFalse(excedidos, f'Presupuesto de consultas excedido en {excedidos}\n\n{reporte(mediciones)}')
+
+
+class BenchmarkSmokeTests(TestCase):
+    """La suite de benchmarks (manage.py benchmark) corre de punta a punta con datos mínimos."""
+
+    def test_mezcla_completa(self):
+        conteos = fixtures.cargar_escala(clientes=40, meses=2, bitacora=200)
+        self.assertEqual(conteos['cliente'], 40)
+        self.assertGreaterEqual(conteos['membresia'], 40)
+        self.assertEqual(fixtures.cargar_escala(clientes=40, meses=2, bitacora=200), {})
+
+        resultados = runner.ejecutar(requests=60, warmup=5, alloc_every=5)
+        self.assertEqual(set(resultados), set(runner.MEZCLA) | {'mix'})
+        mix = resultados['mix']
+        self.assertEqual(mix['errors'], 0, mix['status'])
+        self.assertLessEqual(mix['latency_ms']['p50'], mix['latency_ms']['p99'])
+        self.assertGreater(mix['alloc_kb']['samples'], 0)
+
+    def test_modos_de_conexion(self):
+        fixtures.cargar_escala(clientes=20, meses=1, bitacora=0)
+        original = dict(connection.settings_dict)
+
+        resultados = runner.ejecutar_conexiones(requests=10, warmup=2)
+        self.assertEqual(set(resultados), set(runner.MODOS_CONEXION))
+        for modo in resultados.values():
+            self.assertEqual(modo['requests'], 10)
+            self.assertEqual(modo['errors'], 0, modo['status'])
+            self.assertIn('connections_opened', modo)
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], original['CONN_MAX_AGE'])
+        self.assertEqual(connection.settings_dict['CONN_HEALTH_CHECKS'], original['CONN_HEALTH_CHECKS'])
+
+
+class ConnectionWarmupTests(TestCase):
+    """calentar() abre solo las conexiones que se reutilizan entre peticiones."""
+
+    def test_calentar(self):
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], 0)
+        self.assertEqual(db_connections.calentar(), {})
+
+        connection.settings_dict['CONN_MAX_AGE'] = 60
+        try:
+            resultado = db_connections.calentar()
+            self.assertIsInstance(resultado['default'], float)
+            with override_settings(DATABASE_WARMUP=False):
+                self.assertEqual(db_connections.calentar(), {})
+            # runserver atiende cada petición en un hilo nuevo: no sirve de nada
+            with mock.patch.object(sys, 'argv', ['manage.py', 'runserver']):
+                self.assertEqual(db_connections.calentar(), {})
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = 0
+
+
+class ScaleSeederTests(TestCase):
+    """Datos de manage.py seed_scale: consistentes entre tablas y en orden cronológico."""
+
+    def test_historia_consistente(self):
+        seeder = ScaleSeeder(clientes=30, meses=3, actividad_extra=100, batch_size=50, verbose=False)
+        seeder.seed()
+        conteos = seeder.conteos
+
+        self.assertEqual(Client.objects.count(), 30)
+        self.assertEqual(conteos['membresia'], Membresia.objects.count())
+        self.assertEqual(conteos['inscripcion_membresia'], conteos['membresia'])
+        self.assertGreaterEqual(conteos['membresia'], 30)
+        # Las membresías de un cliente no se superponen
+        anterior = {}
+        for cliente_id, inicio, fin in Membresia.objects.order_by('fecha_inicio').values_list(
+            'inscripcion__cliente_id', 'fecha_inicio', 'fecha_fin'
+        ):
+            self.assertGreater(inicio, anterior.get(cliente_id, inicio - timedelta(days=1)))
+            anterior[cliente_id] = fin
+
+        self.assertFalse(clases_con_desfase().exists())
+        self.assertFalse(Clase.objects.filter(inscritos_confirmados__gt=F('cupo_maximo')).exists())
+
+        fechas = list(HistorialActividad.objects.order_by('id').values_list('fecha_hora', flat=True))
+        self.assertEqual(fechas, sorted(fechas))
+        self.assertEqual(HistorialActividad.objects.filter(tipo_accion='create_client').count(), 30)
+        cliente = Client.objects.first()
+        encontrados, _ = search.apply_search(HistorialActividad.objects.all(), cliente.ci)
+        self.assertTrue(encontrados.filter(tipo_accion='create_client').exists())
+
+        # Resumen del dashboard y serie mensual reconciliados con los pagos insertados
+        resumen = ResumenMembresias.objects.get()
+        self.assertEqual(resumen.total_membresias, conteos['membresia'])
+        totales = EstadisticaMembresiaMensual.objects.aggregate(cantidad=Sum('inscripciones'), ingresos=Sum('ingresos'))
+        self.assertEqual(totales['cantidad'], conteos['inscripcion_membresia'])
+        self.assertEqual(totales['ingresos'], InscripcionMembresia.objects.aggregate(total=Sum('monto'))['total'])
+        self.assertEqual(resumen.ingresos_totales, totales['ingresos'])
+        self.assertTrue(any(mes['inscripciones'] for mes in stats.serie_mensual(4)))
+
+        self.assertTrue(seeder.ya_cargado())
+
+
+class MetricsTests(TestCase):
+    """MetricsMiddleware y GET /api/metrics/ (formato de Prometheus)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', email='admin@gym.com', password='Admin1234!')
+        cls.usuario = User.objects.create_user(username='recepcion', email='recepcion@gym.com', password='Recep1234!')
+        Client.objects.create(nombre='Ana', apellido='Pérez', ci='1234567', telefono='70000000')
+
+    def setUp(self):
+        metrics.registro.reset()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_histogramas_por_ruta(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/api/clients/').status_code, 200)
+        self.client.get('/api/no-existe/')
+
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texto = response.content.decode()
+        etiquetas = 'route="client-list-create",method="GET"'
+        self.assertIn(f'gym_http_requests_total{{{etiquetas},status="200"}} 3', texto)
+        self.assertIn('gym_http_requests_total{route="unmatched",method="GET",status="404"} 1', texto)
+        for nombre in metrics.HISTOGRAMAS:
+            self.assertIn(f'gym_http_{nombre}_bucket{{{etiquetas},le="+Inf"}} 3', texto)
+            self.assertIn(f'gym_http_{nombre}_count{{{etiquetas}}} 3', texto)
+
+        serie = metrics.registro.histogramas[('client-list-create', 'GET')]
+        self.assertGreater(serie['request_queries'].suma, 0)
+        self.assertGreater(serie['request_serializer_seconds'].suma, 0)
+        self.assertLessEqual(serie['request_db_seconds'].suma, serie['request_duration_seconds'].suma)
+        self.assertGreater(serie['response_size_bytes'].suma, 0)
+
+    def test_muestreo(self):
+        with override_settings(REQUEST_METRICS={'ENABLED': True, 'SAMPLE_RATE': 0}):
+            self.client.get('/api/clients/')
+        self.assertEqual(metrics.registro.peticiones[('client-list-create', 'GET', 200)], 1)
+        self.assertFalse(metrics.registro.histogramas)
+
+        with override_settings(REQUEST_METRICS={'ENABLED': False}):
+            self.client.get('/api/clients/')
+        self.assertEqual(metrics.registro.peticiones[('client-list-create', 'GET', 200)], 1)
+
+    def test_solo_superusuarios(self):
+        self.client.force_authenticate(self.usuario)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+
+
+class SlowQueryLogTests(TestCase):
+    """Registro de consultas lentas y GET /api/slow-queries/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', email='admin@gym.com', password='Admin1234!')
+        cls.usuario = User.objects.create_user(username='recepcion', email='recepcion@gym.com', password='Recep1234!')
+        Client.objects.create(nombre='Ana', apellido='Pérez', ci='1234567', telefono='70000000')
+
+    def setUp(self):
+        slow_queries.buffer.limpiar()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def opciones(self, **extra):
+        return override_settings(SLOW_QUERY_LOG={
+            'ENABLED': True, 'THRESHOLD_MS': 0, 'EXPLAIN': True, 'ANALYZE': False, 'MAX_ENTRIES': 200, **extra,
+        })
+
+    def test_captura_con_plan_y_vista(self):
+        with self.opciones():
+            self.assertEqual(self.client.get('/api/clients/', {'search': 'Ana'}).status_code, 200)
+
+        entradas = [e for e in slow_queries.buffer.listar() if e.sql.startswith('SELECT') and 'FROM "cliente"' in e.sql]
+        self.assertTrue(entradas)
+        entrada = entradas[0]
+        self.assertEqual(entrada.vista, 'apps.clients.views.ClientListCreateView')
+        self.assertTrue(entrada.plan)
+        self.assertIsNone(entrada.plan_error)
+        self.assertNotIn('%s', entrada.sql)
+        self.assertNotIn('Ana', entrada.sql)
+        self.assertEqual(len(entrada.fingerprint), 16)
+        self.assertTrue(entrada.origen)
+        # El EXPLAIN no se registra a sí mismo
+        self.assertFalse([e for e in slow_queries.buffer.listar() if 'EXPLAIN' in e.sql.upper()])
+
+    def test_umbral_y_desactivado(self):
+        with self.opciones(THRESHOLD_MS=60_000):
+            self.client.get('/api/clients/')
+        with self.opciones(ENABLED=False, THRESHOLD_MS=0):
+            self.client.get('/api/clients/')
+        self.assertEqual(slow_queries.buffer.listar(), [])
+
+    def test_buffer_acotado(self):
+        with self.opciones(MAX_ENTRIES=3, EXPLAIN=False):
+            for _ in range(5):
+                list(Client.objects.all())
+        entradas = slow_queries.buffer.listar()
+        self.assertEqual(len(entradas), 3)
+        self.assertGreater(entradas[0].id, entradas[-1].id)
+        self.assertEqual(entradas[0].plan, [])
+
+    def test_endpoint(self):
+        with self.opciones():
+            self.client.get('/api/clients/')
+        response = self.client.get('/api/slow-queries/', {'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        self.assertIn('plan', response.data['results'][0])
+        self.assertEqual(self.client.get('/api/slow-queries/', {'limit': 'x'}).status_code, 400)
+
+        self.assertEqual(self.client.delete('/api/slow-queries/').status_code, 204)
+        self.assertEqual(slow_queries.buffer.listar(), [])
+
+        self.client.force_authenticate(self.usuario)
+        self.assertEqual(self.client.get('/api/slow-queries/').status_code, 403)
@@ -1,6 +1,7 @@
 """
 Utilidades y helpers compartidos
 """
+import unicodedata
 from datetime import datetime, timedelta
 from django.utils import timezone
 
@@ -97,3 +98,39 @@ def normalizar_telefono(telefono):
         return ''
     
     return telefono.replace(' ', '').replace('-', '')
+
+
+def normalizar_busqueda(texto):
+    """
+    Normaliza un texto para búsquedas: minúsculas, sin tildes y con un solo
+    espacio entre palabras
+    
+    Args:
+        texto (str): Texto a normalizar
+        
+    Returns:
+        str: Texto normalizado (ej: "José  PÉREZ" -> "jose perez")
+    """
+    if not texto:
+        return ''
+    
+    sin_tildes = ''.join(
+        c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c)
+    )
+    return ' '.join(sin_tildes.lower().split())
+
+
+def solo_digitos(texto):
+    """
+    Deja solo los dígitos de un texto (CI, teléfono)
+    
+    Args:
+        texto (str): Texto de entrada
+        
+    Returns:
+        str: Solo los dígitos (ej: "7-123 4567" -> "71234567")
+    """
+    if not texto:
+        return ''
+    
+    return ''.join(c for c in texto if c.isdigit())
@@ -1,3 +1,52 @@
-from django.shortcuts import render
+from django.http import HttpResponse
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from . import metrics, slow_queries
+from .permissions import IsSuperUser
+
+
+@extend_schema(tags=["Sistema"], responses={200: OpenApiTypes.STR})
+class MetricsView(APIView):
+    """
+    GET /api/metrics/
+    Métricas de rendimiento por ruta (MetricsMiddleware) en formato de
+    texto de Prometheus. Solo superusuarios.
+    """
+    permission_classes = [IsSuperUser]
+
+    def get(self, request):
+        return HttpResponse(metrics.registro.exportar(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@extend_schema(tags=["Sistema"], responses={200: OpenApiTypes.OBJECT, 204: None})
+class SlowQueryListView(APIView):
+    """
+    GET /api/slow-queries/?limit=50
+    Consultas lentas registradas por este proceso (la más nueva primero),
+    con su plan de ejecución. DELETE vacía el registro. Solo superusuarios.
+    """
+    permission_classes = [IsSuperUser]
+
+    def get(self, request):
+        entradas = slow_queries.buffer.listar()
+        limite = request.query_params.get("limit")
+        if limite:
+            try:
+                entradas = entradas[:max(int(limite), 0)]
+            except ValueError:
+                return Response({"detail": "limit debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
+        opciones = slow_queries.config()
+        return Response({
+            "threshold_ms": opciones["THRESHOLD_MS"],
+            "max_entries": opciones["MAX_ENTRIES"],
+            "count": len(entradas),
+            "results": [entrada.as_dict() for entrada in entradas],
+        })
+
+    def delete(self, request):
+        slow_queries.buffer.limpiar()
+        return Response(status=status.HTTP_204_NO_CONTENT)
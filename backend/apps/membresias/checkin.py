@@ -0,0 +1,190 @@
+"""
+Check-in por CI (control de acceso en recepción)
+
+Para cada cliente se guarda en caché una proyección compacta: sus datos
+básicos y las membresías que todavía pueden importar hoy (las que no
+terminaron antes de hoy, más la más reciente). Se arma con UNA consulta
+(cliente LEFT JOIN inscripciones/membresías/plan) y el veredicto
+(vigente / vence en N días / suspendida / vencida ...) se calcula en
+memoria con una sola fecha de hoy.
+
+La clave incluye la fecha, así que la proyección se rehace cada día sola.
+Los signals de Membresia y Client (apps.membresias.signals) la borran al
+confirmar cualquier cambio. La bitácora se entrega al escritor asíncrono
+(apps.audit.writer), fuera del camino crítico.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from apps.clients.models import Client
+from apps.core.constants import (
+    ESTADO_ACTIVO,
+    ESTADO_CANCELADO,
+    ESTADO_INACTIVO,
+    ESTADO_SUSPENDIDO,
+)
+from apps.core.utils import solo_digitos
+
+CACHE_PREFIX = 'membresias:checkin'
+
+# Resultados del check-in
+VIGENTE = 'vigente'
+SUSPENDIDA = 'suspendida'
+NO_INICIADA = 'no_iniciada'
+VENCIDA = 'vencida'
+CANCELADA = 'cancelada'
+INACTIVA = 'inactiva'
+SIN_MEMBRESIA = 'sin_membresia'
+
+# Sin proyección para este CI (cliente inexistente); se guarda igual para
+# no repetir la consulta en cada intento
+NO_ENCONTRADO = 'no_encontrado'
+
+
+def _cache_timeout():
+    return getattr(settings, 'CHECKIN_CACHE_TIMEOUT', 600)
+
+
+def _dias_aviso():
+    return getattr(settings, 'CHECKIN_DIAS_AVISO', 7)
+
+
+def _cache_key(ci, hoy):
+    return f'{CACHE_PREFIX}:{hoy.isoformat()}:{ci}'
+
+
+# ==========================================
+# PROYECCIÓN
+# ==========================================
+
+def construir_proyeccion(ci, hoy):
+    """
+    Una consulta. Retorna NO_ENCONTRADO o
+    {"cliente": (id, nombre_completo, ci),
+     "membresias": [(id, estado, fecha_inicio, fecha_fin, plan), ...]}
+    con las membresías ordenadas de la más reciente a la más antigua.
+    """
+    filas = list(
+        Client.objects.filter(ci_busqueda=ci)
+        .order_by('-inscripciones__membresia__fecha_inicio', '-inscripciones__membresia__id')
+        .values_list(
+            'id', 'nombre', 'apellido', 'ci',
+            'inscripciones__membresia__id',
+            'inscripciones__membresia__estado',
+            'inscripciones__membresia__fecha_inicio',
+            'inscripciones__membresia__fecha_fin',
+            'inscripciones__membresia__plan__nombre',
+        )
+    )
+    if not filas:
+        return NO_ENCONTRADO
+
+    cliente_id, nombre, apellido, ci_cliente = filas[0][:4]
+    membresias = [fila[4:] for fila in filas if fila[4] is not None]
+    # Solo las que aún pueden estar en curso o por empezar, más la última
+    relevantes = [m for m in membresias if m[3] >= hoy]
+    if membresias and membresias[0] not in relevantes:
+        relevantes.append(membresias[0])
+    return {
+        "cliente": (cliente_id, f"{nombre} {apellido}", ci_cliente),
+        "membresias": relevantes,
+    }
+
+
+def obtener_proyeccion(ci, hoy=None):
+    hoy = hoy or timezone.localdate()
+    key = _cache_key(ci, hoy)
+    proyeccion = cache.get(key)
+    if proyeccion is None:
+        proyeccion = construir_proyeccion(ci, hoy)
+        cache.set(key, proyeccion, _cache_timeout())
+    return proyeccion
+
+
+def invalidar(cis):
+    """Borra la proyección de hoy de estos CI al confirmar la transacción."""
+    keys = [_cache_key(solo_digitos(ci), timezone.localdate()) for ci in cis if ci]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidar_cliente(cliente_id):
+    invalidar(Client.objects.filter(pk=cliente_id).values_list('ci', flat=True))
+
+
+# ==========================================
+# VEREDICTO
+# ==========================================
+
+def evaluar(proyeccion, hoy):
+    """Arma la respuesta de check-in a partir de la proyección."""
+    cliente_id, nombre_completo, ci = proyeccion["cliente"]
+    respuesta = {
+        "cliente": {"id": cliente_id, "nombre_completo": nombre_completo, "ci": ci},
+        "acceso": False,
+        "resultado": SIN_MEMBRESIA,
+        "mensaje": "El cliente no tiene membresías registradas",
+        "membresia": None,
+    }
+    membresias = proyeccion["membresias"]
+    if not membresias:
+        return respuesta
+
+    en_curso = [m for m in membresias if m[2] <= hoy <= m[3]]
+    activa = next((m for m in en_curso if m[1] == ESTADO_ACTIVO), None)
+    suspendida = next((m for m in en_curso if m[1] == ESTADO_SUSPENDIDO), None)
+    futura = next(
+        (m for m in reversed(membresias) if m[2] > hoy and m[1] == ESTADO_ACTIVO), None
+    )
+
+    if activa:
+        membresia = activa
+        dias = (activa[3] - hoy).days
+        respuesta.update(
+            acceso=True,
+            resultado=VIGENTE,
+            mensaje="Vigente: vence hoy" if dias == 0 else f"Vigente: vence en {dias} días",
+            por_vencer=dias <= _dias_aviso(),
+        )
+    elif suspendida:
+        membresia = suspendida
+        respuesta.update(resultado=SUSPENDIDA, mensaje="Membresía suspendida")
+    elif futura:
+        membresia = futura
+        respuesta.update(resultado=NO_INICIADA, mensaje=f"La membresía inicia el {futura[2].isoformat()}")
+    else:
+        membresia = membresias[0]
+        if membresia[1] == ESTADO_CANCELADO:
+            respuesta.update(resultado=CANCELADA, mensaje="Membresía cancelada")
+        elif membresia[1] == ESTADO_INACTIVO:
+            respuesta.update(resultado=INACTIVA, mensaje="Membresía inactiva")
+        else:
+            respuesta.update(resultado=VENCIDA, mensaje=f"Membresía vencida el {membresia[3].isoformat()}")
+
+    membresia_id, estado, fecha_inicio, fecha_fin, plan = membresia
+    respuesta["membresia"] = {
+        "id": membresia_id,
+        "plan": plan,
+        "estado": estado,
+        "fecha_inicio": fecha_inicio.isoformat(),
+        "fecha_fin": fecha_fin.isoformat(),
+        "dias_restantes": (fecha_fin - hoy).days,
+    }
+    return respuesta
+
+
+def checkin(ci):
+    """
+    Resultado del check-in para el CI dado, o None si no hay un cliente con
+    ese CI.
+    """
+    hoy = timezone.localdate()
+    ci = solo_digitos(ci)
+    if not ci:
+        return None
+    proyeccion = obtener_proyeccion(ci, hoy)
+    if proyeccion == NO_ENCONTRADO:
+        return None
+    return evaluar(proyeccion, hoy)
@@ -0,0 +1,20 @@
+# Generated by Django 5.0 on 2026-10-17 10:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membresias', '0003_alter_membresia_estado'),
+        ('promociones', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='membresia',
+            index=models.Index(fields=['-fecha_inicio', '-id'], name='membresia_inicio_id_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0 on 2026-10-17 10:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membresias', '0004_membresia_membresia_inicio_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaMembresiaMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField(verbose_name='Año')),
+                ('mes', models.PositiveSmallIntegerField(verbose_name='Mes')),
+                ('inscripciones', models.IntegerField(default=0, verbose_name='Inscripciones')),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ingresos')),
+            ],
+            options={
+                'verbose_name': 'Estadística Mensual de Membresías',
+                'verbose_name_plural': 'Estadísticas Mensuales de Membresías',
+                'db_table': 'estadistica_membresia_mensual',
+                'ordering': ['anio', 'mes'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenMembresias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_membresias', models.IntegerField(default=0, verbose_name='Total de Membresías')),
+                ('activas', models.IntegerField(default=0, verbose_name='Activas')),
+                ('vencidas', models.IntegerField(default=0, verbose_name='Vencidas')),
+                ('ingresos_totales', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ingresos Totales')),
+                ('ingresos_mes_actual', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ingresos del Mes Actual')),
+                ('fecha_corte', models.DateField(help_text='Día con el que se clasificaron activas/vencidas', null=True, verbose_name='Fecha de Corte')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Membresías',
+                'verbose_name_plural': 'Resumen de Membresías',
+                'db_table': 'resumen_membresias',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='estadisticamembresiamensual',
+            constraint=models.UniqueConstraint(fields=('anio', 'mes'), name='unique_estadistica_membresia_mes'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-17 10:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0004_busqueda_normalizada'),
+        ('membresias', '0005_estadisticas_membresias'),
+        ('promociones', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inscripcionmembresia',
+            index=models.Index(fields=['created_at', 'monto'], name='insc_memb_fecha_monto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inscripcionmembresia',
+            index=models.Index(fields=['cliente', '-created_at'], name='insc_memb_cliente_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membresia',
+            index=models.Index(fields=['estado', 'fecha_fin'], name='membresia_estado_fin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membresia',
+            index=models.Index(condition=models.Q(('estado__in', ['activo', 'suspendido'])), fields=['fecha_fin'], name='membresia_vencible_fin_idx'),
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 from apps.core.models import TimeStampedModel
-from apps.core.constants import METODOS_PAGO, ESTADOS_MEMBRESIA
+from apps.core.constants import METODOS_PAGO, ESTADOS_MEMBRESIA, ESTADO_ACTIVO, ESTADO_SUSPENDIDO
 from apps.clients.models import Client
 
 
@@ -57,6 +57,12 @@ class InscripcionMembresia(TimeStampedModel):
         db_table = 'inscripcion_membresia'
         verbose_name = 'Inscripción Membresía'
         verbose_name_plural = 'Inscripciones Membresía'
+        indexes = [
+            # Ingresos por rango de fechas / por mes (cubre monto: sin leer la tabla)
+            models.Index(fields=['created_at', 'monto'], name='insc_memb_fecha_monto_idx'),
+            # Inscripciones de un cliente, de la más reciente a la más antigua
+            models.Index(fields=['cliente', '-created_at'], name='insc_memb_cliente_fecha_idx'),
+        ]
 
     def __str__(self):
         return f"{self.cliente} - ${self.monto}"
@@ -109,6 +115,18 @@ class Membresia(TimeStampedModel):
         verbose_name = "Membresía"
         verbose_name_plural = "Membresías"
         ordering = ['-fecha_inicio']
+        indexes = [
+            # Paginación por cursor (fecha_inicio, id)
+            models.Index(fields=['-fecha_inicio', '-id'], name='membresia_inicio_id_idx'),
+            # Filtros por estado + vigencia (estadísticas, ?estado=)
+            models.Index(fields=['estado', 'fecha_fin'], name='membresia_estado_fin_idx'),
+            # Parcial: solo las que todavía pueden vencer (expire_memberships)
+            models.Index(
+                fields=['fecha_fin'],
+                name='membresia_vencible_fin_idx',
+                condition=models.Q(estado__in=[ESTADO_ACTIVO, ESTADO_SUSPENDIDO]),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.inscripcion.cliente} - {self.plan.nombre} ({self.estado})"
@@ -124,6 +142,7 @@ class Membresia(TimeStampedModel):
         """Verifica si la membresía está activa"""
         from apps.core.utils import esta_activo
         from apps.core.constants import ESTADO_ACTIVO
+        # La fecha cubre las que expire_memberships todavía no marcó como vencidas
         return self.estado == ESTADO_ACTIVO and esta_activo(self.fecha_fin)
     
     @property
@@ -158,3 +177,57 @@ class MembresiaPromocion(TimeStampedModel):
 
     def __str__(self):
         return f"{self.membresia} - {self.promocion}"
+
+
+class ResumenMembresias(models.Model):
+    """
+    Resumen precalculado para MembresiaStatsView (una sola fila, pk=1).
+    Se mantiene con señales (apps.membresias.signals) y se recalcula
+    completo una vez al día (fecha_corte) o con reconcile_membership_stats.
+    """
+    total_membresias = models.IntegerField(default=0, verbose_name="Total de Membresías")
+    activas = models.IntegerField(default=0, verbose_name="Activas")
+    vencidas = models.IntegerField(default=0, verbose_name="Vencidas")
+    ingresos_totales = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Ingresos Totales"
+    )
+    ingresos_mes_actual = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Ingresos del Mes Actual"
+    )
+    fecha_corte = models.DateField(
+        null=True,
+        verbose_name="Fecha de Corte",
+        help_text="Día con el que se clasificaron activas/vencidas"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Fecha de Actualización")
+
+    class Meta:
+        db_table = 'resumen_membresias'
+        verbose_name = 'Resumen de Membresías'
+        verbose_name_plural = 'Resumen de Membresías'
+
+    def __str__(self):
+        return f"Resumen al {self.fecha_corte}: {self.total_membresias} membresías"
+
+
+class EstadisticaMembresiaMensual(models.Model):
+    """
+    Ingresos e inscripciones por mes (según created_at de la inscripción,
+    en la zona horaria del sistema). Base de la serie histórica.
+    """
+    anio = models.PositiveSmallIntegerField(verbose_name="Año")
+    mes = models.PositiveSmallIntegerField(verbose_name="Mes")
+    inscripciones = models.IntegerField(default=0, verbose_name="Inscripciones")
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Ingresos")
+
+    class Meta:
+        db_table = 'estadistica_membresia_mensual'
+        verbose_name = 'Estadística Mensual de Membresías'
+        verbose_name_plural = 'Estadísticas Mensuales de Membresías'
+        ordering = ['anio', 'mes']
+        constraints = [
+            models.UniqueConstraint(fields=['anio', 'mes'], name='unique_estadistica_membresia_mes')
+        ]
+
+    def __str__(self):
+        return f"{self.anio}-{self.mes:02d}: Bs. {self.ingresos} ({self.inscripciones})"
@@ -350,7 +350,8 @@ class MembresiaEstadoVigenciaSerializer(serializers.ModelSerializer):
         from datetime import date
         from apps.core.constants import ESTADO_ACTIVO, ESTADO_SUSPENDIDO
         
-        # Vigente si está activa o suspendida y no ha vencido
+        # Vigente si está activa o suspendida y no ha vencido (la fecha cubre
+        # las que expire_memberships todavía no marcó, ver apps.membresias.vencimiento)
         esta_en_periodo = obj.fecha_fin >= date.today()
         estado_valido = obj.estado in [ESTADO_ACTIVO, ESTADO_SUSPENDIDO]
         
@@ -0,0 +1,125 @@
+"""
+Signals de Membresías.
+Mantienen al día las estadísticas precalculadas (ver apps.membresias.stats)
+y borran la proyección de check-in del cliente (ver apps.membresias.checkin).
+Los cambios masivos con queryset.update() no disparan señales: después de
+uno hay que llamar a stats.reconciliar() o stats.recalcular_resumen().
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.clients.models import Client
+from . import checkin, stats
+from .models import InscripcionMembresia, Membresia
+
+
+# ---------- Membresia: total / activas / vencidas ----------
+
+@receiver(pre_save, sender=Membresia)
+def guardar_estado_anterior_membresia(sender, instance, raw=False, **kwargs):
+    instance._stats_anterior = None
+    if raw or instance.pk is None:
+        return
+    instance._stats_anterior = (
+        Membresia.objects.filter(pk=instance.pk).values_list('estado', 'fecha_fin').first()
+    )
+
+
+@receiver(post_save, sender=Membresia)
+def actualizar_resumen_membresia(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    hoy = timezone.localdate()
+    activa, vencida = stats.clasificar(instance.estado, instance.fecha_fin, hoy)
+    anterior = getattr(instance, '_stats_anterior', None)
+
+    if created or anterior is None:
+        stats.aplicar_delta_resumen(total=1, activas=activa, vencidas=vencida)
+        return
+    activa_antes, vencida_antes = stats.clasificar(anterior[0], anterior[1], hoy)
+    stats.aplicar_delta_resumen(activas=activa - activa_antes, vencidas=vencida - vencida_antes)
+
+
+@receiver(post_delete, sender=Membresia)
+def descontar_membresia(sender, instance, **kwargs):
+    activa, vencida = stats.clasificar(instance.estado, instance.fecha_fin, timezone.localdate())
+    stats.aplicar_delta_resumen(total=-1, activas=-activa, vencidas=-vencida)
+
+
+# ---------- InscripcionMembresia: ingresos ----------
+
+@receiver(pre_save, sender=InscripcionMembresia)
+def guardar_monto_anterior(sender, instance, raw=False, **kwargs):
+    instance._stats_monto_anterior = None
+    if raw or instance.pk is None:
+        return
+    instance._stats_monto_anterior = (
+        InscripcionMembresia.objects.filter(pk=instance.pk).values_list('monto', flat=True).first()
+    )
+
+
+def _delta_ingresos(instance, inscripciones, monto):
+    anio, mes = stats.mes_de(instance.created_at)
+    hoy = timezone.localdate()
+    stats.aplicar_delta_mes(anio, mes, inscripciones=inscripciones, ingresos=monto)
+    stats.aplicar_delta_resumen(
+        ingresos=monto,
+        ingresos_mes=monto if (anio, mes) == (hoy.year, hoy.month) else 0,
+    )
+
+
+@receiver(post_save, sender=InscripcionMembresia)
+def actualizar_ingresos(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, '_stats_monto_anterior', None)
+    if created or anterior is None:
+        _delta_ingresos(instance, 1, instance.monto)
+    elif instance.monto != anterior:
+        _delta_ingresos(instance, 0, instance.monto - anterior)
+
+
+@receiver(post_delete, sender=InscripcionMembresia)
+def descontar_ingresos(sender, instance, **kwargs):
+    _delta_ingresos(instance, -1, -instance.monto)
+
+
+# ---------- Check-in: proyección por CI ----------
+
+def _invalidar_checkin_membresia(instance):
+    checkin.invalidar(
+        InscripcionMembresia.objects.filter(pk=instance.inscripcion_id).values_list('cliente__ci', flat=True)
+    )
+
+
+@receiver(post_save, sender=Membresia)
+def invalidar_checkin_membresia(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _invalidar_checkin_membresia(instance)
+
+
+@receiver(post_delete, sender=Membresia)
+def invalidar_checkin_membresia_eliminada(sender, instance, **kwargs):
+    _invalidar_checkin_membresia(instance)
+
+
+@receiver(pre_save, sender=Client)
+def guardar_ci_anterior(sender, instance, raw=False, **kwargs):
+    instance._checkin_ci_anterior = None
+    if raw or instance.pk is None:
+        return
+    instance._checkin_ci_anterior = Client.objects.filter(pk=instance.pk).values_list('ci', flat=True).first()
+
+
+@receiver(post_save, sender=Client)
+def invalidar_checkin_cliente(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    checkin.invalidar([instance.ci, getattr(instance, '_checkin_ci_anterior', None)])
+
+
+@receiver(post_delete, sender=Client)
+def invalidar_checkin_cliente_eliminado(sender, instance, **kwargs):
+    checkin.invalidar([instance.ci])
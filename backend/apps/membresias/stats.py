@@ -0,0 +1,209 @@
+"""
+Estadísticas precalculadas de membresías
+
+- ResumenMembresias (una fila): lo que muestra el dashboard. Las señales le
+  aplican deltas con F() en la misma transacción del cambio; una vez al día
+  (cuando cambia fecha_corte) se recalcula completo, porque las membresías
+  pasan a "vencidas" con el paso del tiempo sin que nada se guarde.
+- EstadisticaMembresiaMensual: ingresos e inscripciones por mes para la
+  serie histórica, sin volver a recorrer los pagos.
+
+`reconcile_membership_stats` recalcula ambas tablas desde cero.
+"""
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.core.constants import ESTADO_ACTIVO
+from .models import (
+    EstadisticaMembresiaMensual,
+    InscripcionMembresia,
+    Membresia,
+    ResumenMembresias,
+)
+from .vencimiento import esta_vencida, q_vencidas
+
+RESUMEN_PK = 1
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return parse_date(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def clasificar(estado, fecha_fin, hoy):
+    """
+    Retorna (activa, vencida) como 0/1 con el mismo criterio que el
+    dashboard: el estado, salvo las activas/suspendidas que expire_memberships
+    todavía no marcó (ver apps.membresias.vencimiento).
+    """
+    fecha_fin = _as_date(fecha_fin)
+    activa = estado == ESTADO_ACTIVO and fecha_fin is not None and fecha_fin >= hoy
+    return int(activa), int(esta_vencida(estado, fecha_fin, hoy))
+
+
+def mes_de(instante):
+    """(año, mes) de un datetime en la zona horaria del sistema."""
+    local = timezone.localtime(instante) if timezone.is_aware(instante) else instante
+    return local.year, local.month
+
+
+def _inicio_mes(anio, mes):
+    return timezone.make_aware(datetime.combine(date(anio, mes, 1), time.min))
+
+
+# ==========================================
+# RECÁLCULO COMPLETO
+# ==========================================
+
+def recalcular_resumen(hoy=None):
+    """Recalcula ResumenMembresias desde las tablas base."""
+    hoy = hoy or timezone.localdate()
+    conteos = Membresia.objects.aggregate(
+        total=Count('id'),
+        activas=Count('id', filter=Q(estado=ESTADO_ACTIVO, fecha_fin__gte=hoy)),
+        vencidas=Count('id', filter=q_vencidas(hoy)),
+    )
+    siguiente = (hoy.year + hoy.month // 12, hoy.month % 12 + 1)
+    ingresos = InscripcionMembresia.objects.aggregate(
+        total=Sum('monto'),
+        mes=Sum('monto', filter=Q(
+            created_at__gte=_inicio_mes(hoy.year, hoy.month),
+            created_at__lt=_inicio_mes(*siguiente),
+        )),
+    )
+    resumen, _ = ResumenMembresias.objects.update_or_create(
+        pk=RESUMEN_PK,
+        defaults={
+            'total_membresias': conteos['total'],
+            'activas': conteos['activas'],
+            'vencidas': conteos['vencidas'],
+            'ingresos_totales': ingresos['total'] or 0,
+            'ingresos_mes_actual': ingresos['mes'] or 0,
+            'fecha_corte': hoy,
+        },
+    )
+    return resumen
+
+
+@transaction.atomic
+def recalcular_meses():
+    """Reconstruye EstadisticaMembresiaMensual agrupando los pagos por mes."""
+    filas = (
+        InscripcionMembresia.objects
+        .annotate(periodo=TruncMonth('created_at'))
+        .values('periodo')
+        .annotate(cantidad=Count('id'), total=Sum('monto'))
+        .order_by('periodo')
+    )
+    EstadisticaMembresiaMensual.objects.all().delete()
+    EstadisticaMembresiaMensual.objects.bulk_create([
+        EstadisticaMembresiaMensual(
+            anio=fila['periodo'].year,
+            mes=fila['periodo'].month,
+            inscripciones=fila['cantidad'],
+            ingresos=fila['total'] or 0,
+        )
+        for fila in filas
+    ])
+
+
+def reconciliar():
+    """Recalcula resumen y serie mensual. Retorna el resumen."""
+    recalcular_meses()
+    return recalcular_resumen()
+
+
+# ==========================================
+# LECTURA
+# ==========================================
+
+def obtener_resumen():
+    """
+    Resumen para el dashboard: una fila. Si es de un día anterior (o no
+    existe) se recalcula primero.
+    """
+    hoy = timezone.localdate()
+    resumen = ResumenMembresias.objects.filter(pk=RESUMEN_PK, fecha_corte=hoy).first()
+    if resumen is None:
+        resumen = recalcular_resumen(hoy)
+    return resumen
+
+
+def serie_mensual(meses=12):
+    """Últimos `meses` meses (incluye el actual), con ceros donde no hubo pagos."""
+    hoy = timezone.localdate()
+    indice_actual = hoy.year * 12 + hoy.month - 1
+    periodos = [divmod(i, 12) for i in range(indice_actual - meses + 1, indice_actual + 1)]
+    periodos = [(anio, mes + 1) for anio, mes in periodos]
+
+    primero = periodos[0]
+    filas = {
+        (fila.anio, fila.mes): fila
+        for fila in EstadisticaMembresiaMensual.objects.filter(
+            Q(anio__gt=primero[0]) | Q(anio=primero[0], mes__gte=primero[1])
+        )
+    }
+    serie = []
+    for anio, mes in periodos:
+        fila = filas.get((anio, mes))
+        serie.append({
+            "anio": anio,
+            "mes": mes,
+            "inscripciones": fila.inscripciones if fila else 0,
+            "ingresos": float(fila.ingresos) if fila else 0.0,
+        })
+    return serie
+
+
+# ==========================================
+# DELTAS (señales)
+# ==========================================
+
+def aplicar_delta_resumen(total=0, activas=0, vencidas=0, ingresos=0, ingresos_mes=0):
+    """
+    Suma deltas al resumen del día. Si el resumen es de otro día no hace
+    nada: se recalculará completo en la próxima lectura.
+    """
+    cambios = {}
+    for campo, delta in (
+        ('total_membresias', total),
+        ('activas', activas),
+        ('vencidas', vencidas),
+        ('ingresos_totales', ingresos),
+        ('ingresos_mes_actual', ingresos_mes),
+    ):
+        if delta:
+            cambios[campo] = F(campo) + delta
+    if cambios:
+        ResumenMembresias.objects.filter(
+            pk=RESUMEN_PK, fecha_corte=timezone.localdate()
+        ).update(**cambios)
+
+
+def aplicar_delta_mes(anio, mes, inscripciones=0, ingresos=0):
+    """Suma deltas a la fila del mes, creándola si hace falta."""
+    if not inscripciones and not ingresos:
+        return
+    cambios = {
+        'inscripciones': F('inscripciones') + inscripciones,
+        'ingresos': F('ingresos') + ingresos,
+    }
+    if EstadisticaMembresiaMensual.objects.filter(anio=anio, mes=mes).update(**cambios):
+        return
+    try:
+        with transaction.atomic():
+            EstadisticaMembresiaMensual.objects.create(
+                anio=anio, mes=mes, inscripciones=inscripciones, ingresos=Decimal(ingresos)
+            )
+    except IntegrityError:
+        # Otro proceso creó la fila entre el UPDATE y el INSERT
+        EstadisticaMembresiaMensual.objects.filter(anio=anio, mes=mes).update(**cambios)
@@ -1,3 +1,296 @@
+import re
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.audit.models import HistorialActividad
+from apps.clients.models import Client
+from apps.core.constants import (
+    ESTADO_ACTIVO, ESTADO_CANCELADO, ESTADO_INACTIVO, ESTADO_SUSPENDIDO, ESTADO_VENCIDO, METODO_EFECTIVO
+)
+from apps.users.models import User
+from . import checkin, stats
+from .models import (
+    EstadisticaMembresiaMensual, InscripcionMembresia, Membresia, PlanMembresia, ResumenMembresias
+)
+from .vencimiento import pendientes
+
+
+class QueryPlanTests(TestCase):
+    """
+    Regresión de planes: las consultas frecuentes de membresías deben usar
+    un índice (EXPLAIN en SQLite y PostgreSQL), no recorrer la tabla.
+    """
+
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        if connection.vendor == 'postgresql':
+            # Con tablas casi vacías el planner prefiere Seq Scan aunque el
+            # índice sirva: se desalienta para ver si el índice es usable
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def tearDown(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
+
+    def assertUsesIndex(self, queryset, tables):
+        plan = queryset.explain()
+        if connection.vendor == 'sqlite':
+            for table in tables:
+                # "SCAN tabla" sin "USING ... INDEX" es un recorrido completo
+                for line in plan.splitlines():
+                    if re.search(rf'\bSCAN {table}\b', line):
+                        self.assertIn('INDEX', line, f'Recorrido completo de {table}:\n{plan}')
+                self.assertRegex(plan, rf'(SEARCH|SCAN) {table} USING .*INDEX', plan)
+        elif connection.vendor == 'postgresql':
+            for table in tables:
+                self.assertNotRegex(plan, rf'Seq Scan on {table}\b', plan)
+        else:
+            self.skipTest(f'Sin verificación de planes para {connection.vendor}')
+
+    def test_membresias_por_vencer(self):
+        self.assertUsesIndex(pendientes(self.hoy), ['membresia'])
+
+    def test_membresias_activas(self):
+        self.assertUsesIndex(
+            Membresia.objects.filter(estado=ESTADO_ACTIVO, fecha_fin__gte=self.hoy), ['membresia']
+        )
+
+    def test_membresias_vencidas(self):
+        self.assertUsesIndex(Membresia.objects.filter(estado=ESTADO_VENCIDO), ['membresia'])
+
+    def test_ingresos_del_mes(self):
+        inicio = timezone.make_aware(datetime.combine(self.hoy.replace(day=1), time.min))
+        self.assertUsesIndex(
+            InscripcionMembresia.objects.filter(
+                created_at__gte=inicio, created_at__lt=inicio + timedelta(days=31)
+            ).values('monto'),
+            ['inscripcion_membresia'],
+        )
+
+    def test_membresias_de_un_cliente(self):
+        self.assertUsesIndex(
+            Membresia.objects.filter(inscripcion__cliente_id=1).order_by('-fecha_inicio'),
+            ['membresia', 'inscripcion_membresia'],
+        )
+
+    def test_inscripciones_de_un_cliente(self):
+        self.assertUsesIndex(
+            InscripcionMembresia.objects.filter(cliente_id=1).order_by('-created_at'),
+            ['inscripcion_membresia'],
+        )
+
+
+class MembresiaTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.hoy = timezone.localdate()
+        cls.plan = PlanMembresia.objects.create(nombre='Mensual', duracion=30, precio_base=Decimal('150'))
+        cls.cliente = Client.objects.create(nombre='Ana', apellido='Pérez', ci='1234567', telefono='70000000')
+
+    def _membresia(self, monto='150', estado=ESTADO_ACTIVO, dias=20, inicio=-10, cliente=None):
+        """Membresía con fecha_inicio y fecha_fin relativas a hoy (en días)."""
+        inscripcion = InscripcionMembresia.objects.create(
+            cliente=cliente or self.cliente, monto=Decimal(monto), metodo_de_pago=METODO_EFECTIVO
+        )
+        return Membresia.objects.create(
+            inscripcion=inscripcion, plan=self.plan, estado=estado,
+            fecha_inicio=self.hoy + timedelta(days=inicio), fecha_fin=self.hoy + timedelta(days=dias),
+        )
+
+
+class MembershipStatsTests(MembresiaTestMixin, TestCase):
+    """Las señales mantienen el resumen y la serie mensual iguales a un recálculo completo."""
+
+    RESUMEN = ('total_membresias', 'activas', 'vencidas', 'ingresos_totales', 'ingresos_mes_actual')
+
+    def assertConsistente(self):
+        resumen = ResumenMembresias.objects.values(*self.RESUMEN).get(pk=stats.RESUMEN_PK)
+        meses = list(EstadisticaMembresiaMensual.objects.values_list('anio', 'mes', 'inscripciones', 'ingresos'))
+        stats.reconciliar()
+        self.assertEqual(resumen, ResumenMembresias.objects.values(*self.RESUMEN).get(pk=stats.RESUMEN_PK))
+        self.assertEqual(meses, list(EstadisticaMembresiaMensual.objects.values_list(
+            'anio', 'mes', 'inscripciones', 'ingresos'
+        )))
+        return resumen
+
+    def test_deltas_al_crear_editar_y_borrar(self):
+        self._membresia()
+        stats.obtener_resumen()
+        activa = self._membresia(monto='200')
+        vencida = self._membresia(monto='90', dias=-1)
+        self._membresia(monto='120', estado=ESTADO_SUSPENDIDO)
+        resumen = self.assertConsistente()
+        self.assertEqual(
+            (resumen['total_membresias'], resumen['activas'], resumen['vencidas']), (4, 2, 1)
+        )
+        self.assertEqual(resumen['ingresos_totales'], Decimal('560'))
+
+        activa.estado = ESTADO_VENCIDO
+        activa.save()
+        vencida.fecha_fin = self.hoy + timedelta(days=5)
+        vencida.save()
+        inscripcion = activa.inscripcion
+        inscripcion.monto = Decimal('180')
+        inscripcion.save()
+        resumen = self.assertConsistente()
+        self.assertEqual((resumen['activas'], resumen['vencidas']), (2, 1))
+        self.assertEqual(resumen['ingresos_mes_actual'], Decimal('540'))
+
+        # Borrar la inscripción borra la membresía en cascada
+        inscripcion.delete()
+        vencida.delete()
+        resumen = self.assertConsistente()
+        self.assertEqual((resumen['total_membresias'], resumen['activas'], resumen['vencidas']), (2, 1, 0))
+        self.assertEqual(resumen['ingresos_totales'], Decimal('360'))
+
+    def test_resumen_de_otro_dia_se_recalcula(self):
+        self._membresia()
+        stats.obtener_resumen()
+        ResumenMembresias.objects.filter(pk=stats.RESUMEN_PK).update(
+            fecha_corte=self.hoy - timedelta(days=1), activas=99
+        )
+        # Los deltas no tocan un resumen viejo; la lectura lo recalcula
+        self._membresia()
+        resumen = stats.obtener_resumen()
+        self.assertEqual((resumen.fecha_corte, resumen.total_membresias, resumen.activas), (self.hoy, 2, 2))
+
+
+class CheckinTests(MembresiaTestMixin, TestCase):
+    """GET /api/membresias/checkin/?ci=: veredicto y proyección cacheada por CI."""
+
+    def setUp(self):
+        cache.clear()
+
+    def _resultado(self, ci=None):
+        return checkin.checkin(ci or self.cliente.ci)
+
+    def test_veredictos(self):
+        self.assertEqual(self._resultado()['resultado'], checkin.SIN_MEMBRESIA)
+        self.assertIsNone(self._resultado('9999999'))
+
+        casos = [
+            # (estado, inicio, fin, resultado esperado)
+            (ESTADO_ACTIVO, -10, 20, checkin.VIGENTE),
+            (ESTADO_SUSPENDIDO, -10, 20, checkin.SUSPENDIDA),
+            (ESTADO_ACTIVO, 5, 35, checkin.NO_INICIADA),
+            # Vencida por fecha aunque el job nocturno todavía no la marcó
+            (ESTADO_ACTIVO, -40, -1, checkin.VENCIDA),
+            (ESTADO_VENCIDO, -40, -1, checkin.VENCIDA),
+            (ESTADO_CANCELADO, -10, 20, checkin.CANCELADA),
+        ]
+        for i, (estado, inicio, fin, esperado) in enumerate(casos):
+            with self.subTest(estado=estado, inicio=inicio, fin=fin):
+                cliente = Client.objects.create(nombre=f'Cliente{i}', apellido='Rojas', ci=f'{8000000 + i}')
+                membresia = self._membresia(estado=estado, inicio=inicio, dias=fin, cliente=cliente)
+                resultado = self._resultado(cliente.ci)
+                self.assertEqual(resultado['resultado'], esperado)
+                self.assertEqual(resultado['acceso'], esperado == checkin.VIGENTE)
+                self.assertEqual(resultado['membresia']['id'], membresia.pk)
+
+    def test_vigente_por_vencer(self):
+        self._membresia(dias=3)
+        resultado = self._resultado()
+        self.assertTrue(resultado['por_vencer'])
+        self.assertEqual(resultado['membresia']['dias_restantes'], 3)
+        # La vigente gana sobre una suspendida del mismo período
+        self._membresia(estado=ESTADO_SUSPENDIDO, dias=30)
+        cache.clear()
+        self.assertEqual(self._resultado()['resultado'], checkin.VIGENTE)
+
+    def test_cache_se_invalida_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            membresia = self._membresia()
+        self.assertEqual(self._resultado()['resultado'], checkin.VIGENTE)
+        with self.assertNumQueries(0):
+            self.assertEqual(self._resultado()['resultado'], checkin.VIGENTE)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            membresia.estado = ESTADO_SUSPENDIDO
+            membresia.save()
+        # Antes del commit se sigue viendo la proyección anterior
+        self.assertEqual(self._resultado()['resultado'], checkin.VIGENTE)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._resultado()['resultado'], checkin.SUSPENDIDA)
+
+        # Cambiar el CI del cliente borra también la proyección del CI anterior
+        ci_anterior = self.cliente.ci
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cliente.ci = '7654321'
+            self.cliente.save()
+        self.assertIsNone(self._resultado(ci_anterior))
+        self.assertEqual(self._resultado('7654321')['resultado'], checkin.SUSPENDIDA)
+
+    def test_endpoint(self):
+        self._membresia()
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser(username='admin', email='admin@gym.com'))
+        response = client.get('/api/membresias/checkin/', {'ci': self.cliente.ci})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['resultado'], checkin.VIGENTE)
+        self.assertEqual(client.get('/api/membresias/checkin/', {'ci': '9999999'}).status_code, 404)
+
+
+class ExpireMembershipsTests(MembresiaTestMixin, TestCase):
+    """manage.py expire_memberships: solo las activas o suspendidas con fecha_fin pasada."""
+
+    def _estados(self):
+        return dict(Membresia.objects.values_list('pk', 'estado'))
+
+    def _correr(self, *args):
+        salida = StringIO()
+        call_command('expire_memberships', *args, stdout=salida)
+        return salida.getvalue()
+
+    def test_vence_solo_las_pendientes(self):
+        activa_pasada = self._membresia(dias=-1)
+        suspendida_pasada = self._membresia(estado=ESTADO_SUSPENDIDO, dias=-5)
+        vence_hoy = self._membresia(dias=0)
+        vigente = self._membresia(dias=10)
+        cancelada = self._membresia(estado=ESTADO_CANCELADO, dias=-3)
+        inactiva = self._membresia(estado=ESTADO_INACTIVO, dias=-3)
+        antes = self._estados()
+        # Antes de la corrida el dashboard ya cuenta como vencidas solo las que el job marcará
+        resumen = stats.obtener_resumen()
+        self.assertEqual((resumen.activas, resumen.vencidas), (2, 2))
+
+        self.assertIn('2 membresías por vencer', self._correr('--dry-run'))
+        self.assertEqual(self._estados(), antes)
+
+        self._correr('--batch-size', '1')
+        estados = self._estados()
+        self.assertEqual(estados[activa_pasada.pk], ESTADO_VENCIDO)
+        self.assertEqual(estados[suspendida_pasada.pk], ESTADO_VENCIDO)
+        for membresia in (vence_hoy, vigente, cancelada, inactiva):
+            self.assertEqual(estados[membresia.pk], antes[membresia.pk])
+
+        entrada = HistorialActividad.objects.get(accion='VENCER_MEMBRESIAS')
+        self.assertEqual(entrada.datos_adicionales['por_estado'], {ESTADO_ACTIVO: 1, ESTADO_SUSPENDIDO: 1})
+        self.assertEqual(entrada.datos_adicionales['lotes'], 2)
+        resumen = ResumenMembresias.objects.get(pk=stats.RESUMEN_PK)
+        self.assertEqual((resumen.activas, resumen.vencidas), (2, 2))
+
+    def test_idempotente_y_con_fecha_de_corte(self):
+        membresia = self._membresia(dias=3)
+        self.assertIn('No hay membresías', self._correr())
+        self._correr('--fecha', (self.hoy + timedelta(days=4)).isoformat())
+        self.assertEqual(Membresia.objects.get(pk=membresia.pk).estado, ESTADO_VENCIDO)
+
+        self.assertIn('No hay membresías', self._correr('--fecha', (self.hoy + timedelta(days=4)).isoformat()))
+        self.assertEqual(HistorialActividad.objects.filter(accion='VENCER_MEMBRESIAS').count(), 1)
 
-# Create your tests here.
+    def test_argumentos_invalidos(self):
+        with self.assertRaises(CommandError):
+            self._correr('--fecha', 'mañana')
+        with self.assertRaises(CommandError):
+            self._correr('--batch-size', '0')
@@ -0,0 +1,111 @@
+"""
+Vencimiento masivo de membresías
+
+Las membresías activas (o suspendidas) cuya fecha_fin ya pasó se pasan a
+"vencido" con UPDATE por lotes de ids. Cada lote se confirma por separado:
+si el proceso se corta, volver a correrlo sigue desde donde quedó, y como
+el filtro es el mismo (estado vencible y fecha_fin < hoy) correrlo dos veces
+no cambia nada. Al final se deja UN registro en la bitácora con el total y
+se recalcula el resumen de estadísticas (update() no dispara señales).
+
+Después de correrlo, `estado` alcanza para filtrar (?estado=activo /
+?estado=vencido) sin volver a comparar fechas. Las estadísticas y el
+check-in sí comparan fecha_fin, pero solo de las filas que este proceso
+todavía no tocó (entre medianoche y la corrida, o una membresía cargada
+hoy con fecha pasada): `q_vencidas` / `esta_vencida` cuentan como vencido
+exactamente lo que el proceso marcaría.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.core.constants import ESTADO_ACTIVO, ESTADO_SUSPENDIDO, ESTADO_VENCIDO
+from .models import Membresia
+
+ESTADOS_VENCIBLES = (ESTADO_ACTIVO, ESTADO_SUSPENDIDO)
+BATCH_SIZE = 1000
+
+
+def q_pendientes(hoy):
+    return Q(estado__in=ESTADOS_VENCIBLES, fecha_fin__lt=hoy)
+
+
+def q_vencidas(hoy):
+    """Vencidas: ya marcadas, o pendientes de la próxima corrida."""
+    return Q(estado=ESTADO_VENCIDO) | q_pendientes(hoy)
+
+
+def esta_vencida(estado, fecha_fin, hoy):
+    """Lo mismo que q_vencidas, en memoria."""
+    return estado == ESTADO_VENCIDO or (
+        estado in ESTADOS_VENCIBLES and fecha_fin is not None and fecha_fin < hoy
+    )
+
+
+def pendientes(hoy):
+    """Membresías que ya deberían figurar como vencidas."""
+    return Membresia.objects.filter(q_pendientes(hoy))
+
+
+def vencer_membresias(hoy=None, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Marca como vencidas las membresías pendientes.
+
+    Returns:
+        dict: {"total": int, "por_estado": {estado_anterior: cantidad}, "lotes": int}
+    """
+    hoy = hoy or timezone.localdate()
+    por_estado = {}
+    lotes = 0
+
+    if dry_run:
+        for estado in ESTADOS_VENCIBLES:
+            cantidad = pendientes(hoy).filter(estado=estado).count()
+            if cantidad:
+                por_estado[estado] = cantidad
+        return {"total": sum(por_estado.values()), "por_estado": por_estado, "lotes": 0}
+
+    ahora = timezone.now()
+    ultimo_id = 0
+    while True:
+        # Recorre por id (sin OFFSET): cada lote se confirma por separado
+        filas = list(
+            pendientes(hoy).filter(pk__gt=ultimo_id).order_by('pk')
+            .values_list('pk', 'estado')[:batch_size]
+        )
+        if not filas:
+            break
+        ultimo_id = filas[-1][0]
+        with transaction.atomic():
+            for estado in ESTADOS_VENCIBLES:
+                ids = [pk for pk, anterior in filas if anterior == estado]
+                if not ids:
+                    continue
+                # Se repite el filtro: si otra escritura cambió la fila, no se pisa
+                cantidad = pendientes(hoy).filter(pk__in=ids, estado=estado).update(
+                    estado=ESTADO_VENCIDO, updated_at=ahora
+                )
+                if cantidad:
+                    por_estado[estado] = por_estado.get(estado, 0) + cantidad
+        lotes += 1
+
+    total = sum(por_estado.values())
+    if total:
+        from . import stats
+        stats.recalcular_resumen(hoy)
+
+        from apps.audit.models import HistorialActividad
+        HistorialActividad.log_activity(
+            request=None,
+            tipo_accion="update",
+            accion="VENCER_MEMBRESIAS",
+            descripcion=f"Se marcaron {total} membresías como vencidas (fecha_fin anterior a {hoy.isoformat()})",
+            datos_adicionales={
+                "modulo": "MEMBRESÍAS",
+                "total": total,
+                "por_estado": por_estado,
+                "fecha_corte": hoy.isoformat(),
+                "lotes": lotes,
+            },
+        )
+    return {"total": total, "por_estado": por_estado, "lotes": lotes}
@@ -1,18 +1,17 @@
-from rest_framework import status, permissions
+from rest_framework import serializers, status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q, Count, Sum
-from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
-from datetime import date
+from django.db.models import Q
+from drf_spectacular.utils import extend_schema, inline_serializer, OpenApiParameter, OpenApiExample
 
 from apps.core.constants import (
     METODO_EFECTIVO, 
     METODOS_PAGO, 
     ESTADOS_MEMBRESIA,
-    ESTADO_ACTIVO,
-    ESTADO_VENCIDO
+    ESTADO_ACTIVO
 )
+from . import checkin, stats
 from .models import Membresia, InscripcionMembresia, PlanMembresia
 from .serializers import (
     MembresiaSerializer,
@@ -23,6 +22,7 @@ from .serializers import (
     MembresiaEstadoVigenciaSerializer
 )
 from apps.audit.helpers import registrar_bitacora
+from apps.core.pagination import KeysetPagination, is_cursor_request
 
 
 class MembresiaPagination(PageNumberPagination):
@@ -31,12 +31,18 @@ class MembresiaPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class MembresiaCursorPagination(KeysetPagination):
+    page_size = 10
+    ordering = ('-fecha_inicio', '-id')
+
+
 @extend_schema(
     tags=["Membresías"],
     parameters=[
         OpenApiParameter(name='search', description='Buscar por nombre o CI del cliente', required=False, type=str),
         OpenApiParameter(name='estado', description='Filtrar por estado', required=False, type=str),
         OpenApiParameter(name='page', description='Número de página', required=False, type=int),
+        OpenApiParameter(name='cursor', description='Paginación por cursor (vacío = primera página, sin total)', required=False, type=str),
     ],
     responses={200: MembresiaListSerializer(many=True)}
 )
@@ -54,7 +60,8 @@ class MembresiaListCreateView(APIView):
         
         queryset = Membresia.objects.select_related(
             'inscripcion__cliente',
-            'usuario_registro'
+            'usuario_registro',
+            'plan'
         ).all()
         
         # Aplicar búsqueda por nombre o CI del cliente
@@ -70,7 +77,7 @@ class MembresiaListCreateView(APIView):
             queryset = queryset.filter(estado=estado_filter)
         
         # Paginación
-        paginator = MembresiaPagination()
+        paginator = MembresiaCursorPagination() if is_cursor_request(request) else MembresiaPagination()
         page = paginator.paginate_queryset(queryset, request)
         
         if page is not None:
@@ -233,52 +240,45 @@ class MembresiaDetailView(APIView):
 
 @extend_schema(
     tags=["Membresías"],
+    parameters=[
+        OpenApiParameter(name='meses', description='Incluye la serie mensual de los últimos N meses (máx. 60)', required=False, type=int),
+    ],
     responses={200: dict}
 )
 class MembresiaStatsView(APIView):
     """
     GET: Obtiene estadísticas de membresías
+
+    Lee el resumen precalculado (apps.membresias.stats): una fila en lugar
+    de agregar todas las membresías y pagos en cada carga del dashboard.
     """
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
         """Obtener estadísticas de membresías"""
-        # Total de membresías
-        total = Membresia.objects.count()
-        
-        # Membresías activas
-        activas = Membresia.objects.filter(
-            estado=ESTADO_ACTIVO,
-            fecha_fin__gte=date.today()
-        ).count()
-        
-        # Membresías vencidas
-        vencidas = Membresia.objects.filter(
-            Q(estado=ESTADO_VENCIDO) | Q(fecha_fin__lt=date.today())
-        ).count()
-        
-        # Ingresos totales
-        ingresos = InscripcionMembresia.objects.aggregate(
-            total=Sum('monto')
-        )['total'] or 0
-        
-        # Ingresos del mes actual
-        from datetime import datetime
-        mes_actual = datetime.now().month
-        año_actual = datetime.now().year
-        
-        ingresos_mes = InscripcionMembresia.objects.filter(
-            created_at__month=mes_actual,
-            created_at__year=año_actual
-        ).aggregate(total=Sum('monto'))['total'] or 0
-        
-        return Response({
-            "total_membresias": total,
-            "activas": activas,
-            "vencidas": vencidas,
-            "ingresos_totales": float(ingresos),
-            "ingresos_mes_actual": float(ingresos_mes)
-        })
+        resumen = stats.obtener_resumen()
+        
+        data = {
+            "total_membresias": resumen.total_membresias,
+            "activas": resumen.activas,
+            "vencidas": resumen.vencidas,
+            "ingresos_totales": float(resumen.ingresos_totales),
+            "ingresos_mes_actual": float(resumen.ingresos_mes_actual)
+        }
+        
+        # Serie histórica opcional (?meses=12)
+        meses = request.query_params.get('meses')
+        if meses:
+            try:
+                meses = max(1, min(int(meses), 60))
+            except ValueError:
+                return Response(
+                    {"error": "El parámetro 'meses' debe ser un número entero"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            data["serie_mensual"] = stats.serie_mensual(meses)
+        
+        return Response(data)
 
 
 @extend_schema(
@@ -425,4 +425,99 @@ class ConsultarEstadoVigenciaView(APIView):
             # No fallar la consulta si falla el registro de auditoría
             print(f"Error al registrar auditoría: {audit_error}")
         
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    tags=["Membresías"],
+    parameters=[
+        OpenApiParameter(name='ci', description='Cédula de identidad del cliente', required=True, type=str),
+    ],
+    responses={
+        200: inline_serializer(
+            name='CheckIn',
+            fields={
+                'cliente': inline_serializer(
+                    name='CheckInCliente',
+                    fields={
+                        'id': serializers.IntegerField(),
+                        'nombre_completo': serializers.CharField(),
+                        'ci': serializers.CharField(),
+                    },
+                ),
+                'acceso': serializers.BooleanField(),
+                'resultado': serializers.ChoiceField(choices=[
+                    checkin.VIGENTE, checkin.SUSPENDIDA, checkin.NO_INICIADA, checkin.VENCIDA,
+                    checkin.CANCELADA, checkin.INACTIVA, checkin.SIN_MEMBRESIA,
+                ]),
+                'mensaje': serializers.CharField(),
+                'por_vencer': serializers.BooleanField(required=False, help_text='Solo si está vigente'),
+                'membresia': inline_serializer(
+                    name='CheckInMembresia',
+                    fields={
+                        'id': serializers.IntegerField(),
+                        'plan': serializers.CharField(),
+                        'estado': serializers.CharField(),
+                        'fecha_inicio': serializers.DateField(),
+                        'fecha_fin': serializers.DateField(),
+                        'dias_restantes': serializers.IntegerField(),
+                    },
+                    allow_null=True,
+                ),
+            },
+        ),
+        400: inline_serializer(name='CheckInSinCI', fields={'error': serializers.CharField()}),
+        404: inline_serializer(
+            name='CheckInNoEncontrado',
+            fields={'error': serializers.CharField(), 'detail': serializers.CharField()},
+        ),
+    },
+)
+class CheckInView(APIView):
+    """
+    Check-in en recepción por CI.
+
+    Responde si el cliente puede ingresar (vigente / vence en N días /
+    suspendida / vencida ...) a partir de una proyección en caché de sus
+    membresías (apps.membresias.checkin): con la caché caliente no consulta
+    la base de datos. La bitácora se escribe en diferido.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        ci = request.query_params.get('ci', '').strip()
+        if not ci:
+            return Response(
+                {"error": "Debe proporcionar 'ci'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        resultado = checkin.checkin(ci)
+        if resultado is None:
+            return Response(
+                {
+                    "error": "Cliente no encontrado",
+                    "detail": f"No existe un cliente con CI {ci}"
+                },
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        membresia = resultado["membresia"]
+        # Auditoría: se encola en el escritor asíncrono de la bitácora
+        registrar_bitacora(
+            request=request,
+            usuario=request.user,
+            modulo="MEMBRESÍAS",
+            tipo_accion="view",
+            accion="Check-in",
+            descripcion=f"Check-in de {resultado['cliente']['nombre_completo']} (CI: {resultado['cliente']['ci']}): {resultado['mensaje']}",
+            nivel="info" if resultado["acceso"] else "warning",
+            datos_adicionales={
+                "cliente_id": resultado["cliente"]["id"],
+                "membresia_id": membresia["id"] if membresia else None,
+                "resultado": resultado["resultado"],
+                "acceso": resultado["acceso"],
+            },
+        )
+
+        return Response(resultado, status=status.HTTP_200_OK)
@@ -5,3 +5,6 @@ class RolesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.roles'
     verbose_name = 'Roles y Permisos'
+
+    def ready(self):
+        from . import signals  # noqa: F401
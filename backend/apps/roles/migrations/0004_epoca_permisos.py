@@ -0,0 +1,26 @@
+# Generated by Django 5.0 on 2026-10-17 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles', '0003_add_codigo_to_permiso'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EpocaPermisos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor', models.PositiveBigIntegerField(default=0, verbose_name='Época')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Última actualización')),
+            ],
+            options={
+                'verbose_name': 'Época de Permisos',
+                'verbose_name_plural': 'Época de Permisos',
+                'db_table': 'epoca_permisos',
+            },
+        ),
+    ]
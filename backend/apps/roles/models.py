@@ -103,3 +103,21 @@ class RolPermiso(TimeStampedModel):
     def __str__(self):
         return f"{self.rol} - {self.permiso}"
 
+
+
+class EpocaPermisos(models.Model):
+    """
+    Contador global ("época") de cambios en roles/permisos.
+    Fila única (pk=1). Los tokens JWT llevan la época con la que se emitieron;
+    si la época actual es mayor, el token quedó obsoleto y debe renovarse.
+    """
+    valor = models.PositiveBigIntegerField(default=0, verbose_name="Época")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Última actualización")
+
+    class Meta:
+        db_table = 'epoca_permisos'
+        verbose_name = "Época de Permisos"
+        verbose_name_plural = "Época de Permisos"
+
+    def __str__(self):
+        return f"Época {self.valor}"
@@ -48,6 +48,9 @@ class RolSerializer(serializers.ModelSerializer):
         return PermisoSerializer(obj.permisos.all(), many=True).data
 
     def get_usuarios_count(self, obj):
+        # El listado lo trae anotado (RoleListCreateView.queryset)
+        if hasattr(obj, "num_usuarios"):
+            return obj.num_usuarios
         return UserRole.objects.filter(rol=obj).count()
     
     def create(self, validated_data):
@@ -0,0 +1,71 @@
+"""
+Signals de Roles y Permisos.
+Mantienen coherentes el caché de permisos y la vigencia de los tokens JWT
+(ver apps.core.permissions): cada cambio vence solo los tokens de los
+usuarios afectados, una vez por transacción.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core.permissions import schedule_permission_invalidation
+from apps.users.models import User
+from .models import Permiso, Role, RolPermiso, UserRole
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def invalidar_permisos_usuario(sender, instance, **kwargs):
+    """Asignar/remover un rol cambia los permisos de ese usuario."""
+    schedule_permission_invalidation(user_ids=[instance.usuario_id])
+
+
+@receiver(post_save, sender=RolPermiso)
+@receiver(post_delete, sender=RolPermiso)
+def invalidar_permisos_rol(sender, instance, **kwargs):
+    """Cambiar los permisos de un rol afecta a los usuarios que lo tienen."""
+    schedule_permission_invalidation(role_ids=[instance.rol_id])
+
+
+@receiver(post_save, sender=Role)
+def invalidar_permisos_rol_editado(sender, instance, created, **kwargs):
+    """El nombre del rol viaja en los tokens. Al eliminarlo, se encargan los UserRole en cascada."""
+    if not created:
+        schedule_permission_invalidation(role_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Permiso)
+def invalidar_permisos_global(sender, instance, created, **kwargs):
+    """
+    Editar un permiso (su código) puede afectar a cualquier usuario. Uno
+    nuevo todavía no lo tiene nadie; al eliminarlo se encargan los
+    RolPermiso en cascada.
+    """
+    if not created:
+        schedule_permission_invalidation(everyone=True)
+
+
+# rol.permisos.add() / user.roles.add() insertan las filas intermedias con
+# bulk_create: no hay post_save, solo m2m_changed.
+
+@receiver(m2m_changed, sender=Role.permisos.through)
+def invalidar_permisos_m2m_rol(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        schedule_permission_invalidation(role_ids=[instance.pk])
+    elif pk_set:
+        schedule_permission_invalidation(role_ids=pk_set)
+    elif action == 'post_clear':
+        schedule_permission_invalidation(everyone=True)
+
+
+@receiver(m2m_changed, sender=User.roles.through)
+def invalidar_permisos_m2m_usuario(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        schedule_permission_invalidation(user_ids=[instance.pk])
+    elif pk_set:
+        schedule_permission_invalidation(user_ids=pk_set)
+    elif action == 'post_clear':
+        schedule_permission_invalidation(everyone=True)
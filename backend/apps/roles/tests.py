@@ -1,3 +1,159 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apps.core import permissions
+from apps.users.models import User
+from apps.users.tokens import tokens_for_user
+from .models import EpocaPermisos, Permiso, Role, UserRole
+
+
+class PermissionCacheTests(TestCase):
+    """Permisos cacheados por proceso frente a cambios hechos por otro worker."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.permiso = Permiso.objects.create(codigo='client.view', nombre='Ver clientes')
+        cls.rol = Role.objects.create(nombre='Recepción')
+        cls.rol.permisos.add(cls.permiso)
+        cls.user = User.objects.create_user(username='recepcion', email='recepcion@gym.com')
+        UserRole.objects.create(usuario=cls.user, rol=cls.rol)
+
+    def setUp(self):
+        cache.clear()
+
+    def _cambio_en_otro_worker(self):
+        """Cambia el permiso sin señales ni caché local, como lo vería otro proceso."""
+        Permiso.objects.filter(pk=self.permiso.pk).update(codigo='client.edit')
+        EpocaPermisos.objects.filter(pk=1).update(valor=F('valor') + 1)
+
+    def test_claims_con_la_epoca_de_la_bd(self):
+        self.assertEqual(permissions.get_user_permission_codes(self.user), {'client.view'})
+        self._cambio_en_otro_worker()
+
+        claims = permissions.get_permission_claims(self.user)
+        self.assertEqual(claims[permissions.PERMISSIONS_CLAIM], ['client.edit'])
+        self.assertEqual(claims[permissions.PERMISSION_EPOCH_CLAIM], EpocaPermisos.objects.get(pk=1).valor)
+
+    def test_cache_expira_con_la_epoca(self):
+        self.assertEqual(permissions.get_user_permission_codes(self.user), {'client.view'})
+        self._cambio_en_otro_worker()
+        # Vence la copia local de la época (PERMISSION_EPOCH_CACHE_TIMEOUT)
+        cache.delete(permissions.PERMISSION_EPOCH_CACHE_KEY)
+        self.assertEqual(permissions.get_user_permission_codes(self.user), {'client.edit'})
+
+
+class PermissionVersionTests(TestCase):
+    """Un cambio de roles vence solo los tokens de los usuarios afectados, una vez por transacción."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', email='admin@gym.com', password='Admin1234!')
+        cls.permisos = [
+            Permiso.objects.create(codigo=f'client.p{i}', nombre=f'Permiso {i}') for i in range(3)
+        ]
+        cls.rol = Role.objects.create(nombre='Recepción')
+        cls.otro_rol = Role.objects.create(nombre='Instructor')
+        cls.ana = User.objects.create_user(username='ana', email='ana@gym.com')
+        cls.beto = User.objects.create_user(username='beto', email='beto@gym.com')
+        with cls.captureOnCommitCallbacks(execute=True):
+            UserRole.objects.create(usuario=cls.ana, rol=cls.rol)
+
+    def setUp(self):
+        cache.clear()
+
+    def _cliente(self, user):
+        client = APIClient()
+        refresh, access = tokens_for_user(User.objects.get(pk=user.pk))
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return client, refresh
+
+    def _version(self, user):
+        return User.objects.get(pk=user.pk).permisos_version
+
+    def test_asignar_rol_no_vence_tokens_ajenos(self):
+        ana, _ = self._cliente(self.ana)
+        beto, refresh = self._cliente(self.beto)
+        with self.captureOnCommitCallbacks(execute=True):
+            UserRole.objects.create(usuario=self.beto, rol=self.otro_rol)
+
+        self.assertEqual(ana.get('/api/users/me/').status_code, 200)
+        response = beto.get('/api/users/me/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'permissions_stale')
+
+        # El refresh emite un token con la versión nueva
+        response = APIClient().post('/api/token/refresh/', {'refresh': str(refresh)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        beto.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        me = beto.get('/api/users/me/')
+        self.assertEqual(me.status_code, 200)
+        self.assertEqual([r['nombre'] for r in me.data['roles']], ['Instructor'])
+
+    def test_set_de_permisos_incrementa_una_vez(self):
+        client, _ = self._cliente(self.admin)
+        antes = {u.pk: self._version(u) for u in (self.ana, self.beto)}
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = client.put(
+                f'/api/roles/{self.rol.pk}/permissions/',
+                {'permisos': [p.pk for p in self.permisos]}, format='json',
+            )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self._version(self.ana), antes[self.ana.pk] + 1)
+        self.assertEqual(self._version(self.beto), antes[self.beto.pk])
+        self.assertEqual(
+            permissions.get_user_permission_codes(User.objects.get(pk=self.ana.pk)),
+            {p.codigo for p in self.permisos},
+        )
+
+    def test_savepoint_deshecho_no_pierde_la_invalidacion(self):
+        antes = self._version(self.ana)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(IntegrityError):
+                with transaction.atomic():
+                    self.rol.permisos.add(self.permisos[0])
+                    raise IntegrityError('falla')
+            # Django descartó el callback del savepoint: se registra uno nuevo
+            self.rol.permisos.add(self.permisos[1])
+            self.rol.permisos.add(self.permisos[2])
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self._version(self.ana), antes + 1)
+
+    def test_save_de_instancia_vieja_no_pisa_la_version(self):
+        vieja = User.objects.get(pk=self.ana.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rol.permisos.add(self.permisos[0])
+        vieja.first_name = 'Ana'
+        vieja.save()
+        self.assertEqual(self._version(self.ana), vieja.permisos_version + 1)
+
+    def test_update_fields_explicito_se_respeta(self):
+        vieja = User.objects.get(pk=self.ana.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rol.permisos.add(self.permisos[0])
+        version = self._version(self.ana)
+
+        vieja.first_name = 'Ana'
+        vieja.last_name = 'sin guardar'
+        with self.assertNumQueries(1):
+            vieja.save(update_fields=['first_name'])
+        guardada = User.objects.get(pk=self.ana.pk)
+        self.assertEqual((guardada.first_name, guardada.last_name), ('Ana', ''))
+        self.assertEqual(guardada.permisos_version, version)
+
+        # Pedirlo explícitamente sí escribe permisos_version
+        vieja.permisos_version = 0
+        vieja.save(update_fields=['permisos_version'])
+        self.assertEqual(self._version(self.ana), 0)
+
+    def test_save_de_instancia_diferida(self):
+        parcial = User.objects.only('id', 'first_name').get(pk=self.ana.pk)
+        parcial.first_name = 'Ana'
+        # Sin leer los campos diferidos y sin pisarlos
+        with self.assertNumQueries(1):
+            parcial.save()
+        guardada = User.objects.get(pk=self.ana.pk)
+        self.assertEqual((guardada.first_name, guardada.email), ('Ana', 'ana@gym.com'))
@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count
 from rest_framework import generics, permissions, status, serializers
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -7,7 +9,7 @@ from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiResponse
 from apps.roles.models import Role, Permiso, UserRole, RolPermiso
 from apps.roles.serializers import RolSerializer, PermisoSerializer, RolePermissionSerializer, RolePermissionSetSerializer
 from apps.audit.models import HistorialActividad as Bitacora
-from apps.core.permissions import HasPermission, PermissionCodes
+from apps.core.permissions import HasPermission, PermissionCodes, user_has_any_role
 
 User = get_user_model()
 # ----- Permiso: solo Superusuario (Dueño) o superuser de Django -----
@@ -21,8 +23,8 @@ class HasRoleSuperUser(permissions.BasePermission):
             return False
         if getattr(u, "is_superuser", False):
             return True
-        # UserRole.related_name="roles" en tu modelo; filtra por nombre del rol
-        return UserRole.objects.filter(usuario=u, rol__nombre__in=self.allowed_role_names).exists()
+        # Roles resueltos desde el caché de permisos (sin consulta extra)
+        return user_has_any_role(u, self.allowed_role_names, request=request)
 
 
 # ----- Utils para auditoría -----
@@ -45,7 +47,11 @@ class RoleListCreateView(generics.ListCreateAPIView):
     GET  /api/roles/        -> Lista roles
     POST /api/roles/        -> Crea rol
     """
-    queryset = Role.objects.all().order_by("-created_at")
+    queryset = (
+        Role.objects.prefetch_related("permisos")
+        .annotate(num_usuarios=Count("userrole"))
+        .order_by("-created_at")
+    )
     serializer_class = RolSerializer
     permission_classes = [HasPermission]
     required_permission = PermissionCodes.ROLE_VIEW
@@ -248,9 +254,7 @@ class HasRoleSuperUser(permissions.BasePermission):
         if getattr(u, "is_superuser", False):
             return True
         # Verifica si el usuario tiene uno de los roles permitidos
-        return UserRole.objects.filter(
-            usuario=u, rol__nombre__in=self.allowed_role_names
-        ).exists()
+        return user_has_any_role(u, self.allowed_role_names, request=request)
 
 # ---------- helpers ----------
 def _ip(request):
@@ -413,13 +417,15 @@ class RolePermissionSetView(APIView):
         nuevos = set(s.validated_data["permisos"])
         actuales = set(RolPermiso.objects.filter(rol=rol).values_list("permiso_id", flat=True))
 
-        # eliminar los que sobran
-        RolPermiso.objects.filter(rol=rol, permiso_id__in=(actuales - nuevos)).delete()
-        # agregar los nuevos
-        for pid in (nuevos - actuales):
-            perm = Permiso.objects.filter(id=pid).first()
-            if perm:
-                RolPermiso.objects.get_or_create(rol=rol, permiso=perm)
+        # una transacción: los tokens de los usuarios del rol se vencen una sola vez
+        with transaction.atomic():
+            # eliminar los que sobran
+            RolPermiso.objects.filter(rol=rol, permiso_id__in=(actuales - nuevos)).delete()
+            # agregar los nuevos
+            for pid in (nuevos - actuales):
+                perm = Permiso.objects.filter(id=pid).first()
+                if perm:
+                    RolPermiso.objects.get_or_create(rol=rol, permiso=perm)
 
         Bitacora.log_activity(
                 request=request,
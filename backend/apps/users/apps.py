@@ -6,3 +6,7 @@ class UsersConfig(AppConfig):
     name = 'apps.users'
     verbose_name = 'Usuarios'
     verbose_name = 'Usuarios'
+
+    def ready(self):
+        # Registra el esquema de autenticación JWT en el OpenAPI
+        from . import schema  # noqa: F401
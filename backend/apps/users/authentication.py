@@ -0,0 +1,46 @@
+"""
+Autenticación JWT con control de época y versión de permisos.
+"""
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from apps.core.permissions import (
+    PERMISSION_EPOCH_CLAIM, PERMISSION_VERSION_CLAIM, get_permission_epoch
+)
+
+
+def _permisos_vencidos():
+    return InvalidToken({
+        "detail": "Los permisos cambiaron. Renueva el token.",
+        "code": "permissions_stale",
+    })
+
+
+class PermissionEpochJWTAuthentication(JWTAuthentication):
+    """
+    Igual que JWTAuthentication, pero rechaza los access tokens emitidos antes
+    del último cambio de permisos que afecta al usuario:
+      - claim "perm_epoch" menor a la época global (cambios en el catálogo), o
+      - claim "perm_version" menor a User.permisos_version (cambios en sus
+        roles); se compara con el usuario que ya se carga, sin consultas extra.
+    Los tokens sin los claims (emitidos antes de esta funcionalidad) se
+    aceptan y sus permisos se resuelven desde el caché/BD.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+
+        epoch = validated_token.get(PERMISSION_EPOCH_CLAIM)
+        if epoch is not None and epoch < get_permission_epoch():
+            raise _permisos_vencidos()
+
+        return validated_token
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+
+        version = validated_token.get(PERMISSION_VERSION_CLAIM)
+        if version is not None and version < user.permisos_version:
+            raise _permisos_vencidos()
+
+        return user
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-17 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='permisos_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Versión de permisos'),
+        ),
+    ]
@@ -30,6 +30,13 @@ class User(AbstractUser, TimeStampedModel):
         related_name='users',
         verbose_name="Roles"
     )
+    # Versión de sus permisos: la incrementan los cambios en sus roles (ver
+    # apps.core.permissions) y vence sus access tokens, no los de los demás
+    permisos_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Versión de permisos"
+    )
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
@@ -42,6 +49,21 @@ class User(AbstractUser, TimeStampedModel):
     
     def __str__(self):
         return f"{self.get_full_name()} ({self.email})"
+
+    def save(self, *args, **kwargs):
+        # permisos_version solo cambia con UPDATE atómicos (F): una instancia
+        # cargada antes del cambio no debe pisarla al guardarse. Solo se toca
+        # el save() sin update_fields; uno explícito se respeta tal cual.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            # Como hace Django con .only()/.defer(): los campos diferidos no se escriben
+            diferidos = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'permisos_version' and f.attname not in diferidos
+            ]
+        super().save(*args, **kwargs)
+
+
 class PasswordResetToken(models.Model):
     """
     Token de recuperación de contraseña por email.
@@ -0,0 +1,10 @@
+"""
+Extensiones de drf-spectacular para la autenticación de apps.users.
+"""
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class PermissionEpochJWTScheme(SimpleJWTScheme):
+    """El mismo esquema "jwtAuth" (Bearer) de simplejwt para la subclase con época de permisos."""
+
+    target_class = 'apps.users.authentication.PermissionEpochJWTAuthentication'
@@ -2,6 +2,9 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 
 User = get_user_model()
 # --- CU1: Registrar Administrador -------------------------------------------
@@ -53,6 +56,38 @@ class LogoutSerializer(serializers.Serializer):
     def save(self, **kwargs):
         # invalidar refresh (requiere app 'token_blacklist' habilitada)
         RefreshToken(self.token).blacklist()
+
+
+class PermissionTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh de simplejwt que vuelve a calcular los claims de permisos
+    (ver apps.users.tokens) en lugar de copiar los del token anterior.
+    """
+
+    def validate(self, attrs):
+        from .tokens import build_access_token
+
+        refresh = self.token_class(attrs["refresh"])
+
+        user = User.objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}
+        ).first()
+        if not user or not user.is_active:
+            raise InvalidToken("Usuario inexistente o inactivo.")
+
+        data = {"access": str(build_access_token(refresh, user))}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+
+            data["refresh"] = str(refresh)
+
+        return data
 # --- /CU2 --------------------------------------------------------------------
 class PasswordResetRequestSerializer(serializers.Serializer):
     email = serializers.EmailField()
@@ -69,6 +104,27 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
         return value
 # --- /Password Reset ---------------------------------------------------------
 
+# --- Roles precargados ---------------------------------------------------------
+def roles_prefetch():
+    """Prefetch de los roles de cada usuario (una consulta para toda la página)."""
+    from django.db.models import Prefetch
+    from apps.roles.models import UserRole
+    return Prefetch('userrole_set', queryset=UserRole.objects.select_related('rol'))
+
+
+def with_roles(queryset):
+    """Queryset de usuarios con sus roles precargados para los serializers."""
+    return queryset.prefetch_related(roles_prefetch())
+
+
+def _user_roles(obj):
+    """Roles del usuario: usa el prefetch si existe; si no, una consulta."""
+    if 'userrole_set' in getattr(obj, '_prefetched_objects_cache', {}):
+        return obj.userrole_set.all()
+    from apps.roles.models import UserRole
+    return UserRole.objects.filter(usuario=obj).select_related('rol')
+
+
 # Serializer para obtener datos del usuario actual
 class UserSerializer(serializers.ModelSerializer):
     roles = serializers.SerializerMethodField()
@@ -79,9 +135,7 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "username", "email"]
     
     def get_roles(self, obj):
-        from apps.roles.models import UserRole
-        user_roles = UserRole.objects.filter(usuario=obj).select_related('rol')
-        return [ur.rol.nombre for ur in user_roles]
+        return [ur.rol.nombre for ur in _user_roles(obj)]
 
 
 # --- CRUD Usuarios -----------------------------------------------------------
@@ -96,9 +150,7 @@ class UserListSerializer(serializers.ModelSerializer):
                   "is_active", "is_staff", "is_superuser", "date_joined", "roles"]
     
     def get_roles(self, obj):
-        from apps.roles.models import UserRole
-        user_roles = UserRole.objects.filter(usuario=obj).select_related('rol')
-        return [{"id": ur.rol.id, "nombre": ur.rol.nombre} for ur in user_roles]
+        return [{"id": ur.rol.id, "nombre": ur.rol.nombre} for ur in _user_roles(obj)]
     
     def get_full_name(self, obj):
         return f"{obj.first_name} {obj.last_name}".strip() or obj.username
@@ -1,3 +1,66 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apps.roles.models import Role, UserRole
+from .models import User
+
+
+class UserListQueryCountTests(TestCase):
+    """
+    Los roles se precargan (Prefetch de userrole_set): listar usuarios cuesta
+    la misma cantidad de consultas sin importar el tamaño de la página.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', email='admin@gym.com', password='x')
+        roles = [Role.objects.create(nombre=f'Rol {i}') for i in range(3)]
+        for i in range(30):
+            user = User.objects.create_user(username=f'user{i}', email=f'user{i}@gym.com')
+            for rol in roles[:i % 3 + 1]:
+                UserRole.objects.create(usuario=user, rol=rol)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_list_query_count_is_independent_of_page_size(self):
+        small, small_queries = self._queries('/api/users/', {'page_size': 2})
+        large, large_queries = self._queries('/api/users/', {'page_size': 30})
+
+        self.assertEqual(len(small.data['results']), 2)
+        self.assertEqual(len(large.data['results']), 30)
+        self.assertEqual(small_queries, large_queries)
+        # COUNT + página de usuarios + roles precargados
+        self.assertLessEqual(large_queries, 3)
+
+    def test_list_includes_roles(self):
+        response, _ = self._queries('/api/users/', {'search': 'user5'})
+        roles = response.data['results'][0]['roles']
+        self.assertEqual(sorted(r['nombre'] for r in roles), ['Rol 0', 'Rol 1', 'Rol 2'])
+
+    def test_detail_prefetches_roles(self):
+        user = User.objects.get(username='user4')
+        response, queries = self._queries(f'/api/users/{user.pk}/')
+        self.assertEqual([r['nombre'] for r in response.data['roles']], ['Rol 0', 'Rol 1'])
+        self.assertLessEqual(queries, 2)
+
+
+class OpenApiAuthTests(TestCase):
+    """El esquema OpenAPI documenta la autenticación JWT (PermissionEpochJWTAuthentication)."""
+
+    def test_esquema_jwt(self):
+        from drf_spectacular.generators import SchemaGenerator
+
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+        self.assertIn('jwtAuth', schema['components']['securitySchemes'])
+        me = schema['paths']['/api/users/me/']['get']
+        self.assertIn({'jwtAuth': []}, me['security'])
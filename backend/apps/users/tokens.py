@@ -0,0 +1,30 @@
+"""
+Emisión de tokens JWT con permisos incrustados.
+
+El access token lleva los códigos de permiso, los nombres de rol, la época
+de permisos y la versión de permisos del usuario vigentes al emitirlo.
+HasPermission autoriza con esos claims sin consultar la BD; cuando un
+cambio en sus roles incrementa la versión del usuario (o un cambio en el
+catálogo, la época), sus tokens anteriores se rechazan y el cliente debe
+renovarlos.
+"""
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.core.permissions import get_permission_claims
+
+
+def build_access_token(refresh, user):
+    """Crea el access token a partir del refresh y le agrega los claims de permisos."""
+    access = refresh.access_token
+    for claim, value in get_permission_claims(user).items():
+        access[claim] = value
+    return access
+
+
+def tokens_for_user(user):
+    """
+    Retorna (refresh, access) para el usuario.
+    Los permisos solo viajan en el access token (el refresh no se envía en cada petición).
+    """
+    refresh = RefreshToken.for_user(user)
+    return refresh, build_access_token(refresh, user)
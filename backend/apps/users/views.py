@@ -3,7 +3,7 @@ from rest_framework.views import APIView
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework import permissions, throttling, status
-from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import tokens_for_user
 
 # Swagger docs
 from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiResponse
@@ -124,11 +124,12 @@ class LoginView(APIView):
             self._audit(request, tipo="login", ok=False, email=email, detalle="Credenciales inválidas o usuario inactivo")
             return Response({"detail": "Credenciales inválidas."}, status=400)
 
-        refresh = RefreshToken.for_user(user)
+        # El access token lleva los permisos del usuario (ver apps.users.tokens)
+        refresh, access = tokens_for_user(user)
         self._audit(request, tipo="login", ok=True, user=user, detalle="Inicio de sesión correcto")
 
         return Response({
-            "access": str(refresh.access_token),
+            "access": str(access),
             "refresh": str(refresh),
             "user": {
                 "id": user.id,
@@ -328,18 +329,15 @@ class CurrentUserView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        from apps.core.permissions import get_user_permissions, get_user_roles
+        from apps.core.permissions import get_user_permissions, get_user_roles_data
         
         user = request.user
         serializer = UserSerializer(user)
         user_data = serializer.data
         
-        # Agregar permisos y roles
-        user_data['permissions'] = get_user_permissions(user)
-        user_data['roles'] = [
-            {'id': role.id, 'nombre': role.nombre, 'descripcion': role.descripcion}
-            for role in get_user_roles(user)
-        ]
+        # Agregar permisos y roles (resueltos una sola vez por el caché de permisos)
+        user_data['permissions'] = get_user_permissions(user, request=request)
+        user_data['roles'] = get_user_roles_data(user, request=request)
         user_data['is_superuser'] = user.is_superuser
         
         return Response(user_data, status=200)
@@ -349,7 +347,7 @@ class CurrentUserView(APIView):
 # --- CRUD Usuarios -----------------------------------------------------------
 from rest_framework.pagination import PageNumberPagination
 from django.db.models import Q
-from .serializers import UserListSerializer, UserCreateSerializer, UserUpdateSerializer
+from .serializers import UserListSerializer, UserCreateSerializer, UserUpdateSerializer, with_roles
 
 
 class UserPagination(PageNumberPagination):
@@ -374,7 +372,8 @@ class UserListCreateView(APIView):
         search = request.query_params.get('search', '').strip()
         is_active_filter = request.query_params.get('is_active', '').strip()
         
-        queryset = User.objects.all().order_by('-date_joined')
+        # Roles precargados: cantidad de consultas fija sin importar page_size
+        queryset = with_roles(User.objects.all()).order_by('-date_joined')
         
         # Aplicar búsqueda por username, email o nombre
         if search:
@@ -448,16 +447,17 @@ class UserDetailView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated, HasRoleSuperUser]
     
-    def get_object(self, pk):
+    def get_object(self, pk, prefetch_roles=False):
         """Helper para obtener el usuario"""
+        queryset = with_roles(User.objects.all()) if prefetch_roles else User.objects.all()
         try:
-            return User.objects.get(pk=pk)
+            return queryset.get(pk=pk)
         except User.DoesNotExist:
             return None
     
     def get(self, request, pk):
         """Obtener detalle de un usuario"""
-        user = self.get_object(pk)
+        user = self.get_object(pk, prefetch_roles=True)
         
         if not user:
             return Response(
@@ -0,0 +1,6 @@
+"""
+Suite de benchmarks de la API (manage.py benchmark)
+
+    fixtures.py   datos a escala (seeders.scale_seeder, RNG con semilla)
+    runner.py     mezcla de escenarios, medición y resultados en JSON
+"""
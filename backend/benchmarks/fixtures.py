@@ -0,0 +1,35 @@
+"""
+Datos a escala para los benchmarks
+
+Los genera seeders.scale_seeder.ScaleSeeder (el mismo de manage.py
+seed_scale): historia de `meses` meses con clientes, membresías, pagos,
+clases, inscripciones y bitácora, insertados por lotes y con semilla.
+"""
+from apps.users.models import User
+from seeders.scale_seeder import APELLIDOS, CI_BASE, NOMBRES, ScaleSeeder  # noqa: F401
+
+BENCH_USERNAME = 'benchmark'
+
+
+def usuario_benchmark():
+    user, _ = User.objects.get_or_create(
+        username=BENCH_USERNAME,
+        defaults={'email': 'benchmark@gym.local', 'is_superuser': True, 'is_staff': True},
+    )
+    return user
+
+
+def cargar_escala(clientes, meses, bitacora, seed=42, log=None):
+    """
+    Carga los datos de benchmark si la BD todavía no los tiene (--keepdb
+    reutiliza los de una corrida anterior). Retorna las filas insertadas
+    por tabla ({} si ya estaban cargados).
+    """
+    log = log or (lambda mensaje: None)
+    usuario_benchmark()
+    seeder = ScaleSeeder(clientes=clientes, meses=meses, seed=seed, actividad_extra=bitacora, verbose=False)
+    if seeder.ya_cargado():
+        return {}
+    log(f'{clientes} clientes, {meses} meses, {bitacora} registros de bitácora extra')
+    seeder.seed()
+    return seeder.conteos
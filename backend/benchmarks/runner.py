@@ -0,0 +1,356 @@
+"""
+Mezcla de escenarios y medición
+
+Cada petición pasa por toda la pila (middlewares, autenticación JWT real,
+vistas, serializers) con el cliente de pruebas de DRF, en el mismo proceso.
+Se mide por petición:
+    latencia       perf_counter alrededor de la petición
+    consultas      contador con connection.execute_wrapper (no requiere DEBUG)
+    asignaciones   tracemalloc, solo en 1 de cada `alloc_every` peticiones
+                   (tracemalloc vuelve lenta la petición, así que esas no
+                   cuentan para la latencia)
+
+ejecutar_conexiones() mide aparte el costo de abrir la conexión a la BD:
+las peticiones pasan por el WSGIHandler de Django, que (a diferencia del
+cliente de pruebas) cierra las conexiones vencidas al empezar y terminar
+cada petición, como en producción.
+
+Los resultados se escriben en JSON con claves ordenadas para poder
+compararlos entre commits (ver comparar()).
+"""
+import json
+import math
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from collections import Counter
+from datetime import time as hora, timedelta
+from io import BytesIO
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+import django
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.clases.models import Clase, Salon
+from apps.clients.models import Client
+from apps.users.tokens import tokens_for_user
+from .fixtures import CI_BASE, NOMBRES, APELLIDOS, usuario_benchmark
+
+# Peso de cada escenario en la mezcla (recepción: muchos check-ins)
+MEZCLA = {
+    'checkin': 40,
+    'client_search': 20,
+    'class_list': 15,
+    'audit_browse': 15,
+    'enrollment_burst': 10,
+}
+
+# Modos de conexión comparados por ejecutar_conexiones()
+MODOS_CONEXION = {
+    'sin_reuso': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistente': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': False},
+    'persistente_health': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+}
+
+BURST_SIZE = 20
+BURST_CUPO = 15
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano (valores ya ordenados)."""
+    if not valores:
+        return None
+    indice = max(0, math.ceil(p / 100 * len(valores)) - 1)
+    return valores[indice]
+
+
+class ContadorConsultas:
+    """execute_wrapper que solo cuenta: casi sin costo por consulta."""
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+class Escenarios:
+    """Genera la próxima petición de cada escenario a partir de los datos cargados."""
+
+    def __init__(self, rng, usuario):
+        self.rng = rng
+        self.usuario = usuario
+        # CI de los clientes generados (CI_BASE + id); no son contiguos
+        self.cis = [ci for ci in Client.objects.values_list('ci', flat=True) if ci.isdigit() and int(ci) >= CI_BASE]
+        self.cliente_ids = list(Client.objects.values_list('id', flat=True))
+        self.fechas_clases = list(Clase.objects.values_list('fecha', flat=True).distinct())
+        self.salon = Salon.objects.get_or_create(nombre='Sala Benchmark', defaults={'capacidad': BURST_CUPO})[0]
+        self._burst_clase = None
+        self._burst_restantes = 0
+        self._burst_clientes = []
+
+    def checkin(self):
+        if self.cis and self.rng.random() < 0.9:
+            ci = self.rng.choice(self.cis)
+        else:
+            ci = str(9_000_000 + self.rng.randrange(10**6))
+        return 'get', '/api/membresias/checkin/', {'ci': ci}
+
+    def client_search(self):
+        tipo = self.rng.random()
+        if tipo < 0.4:
+            search = self.rng.choice(APELLIDOS)[:self.rng.randint(3, 6)]
+        elif tipo < 0.7:
+            search = f'{self.rng.choice(NOMBRES)} {self.rng.choice(APELLIDOS)[:3]}'
+        else:
+            search = (self.rng.choice(self.cis) if self.cis else str(CI_BASE))[:self.rng.randint(4, 7)]
+        return 'get', '/api/clients/', {'search': search}
+
+    def class_list(self):
+        params = {}
+        if self.fechas_clases and self.rng.random() < 0.7:
+            params['fecha'] = self.rng.choice(self.fechas_clases).isoformat()
+        return 'get', '/api/clases/', params
+
+    def audit_browse(self):
+        params = {'page': self.rng.randint(1, 20)}
+        tipo = self.rng.random()
+        if tipo < 0.3:
+            params['nivel'] = self.rng.choice(['warning', 'error'])
+        elif tipo < 0.5:
+            params['tipo_accion'] = self.rng.choice(['login', 'create_client', 'update_membership'])
+        elif tipo < 0.7:
+            desde = timezone.localdate() - timedelta(days=self.rng.randint(1, 60))
+            params['date_from'] = desde.isoformat()
+            params['date_to'] = (desde + timedelta(days=7)).isoformat()
+        return 'get', '/api/audit/logs/', params
+
+    def enrollment_burst(self):
+        """
+        Ráfagas de BURST_SIZE inscripciones a una clase nueva con cupo
+        BURST_CUPO: las últimas quedan en lista de espera.
+        """
+        if not self._burst_restantes:
+            # Clase nueva por ráfaga, lejos en el futuro y en un horario libre
+            # (con --keepdb quedan las de corridas anteriores)
+            while True:
+                fecha = timezone.localdate() + timedelta(days=400 + self.rng.randrange(3000))
+                inicio = hora(self.rng.randint(6, 20))
+                if not Clase.objects.filter(salon=self.salon, fecha=fecha, hora_inicio=inicio).exists():
+                    break
+            self._burst_clase = Clase.objects.create(
+                disciplina_id=Clase.objects.values_list('disciplina_id', flat=True).first(),
+                instructor=self.usuario, salon=self.salon, fecha=fecha,
+                hora_inicio=inicio, hora_fin=hora(21), cupo_maximo=BURST_CUPO,
+            )
+            self._burst_clientes = self.rng.sample(self.cliente_ids, min(BURST_SIZE, len(self.cliente_ids)))
+            self._burst_restantes = len(self._burst_clientes)
+        self._burst_restantes -= 1
+        cliente_id = self._burst_clientes[self._burst_restantes]
+        return 'post', '/api/inscripciones-clase/', {'clase': self._burst_clase.pk, 'cliente': cliente_id}
+
+
+def _api_client(usuario):
+    client = APIClient()
+    _, access = tokens_for_user(usuario)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+    return client
+
+
+def _resumen(latencias, consultas, asignaciones, estados):
+    latencias = sorted(latencias)
+    resumen = {
+        'requests': len(latencias),
+        'errors': sum(veces for status, veces in estados.items() if status >= 500),
+        'status': {str(status): veces for status, veces in sorted(estados.items())},
+        'latency_ms': {
+            'p50': percentil(latencias, 50),
+            'p95': percentil(latencias, 95),
+            'p99': percentil(latencias, 99),
+            'mean': sum(latencias) / len(latencias) if latencias else None,
+            'max': latencias[-1] if latencias else None,
+        },
+        'queries': {
+            'mean': sum(consultas) / len(consultas) if consultas else None,
+            'max': max(consultas) if consultas else None,
+        },
+        'alloc_kb': {
+            'samples': len(asignaciones),
+            'peak_mean': sum(asignaciones) / len(asignaciones) if asignaciones else None,
+            'peak_max': max(asignaciones) if asignaciones else None,
+        },
+    }
+    for grupo in ('latency_ms', 'queries', 'alloc_kb'):
+        resumen[grupo] = {k: round(v, 3) if isinstance(v, float) else v for k, v in resumen[grupo].items()}
+    return resumen
+
+
+def ejecutar(requests=1000, warmup=50, alloc_every=10, mezcla=None, seed=42, log=None):
+    """
+    Ejecuta `requests` peticiones eligiendo el escenario según `mezcla`
+    (nombre -> peso). Retorna {escenario: resumen} más el total "mix".
+    """
+    log = log or (lambda mensaje: None)
+    mezcla = mezcla or MEZCLA
+    rng = random.Random(seed)
+    usuario = usuario_benchmark()
+    escenarios = Escenarios(rng, usuario)
+    client = _api_client(usuario)
+    nombres = list(mezcla)
+    pesos = [mezcla[n] for n in nombres]
+
+    datos = {n: {'latencias': [], 'consultas': [], 'asignaciones': [], 'estados': Counter()} for n in nombres}
+    contador = ContadorConsultas()
+    with connection.execute_wrapper(contador):
+        for i in range(warmup + requests):
+            nombre = rng.choices(nombres, pesos)[0]
+            metodo, url, payload = getattr(escenarios, nombre)()
+            kwargs = {'data': payload, 'format': 'json'} if metodo == 'post' else {'data': payload}
+            medir_asignaciones = i >= warmup and alloc_every and (i - warmup) % alloc_every == 0
+
+            if medir_asignaciones:
+                tracemalloc.start()
+            antes = contador.total
+            inicio = time.perf_counter()
+            response = getattr(client, metodo)(url, **kwargs)
+            duracion = (time.perf_counter() - inicio) * 1000
+            if medir_asignaciones:
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+            if i < warmup:
+                continue
+            d = datos[nombre]
+            d['consultas'].append(contador.total - antes)
+            d['estados'][response.status_code] += 1
+            if medir_asignaciones:
+                d['asignaciones'].append(pico / 1024)
+            else:
+                d['latencias'].append(duracion)
+            if (i - warmup + 1) % 500 == 0:
+                log(f'{i - warmup + 1}/{requests} peticiones')
+
+    resultados = {n: _resumen(d['latencias'], d['consultas'], d['asignaciones'], d['estados']) for n, d in datos.items()}
+    resultados['mix'] = _resumen(
+        [x for d in datos.values() for x in d['latencias']],
+        [x for d in datos.values() for x in d['consultas']],
+        [x for d in datos.values() for x in d['asignaciones']],
+        sum((d['estados'] for d in datos.values()), Counter()),
+    )
+    return resultados
+
+
+def _peticion_wsgi(handler, url, params, token):
+    """GET por el WSGIHandler; retorna el estado. Cerrar la respuesta dispara request_finished."""
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': url, 'QUERY_STRING': urlencode(params),
+        'HTTP_HOST': 'testserver', 'HTTP_AUTHORIZATION': f'Bearer {token}', 'wsgi.input': BytesIO(),
+    }
+    setup_testing_defaults(environ)
+    estado = []
+    response = handler(environ, lambda status, headers, exc_info=None: estado.append(status))
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    return int(estado[0].split()[0])
+
+
+def ejecutar_conexiones(requests=500, warmup=20, modos=None, seed=42, log=None):
+    """
+    Check-ins por el WSGIHandler con cada modo de `modos` (nombre -> valores
+    de CONN_MAX_AGE y CONN_HEALTH_CHECKS). Retorna {modo: resumen} con la
+    latencia por petición y las conexiones abiertas. La latencia incluye
+    el cierre de la respuesta (request_finished), donde sin reuso se cierra
+    la conexión. Restaura la configuración original al terminar.
+    """
+    log = log or (lambda mensaje: None)
+    modos = modos or MODOS_CONEXION
+    usuario = usuario_benchmark()
+    _, token = tokens_for_user(usuario)
+    handler = WSGIHandler()
+    original = {clave: connection.settings_dict.get(clave) for clave in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+    abiertas = Counter()
+
+    def contar(sender, connection, **kwargs):
+        abiertas[connection.alias] += 1
+
+    resultados = {}
+    connection_created.connect(contar)
+    try:
+        for modo, valores in modos.items():
+            escenarios = Escenarios(random.Random(seed), usuario)
+            connection.close()
+            connection.settings_dict.update(valores)
+            latencias, estados = [], Counter()
+            for i in range(warmup + requests):
+                _, url, params = escenarios.checkin()
+                if i == warmup:
+                    abiertas.clear()
+                inicio = time.perf_counter()
+                status = _peticion_wsgi(handler, url, params, token)
+                duracion = (time.perf_counter() - inicio) * 1000
+                if i >= warmup:
+                    latencias.append(duracion)
+                    estados[status] += 1
+            resultados[modo] = _resumen(latencias, [], [], estados)
+            resultados[modo]['connections_opened'] = abiertas[connection.alias]
+            log(f'{modo}: p50 {resultados[modo]["latency_ms"]["p50"]:.3f} ms, '
+                f'{abiertas[connection.alias]} conexiones abiertas')
+    finally:
+        connection_created.disconnect(contar)
+        connection.close()
+        connection.settings_dict.update(original)
+    return resultados
+
+
+def metadatos(conteos, opciones):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': timezone.now().isoformat(timespec='seconds'),
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'dataset': conteos,
+        'options': opciones,
+    }
+
+
+def escribir(ruta, resultado):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(resultado, archivo, indent=2, sort_keys=True, default=str)
+        archivo.write('\n')
+
+
+def comparar(base, actual):
+    """
+    Filas (escenario, métrica, base, actual, variación %) de las métricas
+    de latencia y consultas entre dos resultados.
+    """
+    filas = []
+    for escenario, metricas in sorted(actual['scenarios'].items()):
+        anterior = base.get('scenarios', {}).get(escenario)
+        if not anterior:
+            continue
+        for grupo, claves in (('latency_ms', ('p50', 'p95', 'p99')), ('queries', ('mean',))):
+            for clave in claves:
+                a, b = anterior[grupo].get(clave), metricas[grupo].get(clave)
+                if a is None or b is None:
+                    continue
+                variacion = ((b - a) / a * 100) if a else 0.0
+                filas.append((escenario, f'{grupo}.{clave}', a, b, round(variacion, 1)))
+    return filas
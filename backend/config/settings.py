@@ -65,6 +65,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.middleware.MetricsMiddleware',  # <-- Métricas de rendimiento (primero: mide toda la pila)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -103,6 +104,11 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 # Configuración dinámica según DATABASE_ENGINE
 DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'sqlite3')
+# Abrir las conexiones al arrancar el servidor (config/wsgi.py), no en la
+# primera petición. Con conexiones persistentes solo sirve si el hilo que
+# carga la aplicación atiende las peticiones (gunicorn con workers sync,
+# uwsgi sin hilos).
+DATABASE_WARMUP = os.environ.get('DATABASE_WARMUP', 'True') == 'True'
 
 if DATABASE_ENGINE == 'postgresql':
     # PostgreSQL (para Docker o producción)
@@ -114,6 +120,17 @@ if DATABASE_ENGINE == 'postgresql':
             'PASSWORD': os.environ.get('DATABASE_PASSWORD', 'spartan_pass'),
             'HOST': os.environ.get('DATABASE_HOST', 'db'),
             'PORT': os.environ.get('DATABASE_PORT', '5432'),
+            # Conexiones persistentes: cada worker reutiliza su conexión hasta
+            # CONN_MAX_AGE segundos en vez de abrir una (TCP + autenticación)
+            # por petición. Con CONN_HEALTH_CHECKS se verifica antes de
+            # reutilizarla, así un reinicio de la BD no deja conexiones rotas.
+            # El servidor de desarrollo atiende cada petición en un hilo nuevo,
+            # así que ahí no se reutilizan; sí con gunicorn/uwsgi.
+            'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': os.environ.get('DATABASE_CONN_HEALTH_CHECKS', 'True') == 'True',
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('DATABASE_CONNECT_TIMEOUT', 5)),
+            },
         }
     }
 else:
@@ -186,13 +203,47 @@ SIMPLE_JWT = {
         days=int(os.environ.get('JWT_REFRESH_TOKEN_LIFETIME_DAYS', 1))
     ),
     #"BLACKLIST_AFTER_ROTATION": True,
+    # El refresh recalcula los permisos incrustados en el access token
+    'TOKEN_REFRESH_SERIALIZER': 'apps.users.serializers.PermissionTokenRefreshSerializer',
 }
 
+# Caché: por defecto en memoria de cada proceso. Con varios workers conviene
+# una caché compartida (requiere el paquete redis).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+
+# Horario semanal de clases (apps.clases.horario): segundos que vive cada
+# versión de semana en caché. Los signals de Clases la invalidan antes.
+CLASES_SEMANA_CACHE_TIMEOUT = int(os.environ.get('CLASES_SEMANA_CACHE_TIMEOUT', 300))
+
+# Autocompletado de clientes (apps.clients.autocomplete): segundos tras los
+# que cada proceso reconstruye su índice en memoria, en segundo plano (los
+# signals lo mantienen al día con las escrituras del propio proceso).
+CLIENT_AUTOCOMPLETE_REFRESH = int(os.environ.get('CLIENT_AUTOCOMPLETE_REFRESH', 300))
+
+# Check-in por CI (apps.membresias.checkin): segundos que vive la proyección
+# de membresías de un cliente y días antes del vencimiento en que se avisa.
+CHECKIN_CACHE_TIMEOUT = int(os.environ.get('CHECKIN_CACHE_TIMEOUT', 600))
+CHECKIN_DIAS_AVISO = int(os.environ.get('CHECKIN_DIAS_AVISO', 7))
+
+# Caché de permisos (apps.core.permissions): segundos que vive el set de
+# permisos de un usuario. Los signals de apps.roles lo invalidan antes.
+PERMISSION_CACHE_TIMEOUT = int(os.environ.get('PERMISSION_CACHE_TIMEOUT', 300))
+# Segundos que cada proceso reutiliza la época de permisos antes de releerla
+# de la BD (los tokens JWT con época menor se rechazan).
+PERMISSION_EPOCH_CACHE_TIMEOUT = int(os.environ.get('PERMISSION_EPOCH_CACHE_TIMEOUT', 30))
+
 # REST Framework settings
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT + rechazo de tokens con permisos obsoletos (época vieja)
+        'apps.users.authentication.PermissionEpochJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -222,5 +273,42 @@ SPECTACULAR_SETTINGS = {
     'VERSION': '1.0.0',
 }
 
+# Escritor de bitácora (apps.audit.writer): inserciones por lotes en segundo plano.
+# AUDIT_ASYNC=False escribe en el momento (scripts); el runner de tests
+# (TEST_RUNNER) lo desactiva para que los registros sean visibles al instante.
+AUDIT_WRITER = {
+    'ASYNC': os.environ.get('AUDIT_ASYNC', 'True') == 'True',
+    'BATCH_SIZE': int(os.environ.get('AUDIT_BATCH_SIZE', 200)),
+    'FLUSH_INTERVAL': float(os.environ.get('AUDIT_FLUSH_INTERVAL', 2.0)),
+    'MAX_QUEUE_SIZE': int(os.environ.get('AUDIT_MAX_QUEUE_SIZE', 10000)),
+    'OVERFLOW_POLICY': os.environ.get('AUDIT_OVERFLOW_POLICY', 'sync'),
+}
+
+TEST_RUNNER = 'apps.core.test_runner.TestRunner'
+
+# Retención de bitácora (apps.audit.partitioning / manage.py audit_retention)
+AUDIT_RETENTION = {
+    'HOT_MONTHS': int(os.environ.get('AUDIT_RETENTION_MONTHS', 12)),
+    'ARCHIVE_DIR': os.environ.get('AUDIT_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive', 'bitacora')),
+    'PARTITIONS_AHEAD': int(os.environ.get('AUDIT_PARTITIONS_AHEAD', 3)),
+}
+
+# Métricas de rendimiento por petición (apps.core.metrics, GET /api/metrics/).
+# SAMPLE_RATE: fracción de peticiones en las que se miden tiempos y tamaño.
+REQUEST_METRICS = {
+    'ENABLED': os.environ.get('REQUEST_METRICS_ENABLED', 'True') == 'True',
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', 1.0)),
+}
+
+# Registro de consultas lentas (apps.core.slow_queries, GET /api/slow-queries/).
+# ANALYZE vuelve a ejecutar los SELECT lentos (solo PostgreSQL): usar con cuidado.
+SLOW_QUERY_LOG = {
+    'ENABLED': os.environ.get('SLOW_QUERY_LOG_ENABLED', 'True') == 'True',
+    'THRESHOLD_MS': float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200)),
+    'EXPLAIN': os.environ.get('SLOW_QUERY_EXPLAIN', 'True') == 'True',
+    'ANALYZE': os.environ.get('SLOW_QUERY_EXPLAIN_ANALYZE', 'False') == 'True',
+    'MAX_ENTRIES': int(os.environ.get('SLOW_QUERY_MAX_ENTRIES', 200)),
+}
+
 # Password reset token TTL (hours)
 PASSWORD_RESET_TOKEN_TTL_HOURS = int(os.environ.get('PASSWORD_RESET_TOKEN_TTL_HOURS', 24))   
\ No newline at end of file
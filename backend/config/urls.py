@@ -1,17 +1,19 @@
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from rest_framework_simplejwt.views import TokenRefreshView
 
 from apps.users.views import CreateAdminView, CurrentUserView, LoginView, LogoutView, PasswordResetConfirmView, PasswordResetRequestView, UserListCreateView, UserDetailView
 from apps.roles.views import PermissionDetailView, PermissionListCreateView, RoleAssignView, RoleDetailView, RoleListCreateView, RolePermissionAssignView, RolePermissionRemoveView, RolePermissionSetView, RoleRemoveView
-from apps.audit.views import AuditLogDetailView, AuditLogListView
-from apps.clients.views import ClientListCreateView, ClientDetailView
-from apps.membresias.views import MembresiaListCreateView, MembresiaDetailView, MembresiaStatsView, PlanMembresiaListView, ConsultarEstadoVigenciaView
+from apps.audit.views import AuditLogDetailView, AuditLogExportView, AuditLogListView
+from apps.clients.views import ClientListCreateView, ClientDetailView, ClientAutocompleteView
+from apps.membresias.views import MembresiaListCreateView, MembresiaDetailView, MembresiaStatsView, PlanMembresiaListView, ConsultarEstadoVigenciaView, CheckInView
 from apps.promociones.views import PromocionListCreateView, PromocionDetailView
 from apps.disciplinas.views import DisciplinaListCreateView, DisciplinaDetailView
+from apps.core.views import MetricsView, SlowQueryListView
 from apps.clases.views import (
     SalonListCreateView, SalonDetailView,
-    ClaseListCreateView, ClaseDetailView,
+    ClaseListCreateView, ClaseDetailView, ClaseBulkCreateView, ClaseSemanaView,
     InscripcionClaseListCreateView, InscripcionClaseDetailView
 )
 
@@ -36,6 +38,8 @@ urlpatterns = [
     path("api/auth/login/", LoginView.as_view(), name="auth-login"),
     #CU2: logout
     path("api/auth/logout/", LogoutView.as_view(), name="auth-logout"),   
+    # Renovar access token (recalcula los permisos incrustados)
+    path("api/token/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
     #Reset de contraseña
     path("api/auth/password/reset/request/", PasswordResetRequestView.as_view(), name="password-reset-request"),
     path("api/auth/password/reset/confirm/", PasswordResetConfirmView.as_view(), name="password-reset-confirm"),
@@ -59,9 +63,11 @@ urlpatterns = [
      # ...
     path("api/audit/logs/", AuditLogListView.as_view(), name="audit-log-list"),
     path("api/audit/logs/<int:pk>/", AuditLogDetailView.as_view(), name="audit-log-detail"),
+    path("api/audit/logs/export/", AuditLogExportView.as_view(), name="audit-log-export"),
     
     # Clientes CRUD
     path("api/clients/", ClientListCreateView.as_view(), name="client-list-create"),
+    path("api/clients/autocomplete/", ClientAutocompleteView.as_view(), name="client-autocomplete"),
     path("api/clients/<int:pk>/", ClientDetailView.as_view(), name="client-detail"),
     
     # Membresías CRUD
@@ -70,6 +76,7 @@ urlpatterns = [
     path("api/membresias/stats/", MembresiaStatsView.as_view(), name="membresia-stats"),
     # CU17: Consultar Estado/Vigencia de Membresía
     path("api/membresias/consultar-estado/", ConsultarEstadoVigenciaView.as_view(), name="membresia-consultar-estado"),
+    path("api/membresias/checkin/", CheckInView.as_view(), name="membresia-checkin"),
     
     # Planes de Membresía
     path("api/planes-membresia/", PlanMembresiaListView.as_view(), name="plan-membresia-list"),
@@ -88,10 +95,15 @@ urlpatterns = [
     
     # CU20: Programar Clase - Clases
     path("api/clases/", ClaseListCreateView.as_view(), name="clase-list-create"),
+    path("api/clases/bulk/", ClaseBulkCreateView.as_view(), name="clase-bulk-create"),
+    path("api/clases/semana/", ClaseSemanaView.as_view(), name="clase-semana"),
     path("api/clases/<int:pk>/", ClaseDetailView.as_view(), name="clase-detail"),
     
     # Inscripciones a Clases
     path("api/inscripciones-clase/", InscripcionClaseListCreateView.as_view(), name="inscripcion-clase-list-create"),
     path("api/inscripciones-clase/<int:pk>/", InscripcionClaseDetailView.as_view(), name="inscripcion-clase-detail"),
     
+    # Métricas de rendimiento (Prometheus)
+    path("api/metrics/", MetricsView.as_view(), name="metrics"),
+    path("api/slow-queries/", SlowQueryListView.as_view(), name="slow-query-list"),
 ]
\ No newline at end of file
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Abre las conexiones a la BD antes de la primera petición (DATABASE_WARMUP)
+from apps.core.db_connections import calentar  # noqa: E402
+
+calentar()
@@ -0,0 +1,525 @@
+"""
+Seeder de datos sintéticos a escala (manage.py seed_scale)
+
+Simula `meses` meses del gimnasio, día por día, para `clientes` clientes:
+    - Altas repartidas en el período (más altas recientes que antiguas).
+    - Membresías consecutivas por cliente con su pago (InscripcionMembresia):
+      la mayoría renueva, algunos vuelven tras una pausa y el resto se va.
+      El plan se elige con pesos según su duración (predomina el mensual).
+    - Clases semanales por salón (lunes a sábado) hasta dos semanas adelante.
+    - Inscripciones a clases de los clientes que asisten, dentro de la
+      vigencia de cada membresía y respetando el cupo (lista de espera en
+      clases futuras llenas).
+    - Bitácora: alta de cliente, suscripción, turnos del personal y
+      `actividad_extra` registros genéricos más.
+
+Todo se genera en orden cronológico, como en producción: los ids crecen
+con las fechas y los índices por fecha se llenan por el final.
+
+Rendimiento: las filas se insertan con executemany en lotes de
+`batch_size`, una transacción por lote, con los ids asignados acá (así las
+membresías y los pagos se enlazan sin releer nada). bulk_create gasta la
+mayor parte del tiempo armando el SQL valor por valor. Con la misma
+semilla se generan los mismos datos.
+
+No pasa por save() ni signals: las columnas derivadas (búsqueda del
+cliente, fecha/hora legacy de la bitácora, contador de inscritos de la
+clase) se completan acá o con los servicios de cada app, y al final se
+limpia la caché.
+"""
+import heapq
+import random
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.audit.models import HistorialActividad
+from apps.audit.search import deferred_indexing
+from apps.clases.models import Clase, InscripcionClase, Salon
+from apps.clases.services import reparar_contadores
+from apps.clients.models import Client
+from apps.core.constants import (
+    CLASE_CANCELADA,
+    CLASE_FINALIZADA,
+    CLASE_PROGRAMADA,
+    ESTADO_ACTIVO,
+    ESTADO_CANCELADO,
+    ESTADO_SUSPENDIDO,
+    ESTADO_VENCIDO,
+    EXPERIENCIA_AVANZADO,
+    EXPERIENCIA_INTERMEDIO,
+    EXPERIENCIA_PRINCIPIANTE,
+    INSCRIPCION_ASISTIO,
+    INSCRIPCION_CANCELADA_CLASE,
+    INSCRIPCION_CONFIRMADA,
+    INSCRIPCION_EN_ESPERA,
+    INSCRIPCION_NO_ASISTIO,
+    METODO_EFECTIVO,
+    METODO_QR,
+    METODO_TARJETA,
+    METODO_TRANSFERENCIA,
+)
+from apps.core.utils import normalizar_busqueda
+from apps.disciplinas.models import Disciplina
+from apps.membresias.models import InscripcionMembresia, Membresia, PlanMembresia
+from apps.membresias.stats import reconciliar
+from .base_seeder import BaseSeeder
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+# Usuarios del personal simulado: escala.recepcion1, escala.instructor1, ...
+PREFIJO_PERSONAL = 'escala.'
+# CI = CI_BASE + id del cliente: único y fácil de reconocer
+CI_BASE = 3_000_000
+
+NOMBRES = [
+    'Juan', 'María', 'José', 'Ana', 'Luis', 'Carmen', 'Carlos', 'Rosa', 'Jorge', 'Lucía',
+    'Miguel', 'Sofía', 'Pedro', 'Elena', 'Diego', 'Valeria', 'Andrés', 'Camila', 'Raúl', 'Paola',
+    'Fernando', 'Gabriela', 'Marco', 'Daniela', 'Sergio', 'Natalia', 'Óscar', 'Andrea', 'Iván', 'Mariana',
+]
+APELLIDOS = [
+    'Mamani', 'Quispe', 'Flores', 'Choque', 'Gutiérrez', 'Vargas', 'Rojas', 'Fernández', 'López',
+    'Pérez', 'García', 'Torrez', 'Vásquez', 'Morales', 'Condori', 'Ramírez', 'Martínez', 'Cruz',
+    'Rodríguez', 'Apaza', 'Limachi', 'Suárez', 'Castro', 'Herrera', 'Ticona', 'Medina',
+]
+# Catálogos por defecto si la BD no tiene ninguno (como los seeders de catálogo)
+PLANES = [
+    ('Plan Diario', 1, '15.00'), ('Plan Semanal', 7, '80.00'), ('Plan Quincenal', 15, '140.00'),
+    ('Plan Mensual', 30, '250.00'), ('Plan Trimestral', 90, '650.00'), ('Plan Semestral', 180, '1200.00'),
+    ('Plan Anual', 365, '2200.00'),
+]
+DISCIPLINAS = ['Spinning', 'Yoga', 'Crossfit', 'Funcional', 'Pilates', 'Zumba']
+SALONES = [('Sala Principal', 30), ('Sala de Spinning', 25), ('Sala Funcional', 20), ('Sala de Yoga', 15)]
+
+# Peso del plan según su duración en días (el mensual es el más vendido)
+PESO_POR_DURACION = {1: 4, 7: 6, 15: 8, 30: 55, 90: 15, 180: 7, 365: 5}
+METODOS_PAGO = [(METODO_EFECTIVO, 50), (METODO_QR, 25), (METODO_TARJETA, 15), (METODO_TRANSFERENCIA, 10)]
+EXPERIENCIAS = [(EXPERIENCIA_PRINCIPIANTE, 60), (EXPERIENCIA_INTERMEDIO, 30), (EXPERIENCIA_AVANZADO, 10)]
+HORAS_CLASE = [7, 8, 9, 12, 17, 18, 19, 20]
+ACTIVIDAD = [
+    (('update', 'Actualizar'), 60), (('update_client', 'Actualizar Cliente'), 20),
+    (('update_membership', 'Actualizar Membresía'), 15), (('other', 'Consulta'), 5),
+]
+
+RENUEVA = 0.78          # renueva al vencer
+VUELVE = 0.10           # no renueva, pero vuelve tras una pausa
+ASISTE_A_CLASES = 0.35  # clientes que se inscriben a clases
+SEMANAS_FUTURAS = 2
+
+
+class Tabla:
+    """
+    Inserción por lotes con executemany. Los ids se asignan acá, desde el
+    máximo actual de la tabla (el seeder se corre sin otras escrituras).
+    """
+
+    def __init__(self, modelo, campos, conn, batch_size=BATCH_SIZE, padres=()):
+        self.modelo = modelo
+        self.conn = conn
+        self.batch_size = batch_size
+        # Tablas referenciadas con filas pendientes: se insertan antes (FK)
+        self.padres = padres
+        fields = [modelo._meta.get_field(nombre) for nombre in ('id', *campos)]
+        self.adaptadores = [(i, a) for i, a in enumerate(map(self._adaptador, fields)) if a]
+        ops = conn.ops
+        columnas = ', '.join(ops.quote_name(f.column) for f in fields)
+        marcadores = ', '.join(['%s'] * len(fields))
+        self.sql = f'INSERT INTO {ops.quote_name(modelo._meta.db_table)} ({columnas}) VALUES ({marcadores})'
+        self.filas = []
+        self.insertadas = 0
+        self.primer_id = self._proximo_id = (modelo.objects.using(conn.alias).aggregate(m=Max('id'))['m'] or 0) + 1
+
+    def _adaptador(self, field):
+        """Conversión al valor de BD que haría el ORM, solo para los tipos que la necesitan."""
+        ops = self.conn.ops
+        tipo = field.get_internal_type()
+        if tipo == 'DateTimeField':
+            return ops.adapt_datetimefield_value
+        if tipo == 'DateField':
+            return ops.adapt_datefield_value
+        if tipo == 'TimeField':
+            return ops.adapt_timefield_value
+        if tipo == 'JSONField':
+            return lambda valor: field.get_db_prep_save(valor, connection=self.conn)
+        return None
+
+    def nuevo_id(self):
+        pk = self._proximo_id
+        self._proximo_id += 1
+        return pk
+
+    def agregar(self, fila):
+        """`fila` incluye el id (de nuevo_id()) en la primera posición."""
+        fila = list(fila)
+        # created_at/updated_at (y fecha_hora) suelen ser el mismo objeto: se adapta una vez
+        anterior = adaptado = None
+        for i, adaptar in self.adaptadores:
+            valor = fila[i]
+            if valor is None:
+                continue
+            if valor is not anterior:
+                anterior, adaptado = valor, adaptar(valor)
+            fila[i] = adaptado
+        self.filas.append(fila)
+        if len(self.filas) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.filas:
+            return
+        for padre in self.padres:
+            padre.flush()
+        with transaction.atomic(using=self.conn.alias), self.conn.cursor() as cursor:
+            cursor.executemany(self.sql, self.filas)
+        self.insertadas += len(self.filas)
+        self.filas = []
+
+
+def _elegir(rng, opciones):
+    """Elección ponderada sobre [(valor, peso)]."""
+    valores, pesos = zip(*opciones)
+    return rng.choices(valores, pesos)[0]
+
+
+class ScaleSeeder(BaseSeeder):
+    """
+    Datos sintéticos a escala para benchmarks y planificación de capacidad.
+    A diferencia de los demás seeders no usa una transacción global: cada
+    lote se confirma por separado.
+    """
+
+    def __init__(self, clientes=10_000, meses=12, seed=42, actividad_extra=0,
+                 batch_size=BATCH_SIZE, using=DEFAULT_DB_ALIAS, verbose=True):
+        super().__init__()
+        self.clientes = clientes
+        self.meses = meses
+        self.seed_value = seed
+        self.actividad_extra = actividad_extra
+        self.batch_size = batch_size
+        self.conn = connections[using]
+        self.verbose = verbose
+        self.conteos = {}
+
+    def ya_cargado(self):
+        """True si la BD ya tiene membresías generadas por este seeder."""
+        return Membresia.objects.using(self.conn.alias).filter(
+            usuario_registro__username__startswith=PREFIJO_PERSONAL
+        ).exists()
+
+    def log(self, mensaje):
+        if self.verbose:
+            print(mensaje)
+
+    def run(self):
+        try:
+            self.seed()
+        except Exception as e:
+            print(f"\n❌ Error al ejecutar seeder: {str(e)}")
+            return False
+        if self.verbose:
+            self.print_summary()
+        return True
+
+    # ---------- Catálogos ----------
+
+    def _personal(self):
+        """Recepcionistas (registran membresías) e instructores."""
+        def usuario(username, nombre):
+            return User.objects.get_or_create(
+                username=username,
+                defaults={'email': f'{username}@gym.local', 'first_name': nombre, 'last_name': 'Escala', 'is_staff': True},
+            )[0]
+        recepcion = [usuario(f'{PREFIJO_PERSONAL}recepcion{i}', f'Recepción {i}') for i in range(1, 4)]
+        instructores = [usuario(f'{PREFIJO_PERSONAL}instructor{i}', f'Instructor {i}') for i in range(1, 7)]
+        return recepcion, instructores
+
+    def _catalogos(self):
+        planes = list(PlanMembresia.objects.all())
+        if not planes:
+            planes = [
+                PlanMembresia.objects.create(nombre=nombre, duracion=dias, precio_base=Decimal(precio))
+                for nombre, dias, precio in PLANES
+            ]
+        disciplinas = list(Disciplina.objects.filter(activa=True)) or [
+            Disciplina.objects.get_or_create(nombre=nombre)[0] for nombre in DISCIPLINAS
+        ]
+        salones = list(Salon.objects.filter(activo=True)) or [
+            Salon.objects.get_or_create(nombre=nombre, defaults={'capacidad': capacidad})[0]
+            for nombre, capacidad in SALONES
+        ]
+        return planes, disciplinas, salones
+
+    # ---------- Generación ----------
+
+    def seed(self):
+        rng = self.rng = random.Random(self.seed_value)
+        conn = self.conn
+        self.hoy = hoy = timezone.localdate()
+        self.tz = timezone.get_current_timezone()
+        desde = hoy - timedelta(days=round(self.meses * 30.44))
+        hasta = hoy + timedelta(weeks=SEMANAS_FUTURAS)
+
+        recepcion, instructores = self._personal()
+        planes, disciplinas, salones = self._catalogos()
+        opciones_plan = [(plan, PESO_POR_DURACION.get(plan.duracion, 5)) for plan in planes]
+        self.log(f"\n📈 Generando {self.clientes} clientes y {self.meses} meses de historia "
+                 f"({desde} a {hasta}, semilla {self.seed_value})...")
+
+        self.t_clientes = Tabla(Client, [
+            'created_at', 'updated_at', 'nombre', 'apellido', 'ci', 'telefono', 'email', 'peso', 'altura',
+            'experiencia', 'fecha_registro', 'nombre_busqueda', 'ci_busqueda', 'telefono_busqueda',
+            'email_busqueda',
+        ], conn, self.batch_size)
+        self.t_pagos = Tabla(InscripcionMembresia, [
+            'created_at', 'updated_at', 'cliente', 'monto', 'metodo_de_pago',
+        ], conn, self.batch_size, padres=[self.t_clientes])
+        self.t_membresias = Tabla(Membresia, [
+            'created_at', 'updated_at', 'inscripcion', 'plan', 'usuario_registro', 'estado', 'fecha_inicio', 'fecha_fin',
+        ], conn, self.batch_size, padres=[self.t_pagos])
+        self.t_clases = Tabla(Clase, [
+            'created_at', 'updated_at', 'disciplina', 'instructor', 'salon', 'fecha', 'hora_inicio', 'hora_fin',
+            'cupo_maximo', 'estado', 'observaciones', 'inscritos_confirmados',
+        ], conn, self.batch_size)
+        self.t_inscripciones = Tabla(InscripcionClase, [
+            'created_at', 'updated_at', 'clase', 'cliente', 'estado', 'fecha_inscripcion', 'observaciones',
+        ], conn, self.batch_size, padres=[self.t_clientes])
+        self.t_bitacora = Tabla(HistorialActividad, [
+            'created_at', 'updated_at', 'usuario', 'tipo_accion', 'accion', 'descripcion', 'nivel', 'ip_address',
+            'user_agent', 'fecha_hora', 'datos_adicionales', 'fecha', 'hora', 'ip',
+        ], conn, self.batch_size)
+
+        tablas = [self.t_clientes, self.t_pagos, self.t_membresias, self.t_clases, self.t_inscripciones, self.t_bitacora]
+        # El índice de búsqueda de la bitácora (FTS5 en SQLite) se completa al final, de una vez
+        with deferred_indexing(conn):
+            self._clases(desde, hasta, disciplinas, salones, instructores)
+            self._historia(desde, opciones_plan, recepcion)
+            for tabla in tablas:
+                tabla.flush()
+        self._finalizar(tablas)
+
+    def _momento(self, fecha, desde_hora=6, hasta_hora=22):
+        """Instante aware al azar dentro del horario del gimnasio."""
+        segundos = self.rng.randrange(desde_hora * 3600, hasta_hora * 3600)
+        return datetime.combine(fecha, time.min, tzinfo=self.tz) + timedelta(seconds=segundos)
+
+    def _clases(self, desde, hasta, disciplinas, salones, instructores):
+        """Horario fijo por salón (5 franjas; sábado solo mañana) repetido cada semana."""
+        rng = self.rng
+        self.clases_por_fecha = defaultdict(list)
+        self.ocupacion = {}
+        ocupados = set(
+            Clase.objects.filter(fecha__range=(desde, hasta)).values_list('salon_id', 'fecha', 'hora_inicio')
+        )
+        horario = {
+            salon.id: sorted((hora, rng.choice(disciplinas).id, rng.choice(instructores).id)
+                             for hora in rng.sample(HORAS_CLASE, 5))
+            for salon in salones
+        }
+        capacidad = {salon.id: salon.capacidad for salon in salones}
+        fecha = desde
+        while fecha <= hasta:
+            dia = fecha.weekday()
+            if dia < 6:
+                for salon_id, franjas in horario.items():
+                    for hora, disciplina_id, instructor_id in franjas:
+                        if (dia == 5 and hora >= 12) or (salon_id, fecha, time(hora)) in ocupados:
+                            continue
+                        if fecha < self.hoy:
+                            estado = CLASE_CANCELADA if rng.random() < 0.03 else CLASE_FINALIZADA
+                        else:
+                            estado = CLASE_PROGRAMADA
+                        pk = self.t_clases.nuevo_id()
+                        creada = self._momento(fecha - timedelta(days=21))
+                        self.t_clases.agregar((
+                            pk, creada, creada, disciplina_id, instructor_id, salon_id, fecha,
+                            time(hora), time(hora + 1), capacidad[salon_id], estado, None, 0,
+                        ))
+                        self.clases_por_fecha[fecha].append((pk, capacidad[salon_id], estado))
+                        self.ocupacion[pk] = [0, 0]   # [ocupados, en espera]
+            fecha += timedelta(days=1)
+        self.t_clases.flush()
+
+    def _historia(self, desde, opciones_plan, recepcion):
+        """
+        Recorre los días desde `desde` hasta hoy: altas del día, membresías
+        que empiezan ese día (renovaciones en una cola por fecha), turnos del
+        personal y actividad genérica. La bitácora de cada día se inserta
+        ordenada por hora.
+        """
+        rng = self.rng
+        dias = max(1, (self.hoy - desde).days)
+        # Día de alta de cada cliente: más altas recientes que antiguas
+        altas = sorted(int(dias * (1 - rng.random() ** 1.5)) for _ in range(self.clientes))
+        siguiente_alta = 0
+        pendientes = []   # heap de (inicio, cliente_id, clases por semana)
+        for dia in range(dias + 1):
+            fecha = desde + timedelta(days=dia)
+            self.bitacora_dia = []
+            while siguiente_alta < len(altas) and altas[siguiente_alta] == dia:
+                siguiente_alta += 1
+                cliente_id = self._cliente(fecha, rng.choice(recepcion))
+                clases_por_semana = rng.uniform(0.5, 2.5) if rng.random() < ASISTE_A_CLASES else 0
+                heapq.heappush(pendientes, (fecha, cliente_id, clases_por_semana))
+            while pendientes and pendientes[0][0] <= fecha:
+                _, cliente_id, clases_por_semana = heapq.heappop(pendientes)
+                inicio = self._membresia(cliente_id, fecha, opciones_plan, rng.choice(recepcion), clases_por_semana)
+                if inicio <= self.hoy:
+                    heapq.heappush(pendientes, (inicio, cliente_id, clases_por_semana))
+            self._turnos(fecha, recepcion)
+            if self.actividad_extra:
+                cantidad = self.actividad_extra * (dia + 1) // (dias + 1) - self.actividad_extra * dia // (dias + 1)
+                self._actividad(fecha, cantidad, recepcion)
+            self.bitacora_dia.sort(key=lambda fila: fila[1])
+            for usuario_id, fecha_hora, tipo, accion, descripcion, nivel, ip, datos in self.bitacora_dia:
+                self.t_bitacora.agregar((
+                    self.t_bitacora.nuevo_id(), fecha_hora, fecha_hora, usuario_id, tipo, accion, descripcion,
+                    nivel, ip, None, fecha_hora, datos, fecha_hora.date(), fecha_hora.time(), ip,
+                ))
+
+    def _cliente(self, fecha, usuario):
+        """Alta de un cliente; retorna su id."""
+        rng = self.rng
+        pk = self.t_clientes.nuevo_id()
+        creado = self._momento(fecha)
+        nombre = rng.choice(NOMBRES)
+        apellido = f'{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}'
+        ci = str(CI_BASE + pk)
+        telefono = f'{rng.choice("67")}{rng.randrange(10**7):07d}'
+        email = f'{normalizar_busqueda(nombre)}.{pk}@correo.com' if rng.random() < 0.6 else ''
+        peso = Decimal(f'{min(130, max(45, rng.gauss(72, 12))):.2f}') if rng.random() < 0.7 else None
+        altura = Decimal(f'{min(2.05, max(1.45, rng.gauss(1.67, 0.09))):.2f}') if peso else None
+        self.t_clientes.agregar((
+            pk, creado, creado, nombre, apellido, ci, telefono, email, peso, altura,
+            _elegir(rng, EXPERIENCIAS), fecha, normalizar_busqueda(f'{nombre} {apellido}')[:101], ci, telefono,
+            email,
+        ))
+        self._auditar(usuario, 'create_client', 'Crear Cliente', f'Cliente {nombre} {apellido} (CI {ci})',
+                      creado, {'cliente_id': pk})
+        return pk
+
+    def _membresia(self, cliente_id, inicio, opciones_plan, usuario, clases_por_semana):
+        """
+        Membresía (con su pago) que empieza en `inicio`. Retorna cuándo empieza
+        la siguiente: al día de vencer si renueva, tras una pausa si vuelve, o
+        una fecha posterior a hoy si el cliente se va.
+        """
+        rng = self.rng
+        hoy = self.hoy
+        plan = _elegir(rng, opciones_plan)
+        fin = inicio + timedelta(days=plan.duracion)
+        if fin < hoy:
+            estado = ESTADO_CANCELADO if rng.random() < 0.03 else ESTADO_VENCIDO
+        else:
+            estado = ESTADO_SUSPENDIDO if rng.random() < 0.03 else ESTADO_ACTIVO
+        pagado = self._momento(inicio)
+        monto = plan.precio_base if rng.random() >= 0.1 else (plan.precio_base * Decimal('0.9')).quantize(Decimal('0.01'))
+
+        pago_id = self.t_pagos.nuevo_id()
+        self.t_pagos.agregar((pago_id, pagado, pagado, cliente_id, monto, _elegir(rng, METODOS_PAGO)))
+        membresia_id = self.t_membresias.nuevo_id()
+        self.t_membresias.agregar((
+            membresia_id, pagado, pagado, pago_id, plan.id, usuario.id, estado, inicio, fin,
+        ))
+        self._auditar(usuario, 'subscribe_membership', 'Crear Membresía',
+                      f'{plan.nombre} desde {inicio} hasta {fin}', pagado,
+                      {'membresia_id': membresia_id, 'monto': str(monto)})
+        if clases_por_semana and estado != ESTADO_CANCELADO:
+            self._inscripciones(cliente_id, inicio, fin, clases_por_semana)
+
+        azar = rng.random()
+        if azar < RENUEVA:
+            return fin + timedelta(days=rng.choice((1, 1, 1, 2, 3, 7)))
+        if azar < RENUEVA + VUELVE:
+            return fin + timedelta(days=rng.randint(30, 180))
+        return hoy + timedelta(days=1)
+
+    def _inscripciones(self, cliente_id, inicio, fin, clases_por_semana):
+        rng = self.rng
+        hoy = self.hoy
+        dias = (fin - inicio).days + 1
+        cantidad = int(clases_por_semana * dias / 7 + rng.random())
+        elegidas = set()
+        for _ in range(cantidad):
+            fecha = inicio + timedelta(days=rng.randrange(dias))
+            clases = self.clases_por_fecha.get(fecha)
+            if not clases:
+                continue
+            clase_id, cupo, estado_clase = rng.choice(clases)
+            if clase_id in elegidas:
+                continue
+            ocupacion = self.ocupacion[clase_id]
+            if estado_clase == CLASE_CANCELADA:
+                estado = INSCRIPCION_CANCELADA_CLASE
+            elif ocupacion[0] < cupo:
+                if rng.random() < 0.04:
+                    # Se inscribió y canceló: no ocupa cupo
+                    estado = INSCRIPCION_CANCELADA_CLASE
+                else:
+                    ocupacion[0] += 1
+                    if fecha >= hoy:
+                        estado = INSCRIPCION_CONFIRMADA
+                    else:
+                        estado = INSCRIPCION_ASISTIO if rng.random() < 0.88 else INSCRIPCION_NO_ASISTIO
+            elif fecha >= hoy and ocupacion[1] < 5:
+                ocupacion[1] += 1
+                estado = INSCRIPCION_EN_ESPERA
+            else:
+                continue
+            elegidas.add(clase_id)
+            inscrito = self._momento(fecha - timedelta(days=rng.randint(0, 3)))
+            self.t_inscripciones.agregar((
+                self.t_inscripciones.nuevo_id(), inscrito, inscrito, clase_id, cliente_id, estado, inscrito, None,
+            ))
+
+    def _turnos(self, fecha, recepcion):
+        """Inicio y cierre de sesión del personal, con algún intento fallido."""
+        rng = self.rng
+        for usuario in recepcion:
+            entrada = self._momento(fecha, 6, 9)
+            self._auditar(usuario, 'login', 'Inicio de Sesión', 'Inicio de sesión correcto', entrada,
+                          {'email': usuario.email})
+            if rng.random() < 0.05:
+                self._auditar(None, 'login_failed', 'Fallo de Inicio de Sesión', 'Credenciales inválidas',
+                              entrada - timedelta(minutes=1), {'email': usuario.email}, nivel='warning')
+            self._auditar(usuario, 'logout', 'Cierre de Sesión', 'Sesión cerrada', self._momento(fecha, 20, 22), {})
+
+    def _actividad(self, fecha, cantidad, recepcion):
+        """`cantidad` registros genéricos de bitácora en el día."""
+        rng = self.rng
+        for _ in range(cantidad):
+            tipo, accion = _elegir(rng, ACTIVIDAD)
+            self._auditar(rng.choice(recepcion), tipo, accion, f'{accion} #{rng.randrange(10**6)}',
+                          self._momento(fecha), {}, nivel='info' if rng.random() < 0.97 else 'error')
+
+    def _auditar(self, usuario, tipo, accion, descripcion, fecha_hora, datos, nivel='info'):
+        """Se acumula en la bitácora del día; el id se asigna al insertarla en orden."""
+        ip = f'192.168.1.{self.rng.randrange(2, 254)}'
+        self.bitacora_dia.append((
+            usuario.id if usuario else None, fecha_hora, tipo, accion, descripcion, nivel, ip, datos,
+        ))
+
+    # ---------- Cierre ----------
+
+    def _finalizar(self, tablas):
+        # PostgreSQL: las secuencias quedaron atrás de los ids insertados
+        with self.conn.cursor() as cursor:
+            for sql in self.conn.ops.sequence_reset_sql(no_style(), [t.modelo for t in tablas]):
+                cursor.execute(sql)
+        if self.t_clases.insertadas:
+            with transaction.atomic(using=self.conn.alias):
+                reparar_contadores(Clase.objects.filter(pk__gte=self.t_clases.primer_id))
+        # Los pagos se insertaron sin signals: resumen y serie mensual desde cero
+        reconciliar()
+        # Proyecciones de check-in, horarios y permisos en caché ya no reflejan la BD
+        cache.clear()
+
+        self.conteos = {t.modelo._meta.db_table: t.insertadas for t in tablas}
+        self.created_count = sum(self.conteos.values())
@@ -2,7 +2,7 @@
  * Cliente HTTP con interceptores para autenticación
  */
 
-import { API_BASE_URL } from "./api";
+import { API_BASE_URL, API_ENDPOINTS } from "./api";
 
 export interface ApiError {
   message: string;
@@ -12,6 +12,8 @@ export interface ApiError {
 
 export class HttpClient {
   private baseURL: string;
+  // Renovación en curso: varias peticiones con 401 esperan la misma
+  private refreshing: Promise<boolean> | null = null;
 
   constructor(baseURL: string = API_BASE_URL) {
     this.baseURL = baseURL;
@@ -35,6 +37,70 @@ export class HttpClient {
     return headers;
   }
 
+  /**
+   * Renueva el access token con el refresh token guardado.
+   * Retorna false si no hay refresh token o el servidor lo rechaza.
+   */
+  private refreshAccessToken(): Promise<boolean> {
+    if (typeof window === "undefined") {
+      return Promise.resolve(false);
+    }
+    const refreshToken = localStorage.getItem("refresh_token");
+    if (!refreshToken) {
+      return Promise.resolve(false);
+    }
+
+    if (!this.refreshing) {
+      this.refreshing = fetch(`${this.baseURL}${API_ENDPOINTS.AUTH.REFRESH}`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ refresh: refreshToken }),
+      })
+        .then(async (response) => {
+          if (!response.ok) {
+            return false;
+          }
+          const data = await response.json();
+          localStorage.setItem("access_token", data.access);
+          if (data.refresh) {
+            localStorage.setItem("refresh_token", data.refresh);
+          }
+          return true;
+        })
+        .catch(() => false)
+        .finally(() => {
+          this.refreshing = null;
+        });
+    }
+    return this.refreshing;
+  }
+
+  /**
+   * Ejecuta la petición. Ante un 401 (p. ej. "permissions_stale" cuando
+   * cambian los roles del usuario) renueva el token y reintenta una vez
+   * antes de cerrar la sesión.
+   */
+  private async request<T>(method: string, endpoint: string, data?: unknown): Promise<T> {
+    const send = () =>
+      fetch(`${this.baseURL}${endpoint}`, {
+        method,
+        headers: this.getHeaders(),
+        body: data ? JSON.stringify(data) : undefined,
+      });
+
+    let response = await send();
+    if (
+      response.status === 401 &&
+      endpoint !== API_ENDPOINTS.AUTH.REFRESH &&
+      endpoint !== API_ENDPOINTS.AUTH.LOGIN &&
+      (await this.refreshAccessToken())
+    ) {
+      response = await send();
+    }
+
+    return this.handleResponse<T>(response);
+  }
+
   /**
    * Maneja errores de la API
    */
@@ -75,63 +141,35 @@ export class HttpClient {
    * GET request
    */
   async get<T>(endpoint: string): Promise<T> {
-    const response = await fetch(`${this.baseURL}${endpoint}`, {
-      method: "GET",
-      headers: this.getHeaders(),
-    });
-
-    return this.handleResponse<T>(response);
+    return this.request<T>("GET", endpoint);
   }
 
   /**
    * POST request
    */
   async post<T>(endpoint: string, data?: unknown): Promise<T> {
-    const response = await fetch(`${this.baseURL}${endpoint}`, {
-      method: "POST",
-      headers: this.getHeaders(),
-      body: data ? JSON.stringify(data) : undefined,
-    });
-
-    return this.handleResponse<T>(response);
+    return this.request<T>("POST", endpoint, data);
   }
 
   /**
    * PUT request
    */
   async put<T>(endpoint: string, data?: unknown): Promise<T> {
-    const response = await fetch(`${this.baseURL}${endpoint}`, {
-      method: "PUT",
-      headers: this.getHeaders(),
-      body: data ? JSON.stringify(data) : undefined,
-    });
-
-    return this.handleResponse<T>(response);
+    return this.request<T>("PUT", endpoint, data);
   }
 
   /**
    * PATCH request
    */
   async patch<T>(endpoint: string, data?: unknown): Promise<T> {
-    const response = await fetch(`${this.baseURL}${endpoint}`, {
-      method: "PATCH",
-      headers: this.getHeaders(),
-      body: data ? JSON.stringify(data) : undefined,
-    });
-
-    return this.handleResponse<T>(response);
+    return this.request<T>("PATCH", endpoint, data);
   }
 
   /**
    * DELETE request
    */
   async delete<T>(endpoint: string): Promise<T> {
-    const response = await fetch(`${this.baseURL}${endpoint}`, {
-      method: "DELETE",
-      headers: this.getHeaders(),
-    });
-
-    return this.handleResponse<T>(response);
+    return this.request<T>("DELETE", endpoint);
   }
 }
 